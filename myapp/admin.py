@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.admin import UserAdmin, GroupAdmin
 from django.utils.html import format_html
+from . import roles
 from .models import DonorProfile, AdminProfile, PatientProfile
 
 # Unregister default User and Group admins
@@ -110,15 +111,18 @@ class CustomUserAdmin(UserAdmin):
     list_filter = ['is_staff', 'is_active', 'groups', 'date_joined']
     search_fields = ['username', 'email', 'first_name', 'last_name']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('admin_profile').prefetch_related('groups')
+
     def get_admin_type(self, obj):
         if hasattr(obj, 'admin_profile'):
             if obj.admin_profile.is_super_admin:
                 return format_html('<span style="color: red; font-weight: bold;">Super Admin</span>')
             elif obj.admin_profile.is_secondary_admin:
                 return format_html('<span style="color: blue;">Secondary Admin</span>')
-        if obj.groups.filter(name='Super Admin').exists():
+        if roles.in_group(obj, roles.SUPER_ADMIN):
             return format_html('<span style="color: red; font-weight: bold;">Super Admin</span>')
-        elif obj.groups.filter(name='Secondary Admin').exists():
+        elif roles.in_group(obj, roles.SECONDARY_ADMIN):
             return format_html('<span style="color: blue;">Secondary Admin</span>')
         return "Regular User"
     get_admin_type.short_description = "Admin Type"
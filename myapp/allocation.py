@@ -0,0 +1,254 @@
+"""
+Blood-group compatible allocation of stock to blood requests.
+
+A request can be covered by any ABO/Rh compatible group. Units are taken in
+this order:
+
+1. units expiring within URGENT_DAYS, soonest first, whatever their group,
+   since they are wasted if nobody uses them;
+2. then by group preference: the exact match first, then the groups that
+   can serve the fewest recipients, so universal O- stock is spent last;
+3. within a group, soonest expiry first (FIFO).
+
+The ordering is computed by the database, so an allocation is one locking
+SELECT of just the units it needs, one UPDATE for all of them, and the
+InventorySummary deltas. match() applies the same order to a whole queue of
+requests in memory, for the batch matcher in approvals.py.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import BloodBank, DonorProfile, InsufficientBloodUnits, InventorySummary
+
+BLOOD_GROUPS = tuple(group for group, _ in DonorProfile.blood_group.field.choices)
+
+# Units this close to expiry are used first regardless of group
+URGENT_DAYS = 3
+
+
+def _can_donate(donor, recipient):
+    """Red cell compatibility: the donor carries no antigen the recipient lacks."""
+    donor_abo, donor_rh = donor[:-1], donor[-1]
+    recipient_abo, recipient_rh = recipient[:-1], recipient[-1]
+    abo_ok = donor_abo == 'O' or donor_abo == recipient_abo or recipient_abo == 'AB'
+    return abo_ok and (donor_rh == '-' or recipient_rh == '+')
+
+
+# Recipient groups each donor group can serve
+RECIPIENTS = {
+    donor: frozenset(recipient for recipient in BLOOD_GROUPS if _can_donate(donor, recipient))
+    for donor in BLOOD_GROUPS
+}
+
+# Donor groups compatible with each recipient, in order of preference
+COMPATIBLE_DONORS = {
+    recipient: tuple(sorted(
+        (donor for donor in BLOOD_GROUPS if recipient in RECIPIENTS[donor]),
+        key=lambda donor: (donor != recipient, len(RECIPIENTS[donor]), donor),
+    ))
+    for recipient in BLOOD_GROUPS
+}
+
+
+def candidate_units(blood_group, today=None):
+    """Available, unexpired units compatible with blood_group, in allocation order."""
+    today = today or timezone.localdate()
+    donors = COMPATIBLE_DONORS[blood_group]
+    return BloodBank.objects.filter(
+        status='available',
+        blood_group__in=donors,
+        expiry_date__gt=today,
+        quantity__gt=0,
+    ).annotate(
+        priority=Case(
+            When(expiry_date__lte=today + timedelta(days=URGENT_DAYS), then=Value(-1)),
+            *[When(blood_group=donor, then=Value(rank)) for rank, donor in enumerate(donors)],
+            output_field=IntegerField(),
+        ),
+    ).order_by('priority', 'expiry_date', 'id')
+
+
+def plan(units, quantity_needed):
+    """
+    Cut an allocation from (id, blood_group, quantity) rows in preference
+    order: whole units until the need is covered, splitting the last one.
+    Returns a list of (id, blood_group, quantity_taken, used_whole) and the
+    quantity covered.
+    """
+    takes = []
+    remaining = quantity_needed
+    for unit_id, blood_group, quantity in units:
+        if remaining <= 0:
+            break
+        taken = min(quantity, remaining)
+        takes.append((unit_id, blood_group, taken, taken == quantity))
+        remaining -= taken
+    return takes, quantity_needed - max(remaining, 0)
+
+
+def allocate(blood_group, quantity_needed):
+    """
+    Lock, plan and deduct compatible units for a request in one transaction.
+    Each unit has a quantity of at least one, so the first quantity_needed
+    candidates always cover the request if the stock exists. Rows locked by
+    a concurrent allocation are skipped rather than waited on.
+
+    Raises InsufficientBloodUnits without deducting anything if the request
+    cannot be covered. Returns {donor_blood_group: quantity_taken}.
+    """
+    if quantity_needed <= 0:
+        return {}
+
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        units = list(
+            candidate_units(blood_group)
+            .select_for_update(skip_locked=skip_locked)
+            .values_list('id', 'blood_group', 'quantity')[:quantity_needed]
+        )
+        takes, covered = plan(units, quantity_needed)
+        if covered < quantity_needed:
+            raise InsufficientBloodUnits(blood_group, quantity_needed, covered)
+        deduct(takes, {unit_id: quantity for unit_id, _, quantity in units})
+
+    return taken_by_group(takes)
+
+
+def taken_by_group(takes):
+    """{donor_blood_group: quantity} for a list of takes."""
+    totals = {}
+    for _, donor_group, taken, _ in takes:
+        totals[donor_group] = totals.get(donor_group, 0) + taken
+    return totals
+
+
+def deduct(takes, quantities):
+    """
+    Write takes (id, blood_group, quantity_taken, used_whole) against units
+    whose stored quantities were quantities[id]: one UPDATE marks used units
+    and shrinks split ones, then the InventorySummary buckets move. A unit may
+    appear in several takes, split by one request and used up by the next.
+    """
+    if not takes:
+        return
+    remaining = dict(quantities)
+    used = set()
+    by_group = {}
+    for unit_id, donor_group, taken, whole in takes:
+        total, used_quantity, used_units = by_group.get(donor_group, (0, 0, 0))
+        if whole:
+            # A used unit keeps the quantity it had when it was issued
+            used.add(unit_id)
+            by_group[donor_group] = (total + taken, used_quantity + taken, used_units + 1)
+        else:
+            remaining[unit_id] -= taken
+            by_group[donor_group] = (total + taken, used_quantity, used_units)
+
+    touched = {unit_id for unit_id, *_ in takes}
+    resized = {unit_id: quantity for unit_id, quantity in remaining.items() if quantity != quantities[unit_id]}
+    status = Value('used')
+    if used != touched:
+        status = Case(When(id__in=used, then=Value('used')), default=Value('available'))
+    quantity = F('quantity')
+    if resized:
+        quantity = Case(
+            *[When(id=unit_id, then=Value(new_quantity)) for unit_id, new_quantity in resized.items()],
+            default=F('quantity'),
+            output_field=BloodBank._meta.get_field('quantity'),
+        )
+    BloodBank.objects.filter(id__in=touched).update(
+        status=status, quantity=quantity, updated_at=timezone.now()
+    )
+
+    for donor_group, (total, used_quantity, used_units) in by_group.items():
+        InventorySummary.apply_delta(donor_group, 'available', -total, -used_units)
+        InventorySummary.apply_delta(donor_group, 'used', used_quantity, used_units)
+
+
+def match(requests, units, today=None):
+    """
+    Assign stock to many requests in memory, in the order given, using the
+    same preference as candidate_units(). units are (id, blood_group,
+    quantity, expiry_date) rows for all available stock. A request that the
+    remaining compatible stock cannot cover is skipped and takes nothing.
+
+    Returns {request_id: takes} for the covered requests, with takes as
+    accepted by deduct().
+    """
+    today = today or timezone.localdate()
+    urgent_until = today + timedelta(days=URGENT_DAYS)
+
+    # Per blood group: [id, quantity left, expiry_date] soonest expiry first,
+    # the index of the first unit with quantity left, and the total left
+    stock = {}
+    for unit_id, blood_group, quantity, expiry_date in sorted(units, key=lambda unit: (unit[3], unit[0])):
+        stock.setdefault(blood_group, []).append([unit_id, quantity, expiry_date])
+    heads = dict.fromkeys(stock, 0)
+    left = {blood_group: sum(unit[1] for unit in rows) for blood_group, rows in stock.items()}
+
+    def priority(rank, blood_group):
+        unit_id, _, expiry_date = stock[blood_group][heads[blood_group]]
+        return (-1 if expiry_date <= urgent_until else rank, expiry_date, unit_id)
+
+    assignments = {}
+    for request in requests:
+        donors = [blood_group for blood_group in COMPATIBLE_DONORS[request.blood_group] if left.get(blood_group)]
+        if sum(left[blood_group] for blood_group in donors) < request.quantity:
+            continue
+        ranks = {blood_group: rank for rank, blood_group in enumerate(COMPATIBLE_DONORS[request.blood_group])}
+        takes = []
+        needed = request.quantity
+        while needed:
+            blood_group = min(
+                (blood_group for blood_group in donors if left[blood_group]),
+                key=lambda blood_group: priority(ranks[blood_group], blood_group),
+            )
+            unit = stock[blood_group][heads[blood_group]]
+            taken = min(unit[1], needed)
+            takes.append((unit[0], blood_group, taken, taken == unit[1]))
+            unit[1] -= taken
+            left[blood_group] -= taken
+            needed -= taken
+            if not unit[1]:
+                heads[blood_group] += 1
+        assignments[request.id] = takes
+    return assignments
+
+
+def allocate_many(requests):
+    """
+    Allocate stock to many requests, in the order given, with one locking
+    SELECT of every available unit they could use, the in-memory match()
+    and one UPDATE. Returns {request_id: {donor_blood_group: quantity}} for
+    the requests that were covered; the others take nothing.
+    """
+    requests = list(requests)
+    donors = {donor for request in requests for donor in COMPATIBLE_DONORS[request.blood_group]}
+    if not donors:
+        return {}
+
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    today = timezone.localdate()
+    with transaction.atomic():
+        units = list(
+            BloodBank.objects.filter(
+                status='available', blood_group__in=donors, expiry_date__gt=today, quantity__gt=0
+            ).select_for_update(skip_locked=skip_locked).order_by()
+            .values_list('id', 'blood_group', 'quantity', 'expiry_date')
+        )
+        assignments = match(requests, units, today)
+        deduct(
+            [take for takes in assignments.values() for take in takes],
+            {unit_id: quantity for unit_id, _, quantity, _ in units},
+        )
+    return {request_id: taken_by_group(takes) for request_id, takes in assignments.items()}
+
+
+def available_quantity(blood_group):
+    """Total in-date available quantity across the groups compatible with blood_group."""
+    return sum(
+        quantity for quantity, _ in InventorySummary.available_totals(COMPATIBLE_DONORS[blood_group]).values()
+    )
@@ -0,0 +1,280 @@
+"""
+Bulk approval and rejection of donations and blood requests.
+
+Each function takes a list of ids, processes them in one transaction and
+returns a per-item report in the order the ids were given:
+
+    [{'id': 7, 'ok': True, 'status': 'initial_approved'},
+     {'id': 9, 'ok': False, 'error': 'Donation is Rejected.'}, ...]
+
+Rows are loaded with one locked query, written back with bulk_update, and
+the resulting BloodBank units and notifications are inserted with
+bulk_create, so the query count does not grow with the number of ids.
+Blood requests are matched against the inventory in one pass; the same
+path fulfils the whole pending queue in fulfil_pending_queue(). As bulk
+writes send no signals, each function bumps the cache versions itself.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import allocation, caching
+from .models import BloodBank, BloodDonation, BloodRequest, DonorProfile, Notification
+
+MAX_BULK_ITEMS = 500
+
+# Requests that can still be fulfilled
+FULFILLABLE_STATUSES = ('pending', 'approved')
+
+# Days until a donated unit expires, and until the donor may donate again
+UNIT_SHELF_LIFE_DAYS = 42
+DONATION_INTERVAL_DAYS = 90
+
+
+def _ok(item_id, status):
+    return {'id': item_id, 'ok': True, 'status': status}
+
+
+def _error(item_id, message):
+    return {'id': item_id, 'ok': False, 'error': message}
+
+
+def _lock(queryset, ids):
+    """Return {id: row} for ids, locked for the rest of the transaction."""
+    return {row.id: row for row in queryset.select_for_update().filter(id__in=ids)}
+
+
+def _process(queryset, ids, allowed, label, apply):
+    """
+    Lock the rows, run apply(row, now) on those whose status is in allowed and
+    report the rest. Returns (report, changed_rows, now).
+    """
+    now = timezone.now()
+    rows = _lock(queryset, ids)
+    report, changed = [], []
+    for item_id in ids:
+        row = rows.get(item_id)
+        if row is None:
+            report.append(_error(item_id, f'{label} not found.'))
+        elif row.status not in allowed:
+            report.append(_error(item_id, f'{label} is {row.get_status_display()}.'))
+        else:
+            apply(row, now)
+            row.updated_at = now
+            changed.append(row)
+            report.append(_ok(item_id, row.status))
+    return report, changed, now
+
+
+def approve_donations_initial(ids, admin):
+    """Initial approval: the donors may now book a timeslot."""
+    def apply(donation, now):
+        donation.status = 'initial_approved'
+        donation.initial_approved_at = now
+        donation.initial_approved_by = admin
+
+    with transaction.atomic():
+        report, donations, _ = _process(
+            BloodDonation.objects.select_related('donor'), ids, {'pending_initial'}, 'Donation', apply
+        )
+        BloodDonation.objects.bulk_update(
+            donations, ['status', 'initial_approved_at', 'initial_approved_by', 'updated_at']
+        )
+        caching.bump(BloodDonation)
+        Notification.bulk_notify([
+            Notification(
+                recipient_id=donation.donor.user_id,
+                title='Initial Approval - Book Your Slot',
+                message='You can donate blood in the available slot. Please book your appointment.',
+                notification_type='appointment',
+                related_donation=donation,
+            )
+            for donation in donations
+        ])
+    return report
+
+
+def approve_donations_final(ids, admin):
+    """Final approval: the donations are completed and added to the blood bank."""
+    def apply(donation, now):
+        donation.status = 'final_approved'
+        donation.final_approved_at = now
+        donation.final_approved_by = admin
+
+    with transaction.atomic():
+        report, donations, now = _process(
+            BloodDonation.objects.select_related('donor'), ids, {'slot_confirmed'}, 'Donation', apply
+        )
+        BloodDonation.objects.bulk_update(
+            donations, ['status', 'final_approved_at', 'final_approved_by', 'updated_at']
+        )
+
+        # What BloodDonation.save() does for a single final approval
+        donors = {}
+        for donation in donations:
+            donor = donors.setdefault(donation.donor_id, donation.donor)
+            next_date = donation.donation_date + timedelta(days=DONATION_INTERVAL_DAYS)
+            if donor.next_eligible_date is None or next_date > donor.next_eligible_date:
+                donor.next_eligible_date = next_date
+        DonorProfile.objects.bulk_update(donors.values(), ['next_eligible_date'])
+        caching.bump(BloodDonation, DonorProfile)
+
+        expiry_date = now.date() + timedelta(days=UNIT_SHELF_LIFE_DAYS)
+        BloodBank.bulk_add([
+            BloodBank(
+                donation=donation,
+                blood_group=donation.donor.blood_group,
+                quantity=donation.quantity or 450,  # Default 450ml if not specified
+                expiry_date=expiry_date,
+            )
+            for donation in donations
+        ])
+        Notification.bulk_notify([
+            Notification(
+                recipient_id=donation.donor.user_id,
+                title='Congratulations!',
+                message='Congratulations on your valuable donation!',
+                notification_type='donation_completed',
+                related_donation=donation,
+            )
+            for donation in donations
+        ])
+    return report
+
+
+def reject_donations(ids, admin):
+    """Reject donations that have not been completed yet."""
+    def apply(donation, now):
+        donation.status = 'rejected'
+        donation.rejected_at = now
+
+    with transaction.atomic():
+        report, donations, _ = _process(
+            BloodDonation.objects.select_related('donor'), ids,
+            {'pending_initial', 'initial_approved', 'slot_confirmed'}, 'Donation', apply
+        )
+        BloodDonation.objects.bulk_update(donations, ['status', 'rejected_at', 'updated_at'])
+        caching.bump(BloodDonation)
+        Notification.bulk_notify([
+            Notification(
+                recipient_id=donation.donor.user_id,
+                title='Donation Rejected',
+                message='Your donation request has been rejected.',
+                notification_type='status_update',
+                related_donation=donation,
+            )
+            for donation in donations
+        ])
+    return report
+
+
+def _fulfil(blood_requests, now):
+    """
+    Allocate stock to the locked requests in the order given with one pass
+    over the inventory (allocation.allocate_many), then write the fulfilled
+    ones and their notifications in bulk. Returns {request_id: result}.
+    """
+    results = {}
+    fulfillable = []
+    for blood_request in blood_requests:
+        if blood_request.status in FULFILLABLE_STATUSES:
+            fulfillable.append(blood_request)
+        else:
+            results[blood_request.id] = _error(
+                blood_request.id, f'Blood request is {blood_request.get_status_display()}.'
+            )
+
+    allocated = allocation.allocate_many(fulfillable)
+    fulfilled = []
+    for blood_request in fulfillable:
+        if blood_request.id not in allocated:
+            results[blood_request.id] = _error(
+                blood_request.id,
+                f'Insufficient compatible blood units for {blood_request.quantity} units of {blood_request.blood_group}.',
+            )
+            continue
+        blood_request.fulfilled_quantity = sum(allocated[blood_request.id].values())
+        blood_request.status = 'fulfilled'
+        blood_request.updated_at = now
+        fulfilled.append(blood_request)
+        results[blood_request.id] = _ok(blood_request.id, blood_request.status)
+        results[blood_request.id]['allocated'] = allocated[blood_request.id]
+
+    BloodRequest.objects.bulk_update(fulfilled, ['status', 'fulfilled_quantity', 'updated_at'])
+    caching.bump(BloodRequest)
+    Notification.bulk_notify([
+        Notification(
+            recipient_id=blood_request.patient.user_id,
+            title='Blood Request Fulfilled',
+            message=f'Your blood request for {blood_request.fulfilled_quantity} units of {blood_request.blood_group} blood has been fulfilled.',
+            notification_type='status_update',
+            related_request=blood_request,
+        )
+        for blood_request in fulfilled
+    ])
+    return results
+
+
+def fulfil_blood_requests(ids, admin):
+    """
+    Fulfil the selected requests oldest first from compatible stock. A
+    request that cannot be covered is reported and takes nothing; the
+    others still go through.
+    """
+    with transaction.atomic():
+        rows = _lock(BloodRequest.objects.select_related('patient').order_by('created_at', 'id'), ids)
+        results = _fulfil(rows.values(), timezone.now())
+    return [results.get(item_id) or _error(item_id, 'Blood request not found.') for item_id in ids]
+
+
+def fulfil_pending_queue(by_urgency=False):
+    """
+    Match the whole queue of pending requests against the inventory in one
+    pass: first come, first served by created_at, or most urgent first when
+    by_urgency is set. Returns the per-request report in processing order.
+    """
+    ordering = ('-urgency', 'created_at', 'id') if by_urgency else ('created_at', 'id')
+    with transaction.atomic():
+        queue = list(
+            BloodRequest.objects.filter(status__in=FULFILLABLE_STATUSES)
+            .select_related('patient').select_for_update().order_by(*ordering)
+        )
+        results = _fulfil(queue, timezone.now())
+    return [results[blood_request.id] for blood_request in queue]
+
+
+def reject_blood_requests(ids, admin):
+    """Reject requests that have not been fulfilled."""
+    def apply(blood_request, now):
+        blood_request.status = 'rejected'
+
+    with transaction.atomic():
+        report, rejected, _ = _process(
+            BloodRequest.objects.select_related('patient'), ids, FULFILLABLE_STATUSES, 'Blood request', apply
+        )
+        BloodRequest.objects.bulk_update(rejected, ['status', 'updated_at'])
+        caching.bump(BloodRequest)
+        Notification.bulk_notify([
+            Notification(
+                recipient_id=blood_request.patient.user_id,
+                title='Blood Request Rejected',
+                message='Your blood request has been rejected.',
+                notification_type='status_update',
+                related_request=blood_request,
+            )
+            for blood_request in rejected
+        ])
+    return report
+
+
+DONATION_ACTIONS = {
+    'initial': approve_donations_initial,
+    'final': approve_donations_final,
+    'reject': reject_donations,
+}
+
+REQUEST_ACTIONS = {
+    'approve': fulfil_blood_requests,
+    'reject': reject_blood_requests,
+}
@@ -0,0 +1,94 @@
+"""
+Cached values computed from the database, invalidated by model version.
+
+Every tracked model has a version number in the cache. A cached value is
+stored under its name plus the current versions of the models it was
+computed from, so bumping a model's version makes every value that depends
+on it unreachable at once, and the value is recomputed on the next read.
+Old entries are left to expire after DATA_CACHE_TIMEOUT seconds.
+
+signals.py bumps a model on post_save and post_delete. The bulk paths
+(bulk_create, bulk_update and QuerySet.update() send no signals) call
+bump() themselves. A bump happens straight away and again when the
+transaction commits, so a value computed from rows read before the commit
+is not kept under the new version. If a version is evicted, it restarts
+from the current time in nanoseconds, which is higher than the evicted
+value unless it was bumped more than once a nanosecond.
+
+The versions live in the default cache, so only the processes sharing that
+cache see the same ones. The default in-memory cache is private to each
+worker; several workers need Redis or Memcached (CACHE_BACKEND /
+CACHE_LOCATION), whose incr() is atomic, or a bump made in one of them is
+lost on the others. DATA_CACHE_TIMEOUT = 0 turns caching off.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+_MISSING = object()
+
+
+def _timeout():
+    return getattr(settings, 'DATA_CACHE_TIMEOUT', 0)
+
+
+def enabled():
+    """Whether values are cached and versions bumped."""
+    return bool(_timeout())
+
+
+def _version_key(model):
+    return f'version:{model._meta.label_lower}'
+
+
+def _fresh_version():
+    return time.time_ns()
+
+
+def versions(models):
+    """The current version of each model, starting any that are missing."""
+    keys = [_version_key(model) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_version(), None)
+            # Another process may have added it first
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _bump_keys(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _fresh_version(), None)
+
+
+def bump(*models):
+    """Invalidate every cached value computed from these models."""
+    if not enabled():
+        return
+    keys = [_version_key(model) for model in models]
+    _bump_keys(keys)
+    transaction.on_commit(lambda: _bump_keys(keys))
+
+
+def cached(name, depends_on, compute, vary=(), timeout=None):
+    """
+    Return compute(), cached under name and the vary values until one of
+    the depends_on models is bumped or the entry times out.
+    """
+    timeout = _timeout() if timeout is None else timeout
+    if not timeout:
+        return compute()
+    suffix = hashlib.md5(repr((list(vary), versions(depends_on))).encode()).hexdigest()
+    key = f'data:{name}:{suffix}'
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,164 @@
+"""
+Streaming CSV and JSON Lines exports of the main tables.
+
+Rows are read as values_list() tuples in keyset batches
+(pagination.keyset_values) and written to the response as they are
+produced, so memory stays flat however large the export is.
+"""
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+
+from django.db import models
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import BloodBank, BloodDonation, BloodRequest, DonorProfile, Notification, PatientProfile
+from .pagination import keyset_values
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'jsonl')
+
+# name: model, exported fields (header = field names), the date field the
+# start/end filters apply to, and the field the status filter applies to
+DATASETS = {
+    'donors': {
+        'model': DonorProfile,
+        'fields': ['id', 'user__username', 'full_name', 'blood_group', 'age', 'gender', 'contact_number',
+                   'next_eligible_date', 'created_at'],
+        'date_field': 'created_at',
+        'status_field': None,
+    },
+    'patients': {
+        'model': PatientProfile,
+        'fields': ['id', 'user__username', 'full_name', 'blood_group', 'age', 'gender', 'contact_number',
+                   'address', 'emergency_contact', 'user__is_active', 'created_at'],
+        'date_field': 'created_at',
+        'status_field': None,
+    },
+    'donations': {
+        'model': BloodDonation,
+        'fields': ['id', 'donor_id', 'donor__blood_group', 'quantity', 'donation_date', 'status',
+                   'timeslot_id', 'initial_approved_at', 'final_approved_at', 'rejected_at', 'created_at'],
+        'date_field': 'donation_date',
+        'status_field': 'status',
+    },
+    'requests': {
+        'model': BloodRequest,
+        'fields': ['id', 'patient_id', 'blood_group', 'quantity', 'fulfilled_quantity', 'urgency', 'status',
+                   'created_at', 'updated_at'],
+        'date_field': 'created_at',
+        'status_field': 'status',
+    },
+    'inventory': {
+        'model': BloodBank,
+        'fields': ['id', 'donation_id', 'blood_group', 'quantity', 'storage_date', 'expiry_date', 'status',
+                   'location'],
+        'date_field': 'storage_date',
+        'status_field': 'status',
+    },
+    'notifications': {
+        'model': Notification,
+        'fields': ['id', 'recipient_id', 'title', 'message', 'notification_type', 'is_read', 'created_at'],
+        'date_field': 'created_at',
+        'status_field': 'notification_type',
+    },
+}
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_rows(header, rows):
+    """Yield header and rows as CSV lines."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_rows(header, rows):
+    """Yield one JSON object per row, keyed by header."""
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), default=_json_default) + '\n'
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def parse_date(value, name):
+    """Parse a YYYY-MM-DD filter value; raises ValueError naming the filter."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be YYYY-MM-DD')
+
+
+def export_queryset(dataset, start=None, end=None, status=None):
+    """
+    The rows of a dataset, optionally limited to start <= date field <= end
+    and to one status. Raises ValueError for an unknown dataset or status.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f'Unknown dataset {dataset!r}; choose from {", ".join(DATASETS)}')
+    config = DATASETS[dataset]
+    model = config['model']
+    queryset = model._default_manager.all()
+
+    date_field = config['date_field']
+    if isinstance(model._meta.get_field(date_field), models.DateTimeField):
+        # Compare against midnight so the index on the column stays usable
+        def bound(day):
+            return timezone.make_aware(datetime.combine(day, time.min))
+        if start:
+            queryset = queryset.filter(**{f'{date_field}__gte': bound(start)})
+        if end:
+            queryset = queryset.filter(**{f'{date_field}__lt': bound(end + timedelta(days=1))})
+    else:
+        if start:
+            queryset = queryset.filter(**{f'{date_field}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{date_field}__lte': end})
+
+    if status:
+        status_field = config['status_field']
+        choices = dict(model._meta.get_field(status_field).choices) if status_field else {}
+        if status not in choices:
+            raise ValueError(f'Unknown status {status!r} for {dataset}')
+        queryset = queryset.filter(**{status_field: status})
+    return queryset
+
+
+def export_lines(dataset, fmt, start=None, end=None, status=None, chunk_size=CHUNK_SIZE):
+    """Generator of CSV or JSONL lines for a dataset; validates before the first line."""
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format {fmt!r}; choose from {", ".join(FORMATS)}')
+    queryset = export_queryset(dataset, start, end, status)
+    header = DATASETS[dataset]['fields']
+    rows = keyset_values(queryset, header, chunk_size=chunk_size)
+    return csv_rows(header, rows) if fmt == 'csv' else jsonl_rows(header, rows)
+
+
+def stream_csv(filename, header, rows):
+    """Stream rows, e.g. from keyset_values(), as a CSV attachment."""
+    response = StreamingHttpResponse(csv_rows(header, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def stream_export(dataset, fmt, start=None, end=None, status=None):
+    """StreamingHttpResponse for export_lines(); raises ValueError for bad filters."""
+    lines = export_lines(dataset, fmt, start, end, status)
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{dataset}_{timezone.localdate()}.{fmt}"'
+    return response
@@ -535,7 +535,7 @@ class BloodRequestForm(forms.ModelForm):
     """
     class Meta:
         model = BloodRequest
-        fields = ['blood_group', 'quantity']
+        fields = ['blood_group', 'quantity', 'urgency']
         widgets = {
             'blood_group': forms.Select(attrs={
                 'class': 'form-control'
@@ -544,6 +544,9 @@ class BloodRequestForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Enter number of units'
             }),
+            'urgency': forms.Select(attrs={
+                'class': 'form-control'
+            }),
         }
 
 class TimeslotForm(forms.ModelForm):
@@ -572,6 +575,80 @@ class TimeslotForm(forms.ModelForm):
             }),
         }
 
+    @staticmethod
+    def capacity_error(booked_count):
+        return f'Capacity cannot be lower than the {booked_count} appointments already booked.'
+
+    def clean_capacity(self):
+        # A first check only: bookings can arrive before the save, which
+        # Timeslot.reschedule() guards against
+        capacity = self.cleaned_data.get('capacity')
+        if capacity is not None and capacity < self.instance.booked_count:
+            raise forms.ValidationError(self.capacity_error(self.instance.booked_count))
+        return capacity
+
+
+class RecurringTimeslotForm(forms.Form):
+    """
+    Form for generating a recurring weekly schedule of timeslots.
+    """
+    MAX_DAYS = 366
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    end_date = forms.DateField(widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+    weekdays = forms.TypedMultipleChoiceField(
+        choices=WEEKDAY_CHOICES,
+        coerce=int,
+        initial=[0, 1, 2, 3, 4],
+        widget=forms.CheckboxSelectMultiple
+    )
+    opening_time = forms.TimeField(widget=forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}))
+    closing_time = forms.TimeField(widget=forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}))
+    slot_minutes = forms.IntegerField(
+        min_value=5,
+        max_value=480,
+        initial=30,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Minutes per slot'})
+    )
+    capacity = forms.IntegerField(
+        min_value=1,
+        initial=10,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Maximum appointments'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        opening_time = cleaned_data.get('opening_time')
+        closing_time = cleaned_data.get('closing_time')
+
+        if start_date and end_date:
+            if end_date < start_date:
+                raise forms.ValidationError('End date must be on or after the start date.')
+            if (end_date - start_date).days >= self.MAX_DAYS:
+                raise forms.ValidationError(f'A schedule can cover at most {self.MAX_DAYS} days.')
+        if opening_time and closing_time and closing_time <= opening_time:
+            raise forms.ValidationError('Closing time must be after opening time.')
+        return cleaned_data
+
+    def generate(self):
+        """Create the timeslots described by the cleaned form; returns (planned, created)."""
+        data = self.cleaned_data
+        return Timeslot.generate_recurring(
+            data['start_date'], data['end_date'], data['weekdays'],
+            data['opening_time'], data['closing_time'], data['slot_minutes'], data['capacity'],
+        )
+
 
 class AppointmentBookingForm(forms.Form):
     """
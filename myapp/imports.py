@@ -0,0 +1,284 @@
+"""
+Bulk import of donors, patients and historical donations from CSV or JSON
+Lines.
+
+Input is read one row at a time and handled in batches of BATCH_SIZE. Each
+row is validated with the model's form fields; the batch is
+checked against the database with one query (existing usernames, or the
+donors the donations belong to); passwords are hashed in a process pool;
+and the rows are written with bulk_create. A row that fails is reported
+with its line number and skipped, and the rest of its batch still goes in.
+"""
+import contextlib
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django import forms
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import DateField, F, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from . import caching
+from .approvals import DONATION_INTERVAL_DAYS
+from .models import BloodDonation, DonorProfile, PatientProfile
+
+BATCH_SIZE = 1000
+FORMATS = ('csv', 'jsonl')
+
+
+def _row_fields(model, fields, **extra):
+    """The model's form fields for fields, plus any extra columns."""
+    return {**forms.fields_for_model(model, fields=fields), **extra}
+
+
+# Account columns: the email is also the username, as on the registration forms
+_ACCOUNT_FIELDS = {
+    'email': forms.EmailField(max_length=150),
+    'password': forms.CharField(required=False, strip=False),
+}
+
+# name: model and the form fields validating one input row
+DATASETS = {
+    'donors': {
+        'model': DonorProfile,
+        'fields': _row_fields(DonorProfile, [
+            'full_name', 'blood_group', 'contact_number', 'age', 'gender', 'weight', 'height', 'address',
+            'medical_conditions', 'next_eligible_date',
+        ], **_ACCOUNT_FIELDS),
+    },
+    'patients': {
+        'model': PatientProfile,
+        'fields': _row_fields(PatientProfile, [
+            'full_name', 'blood_group', 'contact_number', 'age', 'gender', 'address', 'emergency_contact',
+            'medical_history',
+        ], **_ACCOUNT_FIELDS),
+    },
+    'donations': {
+        'model': BloodDonation,
+        'fields': _row_fields(
+            BloodDonation, ['quantity', 'donation_date', 'appointment_date', 'status'],
+            donor=forms.CharField(max_length=150, help_text="The donor's email"),
+        ),
+    },
+}
+
+
+def read_rows(stream, fmt):
+    """Yield (line_number, row dict) from a CSV or JSON Lines text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def _hash_all(passwords, map_function):
+    """Hash the given passwords with map_function; a missing one becomes unusable."""
+    hashed = iter(map_function(make_password, [password for password in passwords if password]))
+    return [next(hashed) if password else make_password(None) for password in passwords]
+
+
+@contextlib.contextmanager
+def password_hasher(workers=None, unusable=False):
+    """
+    Yield a function mapping a list of raw passwords to their hashes.
+
+    Hashing is deliberately slow, so it is spread over a pool of `workers`
+    processes (all CPUs by default). workers=0 hashes in this process, and
+    unusable=True skips hashing and gives every account an unusable password.
+    """
+    if unusable:
+        yield lambda passwords: [make_password(None) for _ in passwords]
+    elif workers == 0:
+        yield lambda passwords: _hash_all(passwords, map)
+    else:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, BATCH_SIZE // (4 * workers))
+        # Spawned workers need the settings loaded before they can hash
+        with ProcessPoolExecutor(workers, initializer=django.setup) as pool:
+            yield lambda passwords: _hash_all(
+                passwords, lambda function, items: pool.map(function, items, chunksize=chunksize)
+            )
+
+
+def _write(insert, rows):
+    """
+    Run insert(rows) in a transaction. If the database rejects the batch,
+    retry row by row so only the offending rows are lost.
+    Returns (inserted, [(line_number, message)]).
+    """
+    try:
+        with transaction.atomic():
+            insert(rows)
+        return len(rows), []
+    except IntegrityError:
+        pass
+
+    inserted, errors = 0, []
+    for row in rows:
+        try:
+            with transaction.atomic():
+                insert([row])
+            inserted += 1
+        except IntegrityError as e:
+            errors.append((row[0], str(e)))
+    return inserted, errors
+
+
+def _import_accounts(model, rows, hash_passwords):
+    """Insert a User and a profile for each validated (line_number, data) row."""
+    errors = []
+    usernames = [data['email'] for _, data in rows]
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    new = []
+    for line_number, data in rows:
+        if data['email'] in taken:
+            errors.append((line_number, f'User {data["email"]} already exists.'))
+        else:
+            taken.add(data['email'])
+            new.append((line_number, data))
+
+    for (_, data), password in zip(new, hash_passwords([data.pop('password') for _, data in new])):
+        data['password'] = password
+
+    def insert(batch):
+        User.objects.bulk_create([
+            User(username=data['email'], email=data['email'], password=data['password']) for _, data in batch
+        ])
+        # MySQL does not return the new primary keys from a bulk insert
+        user_ids = dict(
+            User.objects.filter(username__in=[data['email'] for _, data in batch]).values_list('username', 'id')
+        )
+        model.objects.bulk_create([
+            model(
+                user_id=user_ids[data['email']],
+                **{name: value for name, value in data.items() if name not in _ACCOUNT_FIELDS and value is not None},
+            )
+            for _, data in batch
+        ])
+        caching.bump(User, model)
+
+    inserted, write_errors = _write(insert, new) if new else (0, [])
+    return inserted, errors + write_errors
+
+
+def _import_donations(model, rows, hash_passwords):
+    """Insert historical donations, moving each donor's next eligible date on."""
+    errors = []
+    donors = dict(
+        DonorProfile.objects.filter(
+            user__username__in={data['donor'] for _, data in rows}
+        ).values_list('user__username', 'id')
+    )
+    new = []
+    for line_number, data in rows:
+        if data['donor'] not in donors:
+            errors.append((line_number, f'No donor with email {data["donor"]}.'))
+        else:
+            new.append((line_number, data))
+
+    def insert(batch):
+        eligible = {}
+        for _, data in batch:
+            if data['status'] == 'final_approved':
+                donor_id = donors[data['donor']]
+                next_date = data['donation_date'] + timedelta(days=DONATION_INTERVAL_DAYS)
+                eligible[donor_id] = max(eligible.get(donor_id, next_date), next_date)
+        BloodDonation.objects.bulk_create([
+            BloodDonation(
+                donor_id=donors[data['donor']],
+                quantity=data['quantity'],
+                donation_date=data['donation_date'],
+                appointment_date=data['appointment_date'],
+                status=data['status'],
+            )
+            for _, data in batch
+        ])
+        # Only ever moved later, so a row retried on its own after a later
+        # donation of the same donor cannot pull the date back
+        DonorProfile.objects.bulk_update(
+            [DonorProfile(id=donor_id, next_eligible_date=_later_of_stored(next_date))
+             for donor_id, next_date in eligible.items()],
+            ['next_eligible_date'],
+        )
+        caching.bump(BloodDonation, DonorProfile)
+
+    inserted, write_errors = _write(insert, new) if new else (0, [])
+    return inserted, errors + write_errors
+
+
+def _later_of_stored(next_date):
+    """The later of a donor's stored next_eligible_date (if any) and next_date."""
+    value = Value(next_date, output_field=DateField())
+    return Greatest(Coalesce(F('next_eligible_date'), value), value)
+
+
+_IMPORTERS = {
+    'donors': _import_accounts,
+    'patients': _import_accounts,
+    'donations': _import_donations,
+}
+
+
+def clean_row(fields, row):
+    """
+    Validate row against fields. A Form would deep-copy every field for
+    each row, which dominates the cost of a large import, so the shared
+    field instances clean the values directly. Returns (cleaned_data, error).
+    """
+    cleaned, errors = {}, []
+    for name, field in fields.items():
+        try:
+            cleaned[name] = field.clean(row.get(name))
+        except ValidationError as e:
+            errors.append(f'{name}: {" ".join(e.messages)}')
+    return cleaned, '; '.join(errors)
+
+
+def import_batches(dataset, rows, hash_passwords, batch_size=BATCH_SIZE):
+    """
+    Validate and insert (line_number, row) pairs batch by batch. Yields
+    (rows_read, rows_inserted, [(line_number, message)]) after each batch,
+    errors sorted by line. Raises ValueError for an unknown dataset.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f'Unknown dataset {dataset!r}.')
+    fields = DATASETS[dataset]['fields']
+    model = DATASETS[dataset]['model']
+    importer = _IMPORTERS[dataset]
+
+    def flush(batch, read, errors):
+        inserted, batch_errors = importer(model, batch, hash_passwords) if batch else (0, [])
+        return read, inserted, sorted(errors + batch_errors)
+
+    batch, read, errors = [], 0, []
+    for line_number, row in rows:
+        read += 1
+        if row is None:
+            errors.append((line_number, 'Not a JSON object.'))
+        else:
+            cleaned, error = clean_row(fields, row)
+            if error:
+                errors.append((line_number, error))
+            else:
+                batch.append((line_number, cleaned))
+        if read == batch_size:
+            yield flush(batch, read, errors)
+            batch, read, errors = [], 0, []
+    if read:
+        yield flush(batch, read, errors)
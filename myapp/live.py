@@ -0,0 +1,124 @@
+"""
+In-process fan-out of new notifications to Server-Sent Events streams.
+
+Each open stream subscribes a bounded queue for its user. Notifications
+saved in this process are pushed to those queues once their transaction
+commits. Notifications written by other processes (other workers, management
+commands) are picked up by one shared poller per process, which runs a
+single indexed query every LIVE_POLL_INTERVAL seconds for all subscribed
+users, however many streams are open.
+
+Ids are allocated at insert but become visible at commit, so a
+notification can appear after one with a higher id. The poller therefore
+re-reads the last LIVE_POLL_OVERLAP ids on every poll and publishes the ones
+it has not seen yet, and each stream skips ids it has already sent, since
+a notification can reach it both from its on_commit publish and the poller.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+QUEUE_SIZE = 100
+
+
+def serialize(notification):
+    """The JSON payload sent to the browser for one notification."""
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'type': notification.notification_type,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+
+class NotificationHub:
+    """Per-process registry of open notification streams, keyed by user id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._poller = None
+        self.watermark = None
+
+    def subscribe(self, user_id):
+        """Register a stream on the running event loop and return its queue."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add((loop, queue))
+        self._ensure_poller(loop)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            streams = self._subscribers.get(user_id, set())
+            streams.discard((asyncio.get_running_loop(), queue))
+            if not streams:
+                self._subscribers.pop(user_id, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(streams) for streams in self._subscribers.values())
+
+    def user_ids(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def publish(self, user_id, payload):
+        """Queue payload for every open stream of user_id; safe from any thread."""
+        with self._lock:
+            streams = list(self._subscribers.get(user_id, ()))
+        for loop, queue in streams:
+            loop.call_soon_threadsafe(_offer, queue, payload)
+
+    def _ensure_poller(self, loop):
+        if self._poller is None or self._poller.done() or self._poller.get_loop() is not loop:
+            self._poller = loop.create_task(self._poll())
+
+    async def _poll(self):
+        from .models import Notification
+
+        interval = getattr(settings, 'LIVE_POLL_INTERVAL', 5)
+        overlap = getattr(settings, 'LIVE_POLL_OVERLAP', 1000)
+        latest = await Notification.objects.order_by('-id').values_list('id', flat=True).afirst()
+        self.watermark = latest or 0
+        # Ids in the overlap window that are already visible, whoever they are for
+        seen = {
+            notification_id async for notification_id in
+            Notification.objects.filter(id__gt=self.watermark - overlap).values_list('id', flat=True)
+        }
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                user_ids = set(self.user_ids())
+                if not user_ids:
+                    break
+                floor = self.watermark - overlap
+                window = Notification.objects.filter(id__gt=floor).order_by('id').values_list('id', 'recipient_id')
+                wanted = []
+                async for notification_id, recipient_id in window:
+                    if notification_id not in seen:
+                        seen.add(notification_id)
+                        self.watermark = max(self.watermark, notification_id)
+                        if recipient_id in user_ids:
+                            wanted.append(notification_id)
+                seen = {notification_id for notification_id in seen if notification_id > self.watermark - overlap}
+                async for notification in Notification.objects.filter(id__in=wanted).order_by('id'):
+                    self.publish(notification.recipient_id, serialize(notification))
+        finally:
+            self.watermark = None
+
+
+def _offer(queue, payload):
+    # A stream that has stopped reading drops messages rather than growing
+    # without bound; the client catches up from Last-Event-ID on reconnect.
+    try:
+        queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        pass
+
+
+hub = NotificationHub()
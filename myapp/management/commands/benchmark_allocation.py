@@ -0,0 +1,84 @@
+import random
+from datetime import date, timedelta
+from statistics import median
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from myapp import allocation
+from myapp.models import BloodBank, BloodDonation, DonorProfile, InsufficientBloodUnits
+
+
+class Command(BaseCommand):
+    help = 'Time compatibility-aware allocation against a large generated inventory (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--units', type=int, default=50000, help='Blood units in the generated inventory')
+        parser.add_argument('--requests', type=int, default=200, help='Allocations to run')
+        parser.add_argument('--quantity', type=int, default=4, help='Units asked for by each request')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the inventory')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.stdout.write(f'Generating {options["units"]} units...')
+            self.seed_inventory(options['units'], rng)
+
+            planning, total, queries, shortages = [], [], [], 0
+            for index in range(options['requests']):
+                blood_group = allocation.BLOOD_GROUPS[index % len(allocation.BLOOD_GROUPS)]
+                rows = list(
+                    allocation.candidate_units(blood_group)
+                    .values_list('id', 'blood_group', 'quantity')[:options['quantity']]
+                )
+                started = perf_counter()
+                allocation.plan(rows, options['quantity'])
+                planning.append(perf_counter() - started)
+
+                with CaptureQueriesContext(connection) as captured:
+                    started = perf_counter()
+                    try:
+                        allocation.allocate(blood_group, options['quantity'])
+                    except InsufficientBloodUnits:
+                        shortages += 1
+                    total.append(perf_counter() - started)
+                queries.append(len(captured))
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{len(total)} allocations of {options["quantity"]} units, {shortages} short')
+        self.report('plan only', planning)
+        self.report('allocate', total)
+        self.stdout.write(f'{"queries":>10}: median {median(queries)}, max {max(queries)} per allocation')
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+        self.stdout.write(
+            f'{label:>10}: median {median(timings) * 1000:.3f} ms, '
+            f'p95 {p95 * 1000:.3f} ms, max {timings[-1] * 1000:.3f} ms'
+        )
+
+    def seed_inventory(self, count, rng):
+        user = User.objects.create_user(username='allocation-benchmark')
+        donor = DonorProfile.objects.create(user=user, full_name='Benchmark donor', blood_group='O-',
+                                            contact_number='0000000000')
+        today = date.today()
+        BloodDonation.objects.bulk_create(
+            [BloodDonation(donor=donor, quantity=1, donation_date=today, status='final_approved')
+             for _ in range(count)],
+            batch_size=500,
+        )
+        # MySQL does not return primary keys from bulk inserts
+        donation_ids = BloodDonation.objects.filter(donor=donor).values_list('id', flat=True)
+        BloodBank.bulk_add([
+            BloodBank(
+                donation_id=donation_id,
+                blood_group=rng.choice(allocation.BLOOD_GROUPS),
+                quantity=rng.randint(1, 3),
+                expiry_date=today + timedelta(days=rng.randint(1, 42)),
+            )
+            for donation_id in donation_ids.iterator()
+        ], batch_size=500)
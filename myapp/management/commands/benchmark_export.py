@@ -0,0 +1,74 @@
+import resource
+import tracemalloc
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from myapp import exports
+from myapp.models import Notification
+
+
+def current_rss_kib():
+    """Resident set size of this process in KiB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Command(BaseCommand):
+    help = 'Export a large generated notifications table and show memory stays flat (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Notifications to generate and export')
+        parser.add_argument('--format', dest='fmt', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--samples', type=int, default=10, help='RSS samples taken during the export')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            self.stdout.write(f'Generating {rows} notifications...')
+            self.seed(rows)
+
+            step = max(rows // options['samples'], 1)
+            samples = []
+            exported = 0
+            size = 0
+            tracemalloc.start()
+            started = perf_counter()
+            for line in exports.export_lines('notifications', options['fmt']):
+                exported += 1
+                size += len(line)
+                if exported % step == 0:
+                    samples.append((exported, current_rss_kib(), tracemalloc.get_traced_memory()[0]))
+            elapsed = perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            transaction.set_rollback(True)
+
+        for count, rss, traced in samples:
+            self.stdout.write(f'{count:>10} lines  RSS {rss / 1024:8.1f} MiB  Python heap {traced / 1024:8.1f} KiB')
+        self.stdout.write(
+            f'Exported {exported} lines ({size / 2 ** 20:.1f} MiB) in {elapsed:.1f}s, '
+            f'{exported / elapsed:,.0f} lines/s; peak Python heap during export {peak / 1024:.1f} KiB'
+        )
+        if len(samples) > 1:
+            growth = samples[-1][1] - samples[0][1]
+            self.stdout.write(self.style.SUCCESS(
+                f'RSS changed by {growth / 1024:+.1f} MiB between the first and last sample'
+            ))
+
+    def seed(self, rows, batch_size=10000):
+        user = User.objects.create_user(username='export-benchmark')
+        for offset in range(0, rows, batch_size):
+            Notification.objects.bulk_create([
+                Notification(recipient=user, title=f'Notification {offset + i}', message='Benchmark row',
+                             is_read=bool(i % 2))
+                for i in range(min(batch_size, rows - offset))
+            ])
@@ -0,0 +1,138 @@
+import asyncio
+import time
+import tracemalloc
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from myapp import live
+from myapp.models import Notification
+
+
+class Connection:
+    """One in-process SSE client driving the ASGI application directly."""
+
+    def __init__(self, app, path, cookie):
+        self.app = app
+        self.scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'localhost'),
+                (b'accept', b'text/event-stream'),
+                (b'cookie', cookie.encode()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+        self.status = None
+        self.received = b''
+        self.opened = asyncio.Event()
+        self.event_seen = asyncio.Event()
+        self.disconnected = asyncio.Event()
+        self.request_sent = False
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.app(self.scope, self.receive, self.send))
+
+    async def receive(self):
+        if not self.request_sent:
+            self.request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message['type'] == 'http.response.body':
+            self.received += message.get('body', b'')
+            self.opened.set()
+            if b'event: notification' in self.received:
+                self.event_seen.set()
+
+    async def close(self):
+        self.disconnected.set()
+        try:
+            await asyncio.wait_for(self.task, timeout=5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+
+
+class Command(BaseCommand):
+    help = 'Hold many idle notification streams open in-process and report memory per connection and fan-out time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000, help='Number of idle streams to open')
+
+    def handle(self, *args, **options):
+        user, session = self.create_user()
+        try:
+            asyncio.run(self.run(options['connections'], user, session))
+        finally:
+            session.delete()
+            user.delete()
+
+    def create_user(self):
+        # A throwaway account; deleted (with its notifications) afterwards.
+        user = User.objects.create_user(username=f'sse-bench-{uuid.uuid4().hex[:12]}')
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return user, session
+
+    async def run(self, count, user, session):
+        app = get_asgi_application()
+        path = reverse('notification_stream')
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+        # Warm up imports, URL resolution and the DB connection.
+        warm = Connection(app, path, cookie)
+        warm.start()
+        await asyncio.wait_for(warm.opened.wait(), timeout=30)
+        await warm.close()
+
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        connections = [Connection(app, path, cookie) for _ in range(count)]
+        for connection in connections:
+            connection.start()
+        await asyncio.wait_for(asyncio.gather(*(c.opened.wait() for c in connections)), timeout=600)
+        open_seconds = time.perf_counter() - started
+        held, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        failed = [c for c in connections if c.status != 200]
+        self.stdout.write(f'Opened {count} streams in {open_seconds:.2f}s ({len(failed)} failed)')
+        self.stdout.write(f'Open streams in hub: {live.hub.subscriber_count()}')
+        self.stdout.write(
+            f'Python heap held: {(held - baseline) / 1024 / 1024:.1f} MiB '
+            f'({(held - baseline) / count / 1024:.1f} KiB per connection, peak {(peak - baseline) / 1024 / 1024:.1f} MiB)'
+        )
+
+        started = time.perf_counter()
+        await sync_to_async(Notification.objects.create)(
+            recipient=user, title='Benchmark', message='Fan-out test', notification_type='general'
+        )
+        await asyncio.wait_for(asyncio.gather(*(c.event_seen.wait() for c in connections)), timeout=60)
+        self.stdout.write(f'Fan-out of one notification to {count} streams: {(time.perf_counter() - started) * 1000:.1f} ms')
+
+        await asyncio.gather(*(c.close() for c in connections))
+        self.stdout.write(self.style.SUCCESS(f'Closed; open streams in hub: {live.hub.subscriber_count()}'))
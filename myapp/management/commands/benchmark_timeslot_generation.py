@@ -0,0 +1,66 @@
+from datetime import date, time, timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from myapp.forms import TimeslotForm
+from myapp.models import Timeslot
+
+
+class Command(BaseCommand):
+    help = 'Compare bulk timeslot generation against creating one slot per form post'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Days in the generated schedule')
+        parser.add_argument('--slot-minutes', type=int, default=15, help='Length of each slot in minutes')
+
+    def handle(self, *args, **options):
+        schedule = {
+            'weekdays': range(7),
+            'opening_time': time(8),
+            'closing_time': time(20),
+            'slot_minutes': options['slot_minutes'],
+            'capacity': 10,
+        }
+        # Start after every existing slot so both runs insert the same rows;
+        # each run happens in a transaction that is rolled back.
+        latest = Timeslot.objects.aggregate(latest=Max('date'))['latest'] or date.today()
+        start = latest + timedelta(days=1)
+        end = start + timedelta(days=options['days'] - 1)
+        slots = list(Timeslot.recurring_schedule(start, end, **schedule))
+
+        def per_form():
+            for slot in slots:
+                form = TimeslotForm(data={
+                    'date': slot.date,
+                    'start_time': slot.start_time,
+                    'end_time': slot.end_time,
+                    'capacity': slot.capacity,
+                })
+                form.is_valid()
+                form.save()
+
+        def bulk():
+            Timeslot.generate_recurring(start, end, **schedule)
+
+        self.stdout.write(f'Generating {len(slots)} timeslots over {options["days"]} days')
+        results = {name: self.measure(run) for name, run in (('per-form', per_form), ('bulk', bulk))}
+        for name, (seconds, queries) in results.items():
+            self.stdout.write(f'{name:>9}: {seconds * 1000:9.1f} ms  {queries:6d} queries')
+
+        form_seconds, _ = results['per-form']
+        bulk_seconds, _ = results['bulk']
+        if bulk_seconds:
+            self.stdout.write(self.style.SUCCESS(f'Bulk generation is {form_seconds / bulk_seconds:.1f}x faster'))
+
+    def measure(self, run):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                started = perf_counter()
+                run()
+                elapsed = perf_counter() - started
+                transaction.set_rollback(True)
+        return elapsed, len(queries)
+
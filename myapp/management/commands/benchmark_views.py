@@ -0,0 +1,247 @@
+import json
+import math
+import platform
+import warnings
+from datetime import date
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from myapp import roles, seeding
+from myapp.models import AdminProfile, BloodDonation, BloodRequest, DonorProfile, PatientProfile, Timeslot
+
+# The fixed dataset, multiplied by --scale
+VOLUMES = {
+    'donors': 2000,
+    'patients': 500,
+    'donations': 6000,
+    'requests': 1000,
+    'notifications': 20000,
+    'timeslot_days': 30,
+}
+SEED = 1
+PREFIX = 'bench'
+
+# Compared with the baseline: a scenario regresses when one of these grows
+# by more than the tolerance (latency) or at all (queries)
+LATENCY_METRICS = ('p50_ms', 'p95_ms')
+QUERY_METRICS = ('queries_max',)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    values = sorted(values)
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def summarize(samples):
+    """Aggregate [(seconds, queries, bytes, status_code)] for one scenario."""
+    latencies = [seconds * 1000 for seconds, _, _, _ in samples]
+    queries = [count for _, count, _, _ in samples]
+    sizes = [size for _, _, size, _ in samples]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for *_, status in samples if status >= 400),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(max(latencies), 3),
+        'queries_p50': percentile(queries, 50),
+        'queries_max': max(queries),
+        'bytes_p50': percentile(sizes, 50),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return a list of regression messages for scenarios present in both
+    result sets. tolerance is the allowed relative latency increase.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in LATENCY_METRICS:
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f'{name}: {metric} {previous[metric]} -> {current[metric]}')
+        for metric in QUERY_METRICS:
+            if current[metric] > previous[metric]:
+                regressions.append(f'{name}: {metric} {previous[metric]} -> {current[metric]}')
+    return regressions
+
+
+class Command(BaseCommand):
+    help = ('Drive the main views and the booking and approval flows through the test client against a fixed '
+            'seeded dataset (rolled back afterwards); report latency percentiles, queries and bytes per request')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3, help='Unmeasured requests per scenario first')
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiply the seeded dataset volumes')
+        parser.add_argument('--scenario', action='append', help='Only run these scenarios (repeatable)')
+        parser.add_argument('--output', '-o', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Compare with the results stored in this JSON file')
+        parser.add_argument('--tolerance', type=float, default=25.0,
+                            help='Allowed latency increase over the baseline, in percent')
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results to --baseline')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        baseline = None
+        if options['baseline'] and not options['save_baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)['scenarios']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f'Cannot read baseline {options["baseline"]}: {e}')
+
+        volumes = {name: int(volume * options['scale']) for name, volume in VOLUMES.items()}
+        # The approval views stamp naive datetimes; the warning would drown the report
+        warnings.filterwarnings('ignore', r'DateTimeField .* received a naive datetime', RuntimeWarning)
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), transaction.atomic():
+            self.stdout.write(f'Seeding {volumes}...')
+            seeding.seed(volumes, seed=SEED, prefix=PREFIX, today=date.today())
+            scenarios = self.scenarios()
+            wanted = options['scenario'] or list(scenarios)
+            unknown = set(wanted) - set(scenarios)
+            if unknown:
+                raise CommandError(
+                    f'Unknown scenarios: {", ".join(sorted(unknown))}. Choose from {", ".join(scenarios)}.'
+                )
+
+            results = {}
+            for name in wanted:
+                samples = self.run(scenarios[name], options['warmup'], options['requests'])
+                if samples:
+                    results[name] = summarize(samples)
+                    self.report(name, results[name])
+                else:
+                    self.stdout.write(self.style.WARNING(f'{name}: nothing left to run'))
+            transaction.set_rollback(True)
+
+        document = {
+            'meta': {
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+                'volumes': volumes,
+                'requests': options['requests'],
+            },
+            'scenarios': results,
+        }
+        for path in filter(None, [options['output'], options['save_baseline'] and options['baseline']]):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(document, f, indent=2, sort_keys=True)
+            self.stdout.write(f'Wrote {path}')
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['tolerance'] / 100)
+            for message in regressions:
+                self.stderr.write(f'REGRESSION {message}')
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}.')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}.'))
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:>18}: p50 {result["p50_ms"]:8.2f} ms  p95 {result["p95_ms"]:8.2f} ms  '
+            f'p99 {result["p99_ms"]:8.2f} ms  queries {result["queries_p50"]:>3} (max {result["queries_max"]})  '
+            f'{result["bytes_p50"]:>8} B  errors {result["errors"]}'
+        )
+
+    def run(self, scenario, warmup, count):
+        """Time scenario() requests, warmup unmeasured then up to count measured; returns the samples."""
+        samples = []
+        for index in range(warmup + count):
+            request = scenario()
+            if request is None:
+                break
+            client, method, url, data = request
+            with CaptureQueriesContext(connection) as queries:
+                started = perf_counter()
+                response = getattr(client, method)(url, data)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = perf_counter() - started
+            if index >= warmup:
+                samples.append((elapsed, len(queries), len(content), response.status_code))
+        return samples
+
+    def scenarios(self):
+        """
+        {name: next_request} where next_request() returns the next
+        (client, method, url, data) to time, or None when the scenario has
+        run out of rows to act on. Flows consume seeded rows in id order.
+        """
+        admin = User.objects.create_user(username=f'{PREFIX}-admin', password=seeding.PASSWORD)
+        admin.groups.add(Group.objects.get_or_create(name=roles.SUPER_ADMIN)[0])
+        AdminProfile.objects.create(user=admin, full_name='Benchmark Admin', employee_id=f'{PREFIX}-admin')
+        admin_client = Client()
+        admin_client.force_login(admin)
+
+        donor = DonorProfile.objects.filter(user__username__startswith=f'{PREFIX}-').order_by('id').first()
+        donor_client = Client()
+        donor_client.force_login(donor.user)
+        patient = PatientProfile.objects.filter(user__username__startswith=f'{PREFIX}-').order_by('id').first()
+        patient_client = Client()
+        patient_client.force_login(patient.user)
+
+        def page(client, url_name, *args):
+            url = reverse(url_name, args=args)
+            return lambda: (client, 'get', url, None)
+
+        def each(queryset, request):
+            rows = iter(list(queryset.order_by('id')))
+            return lambda: next((request(row) for row in rows), None)
+
+        seeded_donations = BloodDonation.objects.filter(donor__user__username__startswith=f'{PREFIX}-')
+        initial = each(
+            seeded_donations.filter(status='pending_initial').values_list('id', flat=True),
+            lambda donation_id: (admin_client, 'get', reverse('approve_donation_initial', args=[donation_id]), None),
+        )
+        final = each(
+            seeded_donations.filter(status='slot_confirmed').values_list('id', flat=True),
+            lambda donation_id: (admin_client, 'get', reverse('approve_donation_final', args=[donation_id]), None),
+        )
+        fulfil = each(
+            BloodRequest.objects.filter(patient__user__username__startswith=f'{PREFIX}-', status='pending')
+            .values_list('id', flat=True),
+            lambda request_id: (admin_client, 'get', reverse('approve_blood_request', args=[request_id]), None),
+        )
+
+        # Each booking logs in as the next donor with an initially approved donation
+        slots = Timeslot.objects.filter(is_active=True, date__gt=date.today()).order_by('date', 'start_time', 'id')
+
+        def book(donor_user):
+            client = Client()
+            client.force_login(donor_user)
+            slot = next((slot for slot in slots.all() if slot.is_available()), None)
+            if slot is None:
+                return None
+            return client, 'post', reverse('donor_dashboard'), {'booking': '1', 'timeslot': slot.id}
+
+        booking = each(
+            User.objects.filter(donor_profile__donations__in=seeded_donations.filter(status='initial_approved'))
+            .distinct(),
+            book,
+        )
+
+        return {
+            'admin_dashboard': page(admin_client, 'admin_dashboard'),
+            'blood_bank_list': page(admin_client, 'blood_bank_list'),
+            'timeslot_list': page(admin_client, 'timeslot_list'),
+            'donor_dashboard': page(donor_client, 'donor_dashboard'),
+            'patient_dashboard': page(patient_client, 'patient_dashboard'),
+            'book_timeslot': booking,
+            'approve_initial': initial,
+            'approve_final': final,
+            'fulfil_request': fulfil,
+        }
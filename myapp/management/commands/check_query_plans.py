@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from myapp.query_plans import HOT_QUERIES, explain, find_full_scans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot dashboard and allocation queries and fail on full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not just failures')
+
+    def handle(self, *args, **options):
+        if options['verbose_plans']:
+            for name, build in HOT_QUERIES.items():
+                self.stdout.write(f'--- {name}')
+                self.stdout.write(explain(build()))
+
+        failures = find_full_scans()
+        for name, plan in failures:
+            self.stdout.write(self.style.ERROR(f'{name} falls back to a full scan:'))
+            self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot query(s) use a full table scan.')
+        self.stdout.write(self.style.SUCCESS(f'All {len(HOT_QUERIES)} hot queries use an index.'))
@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from myapp.models import BloodBank
+
+
+class Command(BaseCommand):
+    help = 'Mark available and reserved blood units past their expiry date as expired (run daily from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Sweep as of this date, YYYY-MM-DD (default: today)')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('--date must be YYYY-MM-DD')
+
+        sweep, totals = BloodBank.expire_stale(today=today)
+
+        for (blood_group, status), (quantity, units) in sorted(totals.items()):
+            self.stdout.write(f'{blood_group} {status}: {units} units / {quantity} qty expired')
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {sweep.expired_units} units ({sweep.expired_quantity} qty); '
+            f'swept through {sweep.swept_through}.'
+        ))
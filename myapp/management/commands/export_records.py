@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from myapp import exports
+
+
+class Command(BaseCommand):
+    help = 'Stream donors, donations, requests, inventory or notifications as CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(exports.DATASETS))
+        parser.add_argument('--format', dest='fmt', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--start', help='Only rows on or after this date, YYYY-MM-DD')
+        parser.add_argument('--end', help='Only rows on or before this date, YYYY-MM-DD')
+        parser.add_argument('--status', help='Only rows with this status (notification type for notifications)')
+        parser.add_argument('--output', '-o', help='Write to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            lines = exports.export_lines(
+                options['dataset'],
+                options['fmt'],
+                start=exports.parse_date(options['start'], '--start'),
+                end=exports.parse_date(options['end'], '--end'),
+                status=options['status'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                count = self.write(lines, output)
+            self.stderr.write(f'Wrote {count} lines to {options["output"]}')
+        else:
+            self.write(lines, self.stdout)
+
+    def write(self, lines, output):
+        count = 0
+        for line in lines:
+            output.write(line)
+            count += 1
+        return count
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from myapp.forms import RecurringTimeslotForm
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+class Command(BaseCommand):
+    help = 'Generate a recurring schedule of donation timeslots in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='First date, YYYY-MM-DD')
+        parser.add_argument('--end', required=True, help='Last date, YYYY-MM-DD')
+        parser.add_argument('--weekdays', default='mon,tue,wed,thu,fri',
+                            help='Comma-separated days, e.g. mon,wed,fri (default: weekdays)')
+        parser.add_argument('--open', dest='opening_time', default='09:00', help='Opening time, HH:MM')
+        parser.add_argument('--close', dest='closing_time', default='17:00', help='Closing time, HH:MM')
+        parser.add_argument('--slot-minutes', type=int, default=30, help='Length of each slot in minutes')
+        parser.add_argument('--capacity', type=int, default=10, help='Appointments per slot')
+
+    def handle(self, *args, **options):
+        try:
+            weekdays = [WEEKDAYS.index(day.strip().lower()[:3]) for day in options['weekdays'].split(',')]
+        except ValueError:
+            raise CommandError(f'--weekdays must be a list drawn from {",".join(WEEKDAYS)}')
+
+        form = RecurringTimeslotForm(data={
+            'start_date': options['start'],
+            'end_date': options['end'],
+            'weekdays': weekdays,
+            'opening_time': options['opening_time'],
+            'closing_time': options['closing_time'],
+            'slot_minutes': options['slot_minutes'],
+            'capacity': options['capacity'],
+        })
+        if not form.is_valid():
+            errors = '; '.join(
+                f'{field}: {" ".join(messages)}' if field != '__all__' else ' '.join(messages)
+                for field, messages in form.errors.items()
+            )
+            raise CommandError(errors)
+
+        planned, created = form.generate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} timeslots ({planned - created} already existed).'
+        ))
@@ -0,0 +1,54 @@
+import contextlib
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from myapp import imports
+
+
+class Command(BaseCommand):
+    help = 'Bulk import donors, patients or historical donations from CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(imports.DATASETS))
+        parser.add_argument('path', help="Input file, or - for stdin")
+        parser.add_argument('--format', dest='fmt', choices=imports.FORMATS,
+                            help='Input format (default: from the file extension, else csv)')
+        parser.add_argument('--batch-size', type=int, default=imports.BATCH_SIZE)
+        parser.add_argument('--workers', type=int,
+                            help='Password hashing processes (default: one per CPU, 0 to hash in this process)')
+        parser.add_argument('--unusable-passwords', action='store_true',
+                            help='Ignore any password column; imported users must reset their password')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['fmt'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        try:
+            stream = contextlib.nullcontext(sys.stdin) if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(str(e))
+
+        read = inserted = failed = 0
+        started = time.perf_counter()
+        with stream as rows, imports.password_hasher(options['workers'], options['unusable_passwords']) as hasher:
+            batches = imports.import_batches(
+                options['dataset'], imports.read_rows(rows, fmt), hasher, options['batch_size']
+            )
+            for batch_read, batch_inserted, errors in batches:
+                read += batch_read
+                inserted += batch_inserted
+                failed += len(errors)
+                for line_number, message in errors:
+                    self.stderr.write(f'line {line_number}: {message}')
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{read} rows read, {inserted} imported ({read / elapsed:.0f} rows/s)')
+
+        elapsed = time.perf_counter() - started
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(
+            f'Imported {inserted} of {read} {options["dataset"]} rows, {failed} rejected, in {elapsed:.1f}s '
+            f'({read / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
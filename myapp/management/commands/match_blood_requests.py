@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from myapp.approvals import fulfil_pending_queue
+
+
+class Command(BaseCommand):
+    help = 'Fulfil the pending blood request queue from compatible stock in one pass over the inventory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--by-urgency',
+            action='store_true',
+            help='Serve emergency and urgent requests before routine ones (default: first come, first served)',
+        )
+
+    def handle(self, *args, **options):
+        report = fulfil_pending_queue(by_urgency=options['by_urgency'])
+
+        for result in report:
+            if result['ok']:
+                sources = ', '.join(f'{quantity} {blood_group}' for blood_group, quantity in result['allocated'].items())
+                self.stdout.write(f'Request #{result["id"]}: fulfilled ({sources})')
+            else:
+                self.stdout.write(f'Request #{result["id"]}: {result["error"]}')
+
+        fulfilled = sum(1 for result in report if result['ok'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Fulfilled {fulfilled} of {len(report)} pending requests; {len(report) - fulfilled} left pending.'
+        ))
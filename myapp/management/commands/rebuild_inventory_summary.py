@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from myapp.models import InventorySummary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the InventorySummary table from BloodBank and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify the summary; exit with an error if it has drifted',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = InventorySummary.find_drift()
+        else:
+            drift = InventorySummary.rebuild()
+
+        for blood_group, status, have, want in drift:
+            self.stdout.write(
+                f'{blood_group} {status}: stored {have[0]} qty / {have[1]} units, '
+                f'expected {want[0]} qty / {want[1]} units'
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Inventory summary matches BloodBank.'))
+        elif options['check']:
+            raise CommandError(f'Inventory summary has drifted in {len(drift)} bucket(s).')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt inventory summary, corrected {len(drift)} bucket(s).'))
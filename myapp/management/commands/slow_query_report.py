@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from myapp.slow_queries import log_path, read_log, summarize
+
+ORDERINGS = {
+    'total': lambda group: -group['total_ms'],
+    'max': lambda group: -group['max_ms'],
+    'count': lambda group: -group['count'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Summarize the slow query log by fingerprint, worst first, with the plan of the slowest run of each'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help='Slow query log to read (default: SLOW_QUERY_LOG)')
+        parser.add_argument('--top', type=int, default=10, help='Number of fingerprints to show')
+        parser.add_argument('--sort', choices=ORDERINGS, default='total', help='Rank by total, max or count')
+        parser.add_argument('--since', help='Only entries logged at or after this ISO date/time (UTC)')
+        parser.add_argument('--no-plans', action='store_true', help='Leave out the EXPLAIN plans')
+
+    def handle(self, *args, **options):
+        path = options['log'] or log_path()
+        try:
+            entries = list(read_log(path))
+        except FileNotFoundError:
+            raise CommandError(f'No slow query log at {path}.')
+        if options['since']:
+            entries = [entry for entry in entries if entry.get('time', '') >= options['since']]
+        if not entries:
+            self.stdout.write(f'No slow queries in {path}.')
+            return
+
+        groups = sorted(summarize(entries), key=ORDERINGS[options['sort']])
+        self.stdout.write(f'{len(entries)} slow queries, {len(groups)} fingerprints, in {path}')
+        for rank, group in enumerate(groups[:options['top']], 1):
+            self.stdout.write('')
+            self.stdout.write(self.style.WARNING(
+                f'#{rank} {group["fingerprint"]}: {group["count"]} runs, total {group["total_ms"]:.1f} ms, '
+                f'mean {group["mean_ms"]:.1f} ms, max {group["max_ms"]:.1f} ms, last {group["last_seen"]}'
+            ))
+            self.stdout.write(f'  {group["normalized"]}')
+            for label, key in (('views', 'views'), ('from', 'callers')):
+                if group[key]:
+                    seen = sorted(group[key].items(), key=lambda item: -item[1])
+                    self.stdout.write(f'  {label}: ' + ', '.join(f'{name} ({count})' for name, count in seen[:5]))
+            if group['plan'] and not options['no_plans']:
+                self.stdout.write('  plan:')
+                for line in group['plan'].splitlines():
+                    self.stdout.write(f'    {line}')
@@ -0,0 +1,240 @@
+"""
+Request metrics aggregated across worker processes, in the Prometheus text
+exposition format.
+
+InstrumentationMiddleware hands every request to store.observe(), which
+adds it to this process's totals per URL name: requests by method and
+status, errors (5xx), a latency histogram, a queries-per-request histogram,
+database time and response bytes. Each process writes its totals to its own
+file, <METRICS_DIR>/<pid>-<random id>.json, at most every
+METRICS_FLUSH_INTERVAL seconds (atomically, through a temporary file and a
+rename). The random id keeps a new worker that is given a dead worker's pid
+from overwriting its totals. The metrics
+endpoint merges every file, after flushing its own process, so any worker
+can answer for all of them without an external service. Other workers can
+lag by up to the flush interval.
+
+Files of workers that have exited are kept, so the totals do not go
+backwards when gunicorn recycles a worker, until they have not been
+written for METRICS_RETENTION seconds; collect() then deletes them. A live
+worker's file is cumulative, so one that was idle that long is simply
+rewritten with all its totals at its next flush.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from time import monotonic
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'bloodbank'
+
+# Upper bounds of the histogram buckets; +Inf is implied
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# Label for requests that did not resolve to a URL name (404s, static files)
+UNMATCHED = 'unmatched'
+
+
+def _directory():
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(settings.BASE_DIR, 'var', 'metrics')
+
+
+def _bucket(bounds, value):
+    """Index of the first bucket holding value; len(bounds) is +Inf."""
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+    return len(bounds)
+
+
+def _empty_view():
+    return {
+        'duration_buckets': [0] * (len(DURATION_BUCKETS) + 1),
+        'duration_sum': 0.0,
+        'query_buckets': [0] * (len(QUERY_BUCKETS) + 1),
+        'queries': 0,
+        'db_seconds': 0.0,
+        'bytes': 0,
+        'errors': 0,
+    }
+
+
+class MetricsStore:
+    """This process's totals, flushed to its file in the metrics directory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.file_name = f'{self.pid}-{uuid.uuid4().hex[:12]}.json'
+        self.views = {}
+        self.responses = {}
+        self._flushed_at = monotonic()
+
+    def observe(self, view, method, status, seconds, queries, db_seconds, size):
+        """Add one finished request."""
+        view = view or UNMATCHED
+        with self._lock:
+            if os.getpid() != self.pid:
+                # A forked worker starts from zero, not from its parent's totals
+                self._reset()
+            totals = self.views.get(view)
+            if totals is None:
+                totals = self.views[view] = _empty_view()
+            totals['duration_buckets'][_bucket(DURATION_BUCKETS, seconds)] += 1
+            totals['duration_sum'] += seconds
+            totals['query_buckets'][_bucket(QUERY_BUCKETS, queries)] += 1
+            totals['queries'] += queries
+            totals['db_seconds'] += db_seconds
+            totals['bytes'] += size
+            if status >= 500:
+                totals['errors'] += 1
+            key = (view, method, str(status))
+            self.responses[key] = self.responses.get(key, 0) + 1
+            due = monotonic() - self._flushed_at >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+        if due:
+            try:
+                self.flush()
+            except OSError:
+                # Metrics must never fail the request; try again next interval
+                logger.exception('Could not write request metrics to %s', _directory())
+                self._flushed_at = monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'views': {view: {**totals, 'duration_buckets': list(totals['duration_buckets']),
+                                 'query_buckets': list(totals['query_buckets'])}
+                          for view, totals in self.views.items()},
+                'responses': [[*key, count] for key, count in self.responses.items()],
+            }
+
+    def flush(self):
+        """Write this process's totals to its file in METRICS_DIR."""
+        data = self.snapshot()
+        directory = _directory()
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'w') as f:
+                json.dump(data, f)
+            os.replace(temporary, os.path.join(directory, self.file_name))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        with self._lock:
+            self._flushed_at = monotonic()
+
+    def collect(self):
+        """Flush, then merge the totals of every process that has written a file."""
+        self.flush()
+        directory = _directory()
+        prune(directory, getattr(settings, 'METRICS_RETENTION', 86400))
+        return merge(read_all(directory))
+
+
+def prune(directory, max_age):
+    """Delete the files in directory that have not been written for max_age seconds."""
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+        except OSError:
+            # Rewritten or deleted by another worker meanwhile
+            continue
+
+
+def read_all(directory):
+    """Yield the snapshots in directory, skipping files that cannot be read."""
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                yield json.load(f)
+        except (OSError, ValueError):
+            continue
+
+
+def merge(snapshots):
+    merged = {'views': {}, 'responses': {}}
+    for snapshot in snapshots:
+        for view, totals in snapshot['views'].items():
+            target = merged['views'].setdefault(view, _empty_view())
+            for name, value in totals.items():
+                if isinstance(value, list):
+                    target[name] = [a + b for a, b in zip(target[name], value)]
+                else:
+                    target[name] += value
+        for view, method, status, count in snapshot['responses']:
+            key = (view, method, status)
+            merged['responses'][key] = merged['responses'].get(key, 0) + count
+    return merged
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, help_text, bounds, view_buckets, view_sums):
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for view, buckets in view_buckets:
+        cumulative = 0
+        for bound, count in zip([*map(str, bounds), '+Inf'], buckets):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(view=view, le=bound)} {cumulative}')
+        lines.append(f'{name}_sum{_labels(view=view)} {view_sums[view]}')
+        lines.append(f'{name}_count{_labels(view=view)} {cumulative}')
+
+
+def _counter(lines, name, help_text, samples):
+    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    lines += [f'{name}{_labels(**labels)} {value}' for labels, value in samples]
+
+
+def render(merged):
+    """Prometheus text exposition of merged totals."""
+    views = sorted(merged['views'].items())
+    lines = []
+    _counter(lines, f'{PREFIX}_http_requests_total', 'Requests by URL name, method and status code.', [
+        ({'view': view, 'method': method, 'status': status}, count)
+        for (view, method, status), count in sorted(merged['responses'].items())
+    ])
+    _counter(lines, f'{PREFIX}_http_errors_total', 'Requests answered with a 5xx status, by URL name.', [
+        ({'view': view}, totals['errors']) for view, totals in views
+    ])
+    _histogram(
+        lines, f'{PREFIX}_http_request_duration_seconds', 'Time to produce the response, by URL name.',
+        DURATION_BUCKETS, [(view, totals['duration_buckets']) for view, totals in views],
+        {view: totals['duration_sum'] for view, totals in views},
+    )
+    _histogram(
+        lines, f'{PREFIX}_http_request_queries', 'SQL queries per request, by URL name.',
+        QUERY_BUCKETS, [(view, totals['query_buckets']) for view, totals in views],
+        {view: totals['queries'] for view, totals in views},
+    )
+    _counter(lines, f'{PREFIX}_db_seconds_total', 'Time spent in SQL queries, by URL name.', [
+        ({'view': view}, totals['db_seconds']) for view, totals in views
+    ])
+    _counter(lines, f'{PREFIX}_http_response_bytes_total', 'Response body bytes, by URL name.', [
+        ({'view': view}, totals['bytes']) for view, totals in views
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+store = MetricsStore()
@@ -0,0 +1,218 @@
+"""
+Per-request instrumentation: SQL query count and time, template render
+time and view time, sent back in a Server-Timing header, written as one
+log line per request on the myapp.requests logger and added to the
+per-view totals in metrics.py.
+
+Queries are counted by an execute wrapper that signals.py installs on
+every database connection when it is opened. It finds the current
+request's timings through a context variable, which also reaches the
+threads that run sync code under ASGI, so nothing depends on DEBUG or
+connection.queries and the cost is one timer and one counter update per
+query. Template time is measured around the Django template backend's
+render(), which render() and render_to_string() go through; a render
+nested inside another is counted once. The same SELECT with the same
+parameters run DUPLICATE_QUERY_THRESHOLD or more times in one request is
+logged as a warning, as it is usually an N+1 from a missing
+select_related() or prefetch_related().
+
+Install it right after WhiteNoiseMiddleware, so static files are not
+instrumented and the total covers the rest of the stack. The view time runs
+from the view being resolved until its response comes back through the
+inner middleware. For a streaming response the times stop when the
+response starts, not when the last chunk is sent.
+"""
+import contextlib
+import contextvars
+import functools
+import logging
+from collections import Counter
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+
+from . import metrics
+
+logger = logging.getLogger('myapp.requests')
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """What one request spent in the database, templates and its view."""
+
+    def __init__(self, origin=None):
+        # 'METHOD /path' until the URL resolves, then the view's URL name
+        self.origin = origin
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.view = None
+        self.view_started = None
+        self.statements = Counter()
+        self._rendering = 0
+
+    def record(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - started
+            self.queries += 1
+            if not many and sql[:6].upper() == 'SELECT':
+                try:
+                    self.statements[sql, tuple(params or ())] += 1
+                except TypeError:
+                    self.statements[sql, repr(params)] += 1
+
+    def duplicates(self, threshold):
+        """[(sql, count)] for identical SELECTs run at least threshold times, most repeated first."""
+        return sorted(
+            ((sql, count) for (sql, _), count in self.statements.items() if count >= threshold),
+            key=lambda item: -item[1],
+        )
+
+    def server_timing(self, total):
+        metrics = [f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+                   f'tpl;dur={self.template * 1000:.1f}']
+        if self.view is not None:
+            metrics.append(f'view;dur={self.view * 1000:.1f}')
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+def current_timings():
+    """The RequestTimings of the request being handled in this context, or None."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def untimed():
+    """Run the block outside the current request: its queries and renders are not charged to it."""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper charging the query to the current request, if any."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.record(execute, sql, params, many, context)
+
+
+def install_query_hook(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _timed_render(render):
+    @functools.wraps(render)
+    def wrapper(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None or timings._rendering:
+            return render(self, context, request)
+        timings._rendering += 1
+        started = perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            timings.template += perf_counter() - started
+            timings._rendering -= 1
+    wrapper._request_timed = True
+    return wrapper
+
+
+def _instrument_templates():
+    if not getattr(Template.render, '_request_timed', False):
+        Template.render = _timed_render(Template.render)
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = getattr(settings, 'SERVER_TIMING_HEADER', True)
+        self.duplicate_threshold = getattr(settings, 'DUPLICATE_QUERY_THRESHOLD', 2)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _instrument_templates()
+        # Connections opened before the app was ready missed connection_created
+        for connection in connections.all(initialized_only=True):
+            install_query_hook(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings(f'{request.method} {request.path}')
+        token = _current.set(timings)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings = RequestTimings(f'{request.method} {request.path}')
+        token = _current.set(timings)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current.get()
+        if timings is not None:
+            timings.origin = request.resolver_match.view_name
+            timings.view_started = perf_counter()
+
+    def finish(self, request, response, timings, started):
+        finished = perf_counter()
+        if timings.view_started is not None:
+            timings.view = finished - timings.view_started
+        total = finished - started
+        if self.header:
+            response.headers['Server-Timing'] = ', '.join(
+                filter(None, [response.headers.get('Server-Timing'), timings.server_timing(total)])
+            )
+        match = request.resolver_match
+        view = match.view_name if match else ''
+        self.log(request, response, view, timings, total)
+        metrics.store.observe(
+            view, request.method, response.status_code, total, timings.queries, timings.db,
+            0 if response.streaming else len(response.content),
+        )
+        return response
+
+    def log(self, request, response, view, timings, total):
+        duplicates = timings.duplicates(self.duplicate_threshold)
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'view_ms': round(timings.view * 1000, 1) if timings.view is not None else None,
+            'db_ms': round(timings.db * 1000, 1),
+            'queries': timings.queries,
+            'duplicate_queries': sum(count - 1 for _, count in duplicates),
+            'template_ms': round(timings.template * 1000, 1),
+        }
+        logger.info(' '.join(f'{key}={value}' for key, value in fields.items()), extra={'request_timing': fields})
+        for sql, count in duplicates:
+            logger.warning(
+                'Likely N+1: the same query ran %d times in %s %s: %s',
+                count, request.method, view or request.path, sql[:300],
+                extra={'request_timing': fields},
+            )
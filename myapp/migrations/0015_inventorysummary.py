@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:55
+
+from django.db import migrations, models
+
+
+def populate_inventory_summary(apps, schema_editor):
+    BloodBank = apps.get_model('myapp', 'BloodBank')
+    InventorySummary = apps.get_model('myapp', 'InventorySummary')
+    totals = {}
+    rows = BloodBank.objects.order_by().values('blood_group', 'status').annotate(
+        total=models.Sum('quantity'), count=models.Count('id')
+    )
+    for row in rows:
+        totals[(row['blood_group'], row['status'])] = (row['total'] or 0, row['count'])
+
+    blood_groups = ['A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-']
+    statuses = ['available', 'reserved', 'used', 'expired', 'discarded']
+    InventorySummary.objects.bulk_create([
+        InventorySummary(
+            blood_group=blood_group,
+            status=status,
+            total_quantity=totals.get((blood_group, status), (0, 0))[0],
+            unit_count=totals.get((blood_group, status), (0, 0))[1],
+        )
+        for blood_group in blood_groups
+        for status in statuses
+    ])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0014_auto_20251029_0119'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blood_group', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('O+', 'O+'), ('O-', 'O-'), ('AB+', 'AB+'), ('AB-', 'AB-')], max_length=3)),
+                ('status', models.CharField(choices=[('available', 'Available'), ('reserved', 'Reserved'), ('used', 'Used'), ('expired', 'Expired'), ('discarded', 'Discarded')], max_length=20)),
+                ('total_quantity', models.IntegerField(default=0, help_text='Sum of unit quantities in this bucket')),
+                ('unit_count', models.IntegerField(default=0, help_text='Number of BloodBank rows in this bucket')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Inventory Summary',
+                'verbose_name_plural': 'Inventory Summaries',
+                'ordering': ['blood_group', 'status'],
+                'unique_together': {('blood_group', 'status')},
+            },
+        ),
+        migrations.RunPython(populate_inventory_summary, migrations.RunPython.noop),
+    ]
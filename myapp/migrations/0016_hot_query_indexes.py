@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0015_inventorysummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bloodbank',
+            index=models.Index(fields=['blood_group', 'status', 'expiry_date'], name='unit_group_status_exp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodbank',
+            index=models.Index(condition=models.Q(('status', 'available')), fields=['blood_group', 'expiry_date'], name='unit_available_exp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodbank',
+            index=models.Index(fields=['created_at', 'id'], name='unit_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blooddonation',
+            index=models.Index(fields=['donor', 'status'], name='donation_donor_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blooddonation',
+            index=models.Index(fields=['status', 'created_at'], name='donation_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(fields=['status', 'created_at'], name='request_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['created_at', 'id'], name='donor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', 'created_at'], name='notif_recipient_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientprofile',
+            index=models.Index(fields=['created_at', 'id'], name='patient_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(fields=['is_active', 'date'], name='timeslot_active_date_idx'),
+        ),
+    ]
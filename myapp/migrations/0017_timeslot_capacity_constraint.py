@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+def raise_capacity_to_bookings(apps, schema_editor):
+    # Slots that were already overbooked keep their bookings; their capacity
+    # is raised to match so the constraint can be added.
+    Timeslot = apps.get_model('myapp', 'Timeslot')
+    Timeslot.objects.filter(booked_count__gt=models.F('capacity')).update(capacity=models.F('booked_count'))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0016_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(raise_capacity_to_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='timeslot',
+            constraint=models.CheckConstraint(condition=models.Q(('booked_count__lte', models.F('capacity'))), name='timeslot_booked_within_capacity'),
+        ),
+    ]
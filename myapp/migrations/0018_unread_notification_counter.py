@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_unread_counters(apps, schema_editor):
+    Notification = apps.get_model('myapp', 'Notification')
+    UnreadNotificationCounter = apps.get_model('myapp', 'UnreadNotificationCounter')
+    counts = (
+        Notification.objects.filter(is_read=False).order_by().values('recipient_id')
+        .annotate(total=models.Count('id'))
+    )
+    UnreadNotificationCounter.objects.bulk_create([
+        UnreadNotificationCounter(user_id=row['recipient_id'], unread=row['total'])
+        for row in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('myapp', '0017_timeslot_capacity_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadNotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Unread Notification Counter',
+                'verbose_name_plural': 'Unread Notification Counters',
+            },
+        ),
+        migrations.RunPython(populate_unread_counters, migrations.RunPython.noop),
+    ]
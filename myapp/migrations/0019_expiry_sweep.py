@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0018_unread_notification_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpirySweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('swept_through', models.DateField(help_text='Units expiring on or before this date have been swept')),
+                ('expired_units', models.PositiveIntegerField(default=0)),
+                ('expired_quantity', models.PositiveIntegerField(default=0)),
+                ('ran_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Expiry Sweep',
+                'verbose_name_plural': 'Expiry Sweeps',
+                'ordering': ['-ran_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bloodbank',
+            index=models.Index(fields=['status', 'expiry_date'], name='unit_status_exp_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0019_expiry_sweep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='urgency',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Routine'), (1, 'Urgent'), (2, 'Emergency')], default=0, help_text='Higher urgency is matched first when the queue is fulfilled by urgency'),
+        ),
+    ]
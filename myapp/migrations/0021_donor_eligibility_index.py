@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0020_blood_request_urgency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['blood_group', 'next_eligible_date'], name='donor_group_eligible_idx'),
+        ),
+    ]
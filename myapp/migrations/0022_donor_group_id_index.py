@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 05:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0021_donor_eligibility_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['blood_group', 'id'], name='donor_group_id_idx'),
+        ),
+    ]
@@ -1,8 +1,45 @@
-from django.db import models
+from datetime import datetime, timedelta
+
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from . import caching, live, roles
 
 # Create your models here.
 
+class InsufficientBloodUnits(Exception):
+    """
+    Raised when the blood bank cannot cover a requested quantity.
+    """
+
+    def __init__(self, blood_group, requested, available):
+        self.blood_group = blood_group
+        self.requested = requested
+        self.available = available
+        super().__init__(
+            f'Insufficient blood units available. Requested: {requested}, Available: {available}'
+        )
+
+
+class BookingError(Exception):
+    """
+    Raised when a donation cannot be booked into a timeslot.
+    """
+
+
+class TimeslotFull(BookingError):
+    """
+    Raised when a timeslot is inactive or has no capacity left.
+    """
+
+    def __init__(self, timeslot):
+        self.timeslot = timeslot
+        super().__init__(f'The timeslot on {timeslot.date} at {timeslot.start_time} is fully booked.')
+
+
 class DonorProfile(models.Model):
     """
     Profile model for blood donors extending Django's User model.
@@ -50,6 +87,14 @@ class DonorProfile(models.Model):
         verbose_name = "Donor Profile"
         verbose_name_plural = "Donor Profiles"
         ordering = ['-created_at']
+        indexes = [
+            # Dashboard keyset pages
+            models.Index(fields=['created_at', 'id'], name='donor_created_idx'),
+            # Eligible donors of a blood group (recruitment.eligible_donors)
+            models.Index(fields=['blood_group', 'next_eligible_date'], name='donor_group_eligible_idx'),
+            # Eligible donor pages, by id within a group (recruitment.eligible_donor_page)
+            models.Index(fields=['blood_group', 'id'], name='donor_group_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.full_name} ({self.user.username}) - {self.blood_group}"
@@ -117,6 +162,10 @@ class PatientProfile(models.Model):
         verbose_name = "Patient Profile"
         verbose_name_plural = "Patient Profiles"
         ordering = ['-created_at']
+        indexes = [
+            # Dashboard keyset pages
+            models.Index(fields=['created_at', 'id'], name='patient_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.full_name} ({self.user.username}) - {self.blood_group}"
@@ -166,10 +215,10 @@ class AdminProfile(models.Model):
     def save(self, *args, **kwargs):
         # Always sync admin type based on user's current groups and superuser status
         # This ensures flags are always up to date
-        if self.user.is_superuser or self.user.groups.filter(name='Super Admin').exists():
+        if roles.is_super_admin(self.user):
             self.is_super_admin = True
             self.is_secondary_admin = False
-        elif self.user.groups.filter(name='Secondary Admin').exists():
+        elif roles.in_group(self.user, roles.SECONDARY_ADMIN):
             self.is_super_admin = False
             self.is_secondary_admin = True
         else:
@@ -203,6 +252,15 @@ class BloodRequest(models.Model):
         ],
         default='pending'
     )
+    urgency = models.PositiveSmallIntegerField(
+        choices=[
+            (0, 'Routine'),
+            (1, 'Urgent'),
+            (2, 'Emergency'),
+        ],
+        default=0,
+        help_text="Higher urgency is matched first when the queue is fulfilled by urgency"
+    )
     # Link to the donor who fulfilled the request
     donor = models.ForeignKey(
         DonorProfile,
@@ -214,6 +272,12 @@ class BloodRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Pending request queue, newest first
+            models.Index(fields=['status', 'created_at'], name='request_status_created_idx'),
+        ]
+
     def __str__(self):
         return f"Request from {self.patient.full_name} for {self.quantity} units of {self.blood_group}"
 
@@ -234,6 +298,16 @@ class Timeslot(models.Model):
         verbose_name_plural = "Timeslots"
         ordering = ['date', 'start_time']
         unique_together = ['date', 'start_time']
+        indexes = [
+            # Bookable slots from today onwards
+            models.Index(fields=['is_active', 'date'], name='timeslot_active_date_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(booked_count__lte=F('capacity')),
+                name='timeslot_booked_within_capacity',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.date} {self.start_time}-{self.end_time} ({self.booked_count}/{self.capacity})"
@@ -249,6 +323,112 @@ class Timeslot(models.Model):
     def is_available(self):
         return self.is_active and self.available_slots > 0
 
+    @classmethod
+    def recurring_schedule(cls, start_date, end_date, weekdays, opening_time, closing_time, slot_minutes, capacity):
+        """
+        Yield unsaved timeslots for a recurring weekly schedule.
+
+        weekdays uses date.weekday() numbering (Monday is 0). Each open day is
+        cut into back-to-back slots of slot_minutes; a trailing slot that would
+        run past closing_time is dropped.
+        """
+        weekdays = set(weekdays)
+        length = timedelta(minutes=slot_minutes)
+        day = start_date
+        while day <= end_date:
+            if day.weekday() in weekdays:
+                start = datetime.combine(day, opening_time)
+                closing = datetime.combine(day, closing_time)
+                while start + length <= closing:
+                    yield cls(
+                        date=day,
+                        start_time=start.time(),
+                        end_time=(start + length).time(),
+                        capacity=capacity,
+                    )
+                    start += length
+            day += timedelta(days=1)
+
+    @classmethod
+    def generate_recurring(cls, start_date, end_date, weekdays, opening_time, closing_time,
+                           slot_minutes, capacity, batch_size=1000):
+        """
+        Create every slot of a recurring schedule with bulk INSERTs.
+
+        Slots whose (date, start_time) already exists are skipped by the
+        database through ignore_conflicts, so running the same schedule twice
+        is harmless and existing bookings are never touched. Returns
+        (planned, created).
+        """
+        slots = list(cls.recurring_schedule(
+            start_date, end_date, weekdays, opening_time, closing_time, slot_minutes, capacity
+        ))
+        in_range = cls.objects.filter(date__range=(start_date, end_date))
+        with transaction.atomic():
+            before = in_range.count()
+            cls.objects.bulk_create(slots, batch_size=batch_size, ignore_conflicts=True)
+            created = in_range.count() - before
+            caching.bump(Timeslot)
+        return len(slots), created
+
+    def reschedule(self):
+        """
+        Save the date, times and capacity with one conditional UPDATE that
+        leaves booked_count alone and only applies while the bookings still
+        fit the new capacity. Returns False, with booked_count refreshed,
+        if a booking made since the slot was loaded no longer fits.
+        """
+        updated = Timeslot.objects.filter(pk=self.pk, booked_count__lte=self.capacity).update(
+            date=self.date, start_time=self.start_time, end_time=self.end_time, capacity=self.capacity,
+        )
+        self.refresh_from_db(fields=['booked_count'])
+        if updated:
+            caching.bump(Timeslot)
+        return bool(updated)
+
+    def book(self, donation):
+        """
+        Book an initially approved donation into this timeslot.
+
+        The seat is claimed with a single conditional UPDATE, so concurrent
+        bookings can never push booked_count past capacity. The donation is
+        linked and the donor notified in the same transaction; if any step
+        fails nothing changes.
+        Raises TimeslotFull when no seat is left and BookingError when the
+        donation is no longer waiting for a slot.
+        """
+        with transaction.atomic():
+            claimed = Timeslot.objects.filter(
+                pk=self.pk,
+                is_active=True,
+                booked_count__lt=F('capacity'),
+            ).update(booked_count=F('booked_count') + 1)
+            if not claimed:
+                raise TimeslotFull(self)
+
+            linked = BloodDonation.objects.filter(pk=donation.pk, status='initial_approved').update(
+                timeslot=self,
+                status='slot_confirmed',
+                appointment_date=self.date,
+                updated_at=timezone.now(),
+            )
+            if not linked:
+                raise BookingError('This donation is not awaiting an appointment.')
+            caching.bump(Timeslot, BloodDonation)
+
+            Notification.objects.create(
+                recipient_id=donation.donor.user_id,
+                title='Appointment Booked',
+                message=f'Your appointment for {self.date} at {self.start_time} is confirmed. '
+                        'Awaiting final admin approval.',
+                notification_type='appointment',
+                related_donation=donation,
+            )
+
+        self.refresh_from_db(fields=['booked_count'])
+        donation.refresh_from_db(fields=['timeslot', 'status', 'appointment_date', 'updated_at'])
+        return donation
+
 
 class BloodDonation(models.Model):
     """
@@ -296,6 +476,12 @@ class BloodDonation(models.Model):
         verbose_name = "Blood Donation"
         verbose_name_plural = "Blood Donations"
         ordering = ['-created_at']
+        indexes = [
+            # A donor's donations in a given workflow state
+            models.Index(fields=['donor', 'status'], name='donation_donor_status_idx'),
+            # Pending approval queues, newest first
+            models.Index(fields=['status', 'created_at'], name='donation_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"Donation from {self.donor.full_name} of {self.quantity} units on {self.donation_date}"
@@ -337,10 +523,133 @@ class BloodBank(models.Model):
         verbose_name = "Blood Bank Unit"
         verbose_name_plural = "Blood Bank Units"
         ordering = ['-storage_date']
+        indexes = [
+            # FIFO allocation: units of a group in a status, soonest expiry first
+            models.Index(fields=['blood_group', 'status', 'expiry_date'], name='unit_group_status_exp_idx'),
+            # Same lookup restricted to available stock (partial where supported)
+            models.Index(
+                fields=['blood_group', 'expiry_date'],
+                condition=Q(status='available'),
+                name='unit_available_exp_idx',
+            ),
+            # Dashboard keyset pages
+            models.Index(fields=['created_at', 'id'], name='unit_created_idx'),
+            # Expiry sweep: units still in stock whose expiry date has passed
+            models.Index(fields=['status', 'expiry_date'], name='unit_status_exp_idx'),
+        ]
+
+    EXPIRABLE_STATUSES = ('available', 'reserved')
 
     def __str__(self):
         return f"{self.blood_group} - {self.quantity} units (Stored: {self.storage_date})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored inventory bucket so save() can move the
+        # difference between InventorySummary rows.
+        instance._inventory_state = instance._current_inventory_state()
+        return instance
+
+    def _current_inventory_state(self):
+        """Return (blood_group, status, quantity), or None if any field is deferred."""
+        fields = ('blood_group', 'status', 'quantity')
+        if any(name not in self.__dict__ for name in fields):
+            return None
+        return tuple(self.__dict__[name] for name in fields)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self._state.adding:
+                previous = None
+            else:
+                previous = getattr(self, '_inventory_state', None)
+                if previous is None:
+                    previous = type(self).objects.filter(pk=self.pk).values_list(
+                        'blood_group', 'status', 'quantity'
+                    ).first()
+            super().save(*args, **kwargs)
+            current = self._current_inventory_state()
+            InventorySummary.record_change(previous, current)
+            self._inventory_state = current
+
+    @classmethod
+    def bulk_add(cls, units, batch_size=None):
+        """
+        Insert units with one bulk INSERT and move their totals into
+        InventorySummary with one F() update per touched bucket.
+        """
+        totals = {}
+        for unit in units:
+            quantity, count = totals.get((unit.blood_group, unit.status), (0, 0))
+            totals[(unit.blood_group, unit.status)] = (quantity + unit.quantity, count + 1)
+        with transaction.atomic():
+            created = cls.objects.bulk_create(units, batch_size=batch_size)
+            for (blood_group, status), (quantity, count) in totals.items():
+                InventorySummary.apply_delta(blood_group, status, quantity, count)
+        return created
+
+    @classmethod
+    def stale_units(cls, today):
+        """Units still in stock (available or reserved) that expire on or before today."""
+        return cls.objects.filter(status__in=cls.EXPIRABLE_STATUSES, expiry_date__lte=today)
+
+    @classmethod
+    def past_expiry(cls, today):
+        """Units past their date: expired by a sweep, or stale_units() not swept yet."""
+        return cls.objects.filter(status='expired') | cls.stale_units(today)
+
+    @property
+    def is_past_expiry(self):
+        """Whether this unit is in past_expiry() today."""
+        return self.status == 'expired' or (
+            self.status in self.EXPIRABLE_STATUSES and self.expiry_date <= timezone.localdate()
+        )
+
+    @classmethod
+    def expire_stale(cls, today=None):
+        """
+        Mark stale units as expired with one UPDATE and move their totals
+        from the available/reserved buckets of InventorySummary to expired.
+
+        Expired units leave the in-stock statuses, so the (status,
+        expiry_date) index range behind stale_units() holds only the units
+        no sweep has reached, whatever their expiry date: each run touches
+        the units that expired since the last one, including units added
+        with an expiry date already behind the previous sweep, and running
+        twice on the same day changes nothing.
+
+        Returns the recorded ExpirySweep and the moved totals as
+        {(blood_group, previous_status): (quantity, units)}.
+        """
+        today = today or timezone.localdate()
+        with transaction.atomic():
+            rows = list(
+                cls.stale_units(today).select_for_update().order_by()
+                .values_list('id', 'blood_group', 'status', 'quantity')
+            )
+            totals = {}
+            for _, blood_group, status, quantity in rows:
+                total, count = totals.get((blood_group, status), (0, 0))
+                totals[(blood_group, status)] = (total + quantity, count + 1)
+
+            if rows:
+                # The rows are locked; units inserted since the read have
+                # higher ids and are left for the next sweep.
+                cls.stale_units(today).filter(id__lte=max(row[0] for row in rows)).update(
+                    status='expired', updated_at=timezone.now()
+                )
+                for (blood_group, status), (quantity, count) in totals.items():
+                    InventorySummary.apply_delta(blood_group, status, -quantity, -count)
+                    InventorySummary.apply_delta(blood_group, 'expired', quantity, count)
+
+            sweep = ExpirySweep.objects.create(
+                swept_through=today,
+                expired_units=len(rows),
+                expired_quantity=sum(quantity for quantity, _ in totals.values()),
+            )
+        return sweep, totals
+
     @classmethod
     def get_available_units(cls, blood_group, quantity_needed=1):
         """
@@ -355,44 +664,216 @@ class BloodBank(models.Model):
         ).order_by('expiry_date')  # FIFO - First In, First Out
 
     @classmethod
-    def check_availability(cls, blood_group, quantity_needed):
+    def availability_by_group(cls, today):
         """
-        Check if sufficient blood units are available for a blood group.
-        Returns (is_available, available_quantity)
+        In-date available stock of every blood group, with one aggregate
+        query: [{'blood_group', 'available_quantity', 'units', 'soonest_expiry'}].
+        Groups without stock are listed with zeros and no expiry date.
         """
-        available_units = cls.get_available_units(blood_group)
-        total_available = sum(unit.quantity for unit in available_units)
-        return total_available >= quantity_needed, total_available
+        rows = {
+            row['blood_group']: row
+            for row in cls.objects.filter(status='available', expiry_date__gt=today).order_by()
+            .values('blood_group').annotate(
+                quantity=models.Sum('quantity'), units=models.Count('id'), soonest=models.Min('expiry_date'),
+            )
+        }
+        availability = []
+        for blood_group, _ in DonorProfile.blood_group.field.choices:
+            row = rows.get(blood_group, {})
+            availability.append({
+                'blood_group': blood_group,
+                'available_quantity': row.get('quantity') or 0,
+                'units': row.get('units', 0),
+                'soonest_expiry': row.get('soonest'),
+            })
+        return availability
+
+
+class ExpirySweep(models.Model):
+    """
+    One run of BloodBank.expire_stale(). The latest swept_through date is the
+    watermark: units in stock then and expiring on or before it have been
+    expired.
+    """
+    swept_through = models.DateField(help_text="Units expiring on or before this date have been swept")
+    expired_units = models.PositiveIntegerField(default=0)
+    expired_quantity = models.PositiveIntegerField(default=0)
+    ran_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Expiry Sweep"
+        verbose_name_plural = "Expiry Sweeps"
+        ordering = ['-ran_at']
+
+    def __str__(self):
+        return f"Swept through {self.swept_through}: {self.expired_units} units expired"
 
     @classmethod
-    def deduct_units(cls, blood_group, quantity_needed):
+    def watermark(cls):
+        """The latest swept_through date, or None before the first sweep."""
+        return cls.objects.order_by('-swept_through').values_list('swept_through', flat=True).first()
+
+
+class InventorySummary(models.Model):
+    """
+    Materialized totals of BloodBank units per blood group and status.
+    Kept in sync by BloodBank.save()/delete and by the bulk inventory paths.
+    """
+    blood_group = models.CharField(max_length=3, choices=DonorProfile.blood_group.field.choices)
+    status = models.CharField(max_length=20, choices=BloodBank.status.field.choices)
+    total_quantity = models.IntegerField(default=0, help_text="Sum of unit quantities in this bucket")
+    unit_count = models.IntegerField(default=0, help_text="Number of BloodBank rows in this bucket")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Inventory Summary"
+        verbose_name_plural = "Inventory Summaries"
+        ordering = ['blood_group', 'status']
+        unique_together = ['blood_group', 'status']
+
+    def __str__(self):
+        return f"{self.blood_group} {self.status}: {self.total_quantity} ({self.unit_count} units)"
+
+    @classmethod
+    def apply_delta(cls, blood_group, status, quantity, units):
         """
-        Deduct blood units from inventory using FIFO method.
-        Returns the number of units actually deducted.
+        Add quantity/units to a single bucket with an F() update, creating
+        the row the first time the bucket is touched.
         """
-        from datetime import date
-        available_units = cls.get_available_units(blood_group)
-        units_deducted = 0
-        remaining_need = quantity_needed
-
-        for unit in available_units:
-            if remaining_need <= 0:
-                break
-
-            if unit.quantity <= remaining_need:
-                # Use entire unit
-                units_deducted += unit.quantity
-                remaining_need -= unit.quantity
-                unit.status = 'used'
-                unit.save()
-            else:
-                # Split unit - use what's needed
-                units_deducted += remaining_need
-                unit.quantity -= remaining_need
-                unit.save()
-                remaining_need = 0
+        if not quantity and not units:
+            return
+        # Every bulk change to the units passes through here
+        caching.bump(BloodBank)
+        updated = cls.objects.filter(blood_group=blood_group, status=status).update(
+            total_quantity=F('total_quantity') + quantity,
+            unit_count=F('unit_count') + units,
+        )
+        if not updated:
+            cls.objects.get_or_create(blood_group=blood_group, status=status)
+            cls.objects.filter(blood_group=blood_group, status=status).update(
+                total_quantity=F('total_quantity') + quantity,
+                unit_count=F('unit_count') + units,
+            )
+
+    @classmethod
+    def record_change(cls, previous, current):
+        """
+        Move a unit between buckets. previous/current are
+        (blood_group, status, quantity) tuples, or None for create/delete.
+        """
+        if previous == current:
+            return
+        if previous is not None:
+            cls.apply_delta(previous[0], previous[1], -previous[2], -1)
+        if current is not None:
+            cls.apply_delta(current[0], current[1], current[2], 1)
+
+    @classmethod
+    def available_totals(cls, blood_groups=None, today=None):
+        """
+        {blood_group: (quantity, units)} of in-date available stock, for the
+        given groups or all of them. The available bucket still holds units
+        that expired since the last expiry sweep, so those are taken off
+        with a second aggregate over the (status, expiry_date) index, which
+        only reads the unswept rows.
+        """
+        today = today or timezone.localdate()
+        buckets = cls.objects.filter(status='available')
+        stale = BloodBank.objects.filter(status='available', expiry_date__lte=today)
+        if blood_groups is not None:
+            buckets = buckets.filter(blood_group__in=blood_groups)
+            stale = stale.filter(blood_group__in=blood_groups)
+        totals = {
+            blood_group: (quantity, units)
+            for blood_group, quantity, units in buckets.values_list('blood_group', 'total_quantity', 'unit_count')
+        }
+        for row in stale.order_by().values('blood_group').annotate(
+            quantity=models.Sum('quantity'), units=models.Count('id')
+        ):
+            quantity, units = totals.get(row['blood_group'], (0, 0))
+            totals[row['blood_group']] = (quantity - row['quantity'], units - row['units'])
+        return totals
 
-        return units_deducted
+    @classmethod
+    def available_quantity(cls, blood_group, today=None):
+        """Return the total in-date available quantity for a blood group."""
+        return cls.available_totals([blood_group], today).get(blood_group, (0, 0))[0]
+
+    @classmethod
+    def available_by_group(cls, today=None):
+        """Return {blood_group: unit_count} for groups with in-date available units."""
+        return {
+            blood_group: units
+            for blood_group, (_, units) in cls.available_totals(today=today).items()
+            if units > 0
+        }
+
+    @classmethod
+    def compute_from_units(cls):
+        """
+        Aggregate the raw BloodBank table.
+        Returns {(blood_group, status): (total_quantity, unit_count)}.
+        """
+        rows = BloodBank.objects.order_by().values('blood_group', 'status').annotate(
+            total=models.Sum('quantity'), count=models.Count('id')
+        )
+        return {
+            (row['blood_group'], row['status']): (row['total'] or 0, row['count'])
+            for row in rows
+        }
+
+    @classmethod
+    def _diff(cls, stored, expected):
+        drift = []
+        for blood_group, _ in DonorProfile.blood_group.field.choices:
+            for status, _ in BloodBank.status.field.choices:
+                have = stored.get((blood_group, status), (0, 0))
+                want = expected.get((blood_group, status), (0, 0))
+                if have != want:
+                    drift.append((blood_group, status, have, want))
+        return drift
+
+    @classmethod
+    def find_drift(cls):
+        """
+        Compare stored buckets with the raw BloodBank table without writing.
+        Returns a list of (blood_group, status, stored, expected) tuples.
+        """
+        stored = {
+            (row.blood_group, row.status): (row.total_quantity, row.unit_count)
+            for row in cls.objects.all()
+        }
+        return cls._diff(stored, cls.compute_from_units())
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every bucket from BloodBank inside one transaction and
+        return the drift that was corrected.
+        """
+        with transaction.atomic():
+            # Lock the summary rows first so concurrent deltas queue up behind
+            # the rebuild instead of being overwritten by it.
+            rows = {
+                (row.blood_group, row.status): row
+                for row in cls.objects.select_for_update()
+            }
+            expected = cls.compute_from_units()
+            stored = {key: (row.total_quantity, row.unit_count) for key, row in rows.items()}
+            drift = cls._diff(stored, expected)
+            for blood_group, status, have, want in drift:
+                row = rows.get((blood_group, status))
+                if row is None:
+                    cls.objects.create(
+                        blood_group=blood_group, status=status,
+                        total_quantity=want[0], unit_count=want[1],
+                    )
+                else:
+                    row.total_quantity, row.unit_count = want
+                    row.save(update_fields=['total_quantity', 'unit_count', 'updated_at'])
+            if drift:
+                caching.bump(BloodBank)
+        return drift
 
 
 class Notification(models.Model):
@@ -424,7 +905,169 @@ class Notification(models.Model):
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
         ordering = ['-created_at']
+        indexes = [
+            # A user's unread notifications, newest first
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='notif_recipient_unread_idx'),
+        ]
 
     def __str__(self):
         return f"Notification to {self.recipient.username}: {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember who the stored row counted against so save() can move the
+        # difference in UnreadNotificationCounter.
+        instance._unread_state = instance._current_unread_state()
+        return instance
+
+    def _current_unread_state(self):
+        """Return (recipient_id, is_read), or None if either field is deferred."""
+        if 'recipient_id' not in self.__dict__ or 'is_read' not in self.__dict__:
+            return None
+        return self.recipient_id, self.is_read
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self._state.adding:
+                previous = None
+            else:
+                previous = getattr(self, '_unread_state', None)
+                if previous is None:
+                    previous = type(self).objects.filter(pk=self.pk).values_list('recipient_id', 'is_read').first()
+            super().save(*args, **kwargs)
+            current = self._current_unread_state()
+            UnreadNotificationCounter.record_change(previous, current)
+            self._unread_state = current
+
+    @classmethod
+    def bulk_notify(cls, notifications):
+        """
+        Insert notifications with one bulk INSERT, bump the recipients'
+        unread counters together and push them to open live streams after
+        commit. Backends that do not return primary keys from bulk inserts
+        (MySQL) leave the push to the stream poller.
+        """
+        deltas = {}
+        for notification in notifications:
+            if not notification.is_read:
+                deltas[notification.recipient_id] = deltas.get(notification.recipient_id, 0) + 1
+        with transaction.atomic():
+            created = cls.objects.bulk_create(notifications)
+            UnreadNotificationCounter.apply_deltas(deltas)
+            payloads = [
+                (notification.recipient_id, live.serialize(notification))
+                for notification in created if notification.pk is not None
+            ]
+            if payloads:
+                transaction.on_commit(lambda: [live.hub.publish(*payload) for payload in payloads])
+        return created
+
+    @classmethod
+    def mark_read(cls, user, ids=None):
+        """
+        Mark the user's unread notifications (or just `ids`) as read with one
+        UPDATE and move the counter by the number of rows changed. Returns
+        that number.
+        """
+        unread = cls.objects.filter(recipient=user, is_read=False)
+        if ids is not None:
+            unread = unread.filter(id__in=ids)
+        with transaction.atomic():
+            changed = unread.update(is_read=True, updated_at=timezone.now())
+            UnreadNotificationCounter.apply_delta(user.pk, -changed)
+        return changed
+
+
+class UnreadNotificationCounter(models.Model):
+    """
+    Denormalized count of each user's unread notifications, so the badge is
+    a primary-key lookup. Kept in sync by Notification.save()/delete and
+    Notification.mark_read(); a missing row means zero.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='unread_notification_counter')
+    unread = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Unread Notification Counter"
+        verbose_name_plural = "Unread Notification Counters"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
+    @classmethod
+    def apply_delta(cls, user_id, delta):
+        """
+        Move a user's counter by delta with an F() update. The row is only
+        created for increments, so deletes cascading from a removed user
+        never recreate it; decrements stop at zero.
+        """
+        if not delta:
+            return
+        if delta > 0:
+            unread = F('unread') + delta
+        else:
+            unread = Greatest(F('unread') + delta, 0)
+        now = timezone.now()
+        updated = cls.objects.filter(user_id=user_id).update(unread=unread, updated_at=now)
+        if not updated and delta > 0:
+            cls.objects.get_or_create(user_id=user_id)
+            cls.objects.filter(user_id=user_id).update(unread=unread, updated_at=now)
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        Apply {user_id: delta} increments for many users at once: create the
+        missing rows with one INSERT and move every counter with one
+        UPDATE ... CASE, whatever the number of users.
+        """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta > 0}
+        if not deltas:
+            return
+        cls.objects.bulk_create([cls(user_id=user_id) for user_id in deltas], ignore_conflicts=True)
+        cls.objects.filter(user_id__in=deltas).update(
+            unread=F('unread') + Case(
+                *[When(user_id=user_id, then=Value(delta)) for user_id, delta in deltas.items()],
+                default=Value(0),
+                output_field=models.PositiveIntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def record_change(cls, previous, current):
+        """
+        Apply the change between two (recipient_id, is_read) states; either
+        may be None for a created or deleted notification.
+        """
+        if previous == current:
+            return
+        if previous is not None and not previous[1]:
+            cls.apply_delta(previous[0], -1)
+        if current is not None and not current[1]:
+            cls.apply_delta(current[0], 1)
+
+    @classmethod
+    def count_for(cls, user):
+        """Return the user's unread count with a single primary-key lookup."""
+        if not user.is_authenticated:
+            return 0
+        return cls.objects.filter(user_id=user.pk).values_list('unread', flat=True).first() or 0
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every user's unread notifications from the Notification table."""
+        counts = dict(
+            Notification.objects.filter(is_read=False).order_by().values('recipient_id')
+            .annotate(total=models.Count('id')).values_list('recipient_id', 'total')
+        )
+        with transaction.atomic():
+            stored = dict(cls.objects.select_for_update().values_list('user_id', 'unread'))
+            for user_id, unread in stored.items():
+                if counts.get(user_id, 0) != unread:
+                    cls.objects.filter(user_id=user_id).update(unread=counts.get(user_id, 0))
+            cls.objects.bulk_create([
+                cls(user_id=user_id, unread=total) for user_id, total in counts.items() if user_id not in stored
+            ])
+
@@ -0,0 +1,100 @@
+"""
+Keyset (cursor) pagination for the dashboard tables.
+
+Pages are selected with a WHERE clause on the ordering columns instead of
+OFFSET, so fetching page N costs the same as fetching page 1.
+"""
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+
+from django.db.models import Q
+
+
+def _serialize(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(values):
+    """Encode the ordering values of the last row on a page."""
+    payload = json.dumps([_serialize(value) for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor; returns None if it is invalid."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _after(ordering, values):
+    """Build the Q that selects rows strictly after `values` in `ordering`."""
+    clauses = []
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        conditions = {ordering[i].lstrip('-'): values[i] for i in range(index)}
+        conditions[f'{name}__{lookup}'] = values[index]
+        clauses.append(Q(**conditions))
+    return reduce(lambda left, right: left | right, clauses)
+
+
+def search(queryset, fields, term):
+    """Filter queryset to rows where any of `fields` contains `term`."""
+    term = (term or '').strip()
+    if not term or not fields:
+        return queryset
+    return queryset.filter(
+        reduce(lambda left, right: left | right, (Q(**{f'{field}__icontains': term}) for field in fields))
+    )
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=25):
+    """
+    Return (rows, next_cursor) for the page after `cursor`.
+
+    `ordering` must end in a unique column (normally 'id' or '-id') so the
+    sort order is total. next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(cursor)
+    if values is not None and len(values) == len(ordering):
+        queryset = queryset.filter(_after(ordering, values))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, field.lstrip('-')) for field in ordering])
+    return rows, next_cursor
+
+
+def keyset_values(queryset, fields, ordering=('id',), chunk_size=2000):
+    """
+    Yield values_list() tuples of `fields` for every row, reading keyset
+    batches of chunk_size. Unlike iterator(), this never asks the database
+    driver to buffer the whole result (MySQL drivers do), so memory stays
+    flat however many rows there are.
+    """
+    names = [field.lstrip('-') for field in ordering]
+    columns = list(fields) + [name for name in names if name not in fields]
+    positions = [columns.index(name) for name in names]
+    queryset = queryset.order_by(*ordering)
+    batch = queryset
+    while True:
+        rows = list(batch.values_list(*columns)[:chunk_size])
+        for row in rows:
+            yield row[:len(fields)]
+        if len(rows) < chunk_size:
+            return
+        batch = queryset.filter(_after(ordering, [rows[-1][position] for position in positions]))
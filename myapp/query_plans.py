@@ -0,0 +1,106 @@
+"""
+EXPLAIN checks for the hot queries behind the dashboards and workflows.
+
+Each entry builds the same queryset the application runs, so a missing or
+unusable index shows up as a full table scan in its plan.
+"""
+import json
+from datetime import date, timedelta
+
+from . import allocation, recruitment
+from .models import BloodBank, BloodDonation, BloodRequest, DonorProfile, Notification, Timeslot
+
+
+HOT_QUERIES = {
+    'available_units_fifo': lambda: BloodBank.get_available_units('O+').order_by('expiry_date', 'id'),
+    'compatible_units': lambda: allocation.candidate_units('A+')[:4],
+    'donor_donations_by_status': lambda: BloodDonation.objects.filter(donor_id=1, status='initial_approved'),
+    'pending_donations_queue': lambda: BloodDonation.objects.filter(
+        status__in=['pending_initial', 'slot_confirmed']).order_by('-created_at'),
+    'pending_requests_queue': lambda: BloodRequest.objects.filter(status='pending').order_by('-created_at'),
+    'unread_notifications': lambda: Notification.objects.filter(
+        recipient_id=1, is_read=False).order_by('-created_at'),
+    'bookable_timeslots': lambda: Timeslot.objects.filter(
+        is_active=True, date__gte=date.today()).order_by('date', 'start_time'),
+    'donor_dashboard_page': lambda: DonorProfile.objects.order_by('-created_at', '-id')[:26],
+    'eligible_donors': lambda: recruitment.eligible_in_group('O+').filter(id__gt=0).order_by('id')[:51],
+    'expiry_sweep': lambda: BloodBank.stale_units(date.today()),
+}
+
+
+# Hot queries whose ORDER BY must be served by the index, not a sort step
+INDEX_ORDERED = ('eligible_donors',)
+
+
+def explain(queryset):
+    """Return the backend's plan for queryset as text."""
+    from django.db import connection
+    if connection.vendor == 'mysql':
+        return queryset.explain(format='json')
+    return queryset.explain()
+
+
+def is_full_scan(plan, table, vendor):
+    """True if the plan reads every row of `table` without an index."""
+    if vendor == 'sqlite':
+        # Index use appears as "SEARCH t USING INDEX" or "SCAN t USING INDEX"
+        return any(
+            line.strip().endswith(f'SCAN {table}')
+            for line in plan.splitlines()
+        )
+    if vendor == 'mysql':
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get('table_name') == table and node.get('access_type') == 'ALL':
+                    return True
+                return any(walk(value) for value in node.values())
+            if isinstance(node, list):
+                return any(walk(value) for value in node)
+            return False
+        return walk(json.loads(plan))
+    if vendor == 'postgresql':
+        return f'Seq Scan on {table}' in plan
+    return False
+
+
+def is_sorted(plan, vendor):
+    """True if the plan sorts rows in a separate step instead of reading them in index order."""
+    if vendor == 'sqlite':
+        return 'USE TEMP B-TREE FOR ORDER BY' in plan
+    if vendor == 'mysql':
+        def walk(node):
+            if isinstance(node, dict):
+                return node.get('using_filesort') is True or any(walk(value) for value in node.values())
+            if isinstance(node, list):
+                return any(walk(value) for value in node)
+            return False
+        return walk(json.loads(plan))
+    if vendor == 'postgresql':
+        return any(line.strip().lstrip('->').strip().startswith('Sort ') for line in plan.splitlines())
+    return False
+
+
+def find_sorts():
+    """Returns a list of (name, plan) for the INDEX_ORDERED queries that sort their rows."""
+    from django.db import connection
+    failures = []
+    for name in INDEX_ORDERED:
+        plan = explain(HOT_QUERIES[name]())
+        if is_sorted(plan, connection.vendor):
+            failures.append((name, plan))
+    return failures
+
+
+def find_full_scans():
+    """
+    EXPLAIN every hot query on the default database.
+    Returns a list of (name, plan) for the queries that fall back to a full scan.
+    """
+    from django.db import connection
+    failures = []
+    for name, build in HOT_QUERIES.items():
+        queryset = build()
+        plan = explain(queryset)
+        if is_full_scan(plan, queryset.model._meta.db_table, connection.vendor):
+            failures.append((name, plan))
+    return failures
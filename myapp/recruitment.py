@@ -0,0 +1,87 @@
+"""
+Eligible-donor search for urgent recruitment.
+
+A donor may donate once next_eligible_date has passed, or at any time if
+they have never donated (the rule in DonorProfile.is_eligible_to_donate()).
+Here that rule is a filter on the (blood_group, next_eligible_date) index.
+Pages list the donors group by group and by id within a group, so each
+group a page reaches is one query that walks the (blood_group, id) index
+in order and stops at the page size, however many donors there are.
+"""
+from django.db.models import Q
+from django.utils import timezone
+
+from .allocation import BLOOD_GROUPS, COMPATIBLE_DONORS
+from .models import DonorProfile
+from .pagination import decode_cursor, encode_cursor, keyset_values
+
+PAGE_SIZE = 50
+
+
+def donor_groups(blood_group=None):
+    """
+    Donor groups to search, in the order they are listed: with blood_group,
+    those a patient of that group can receive, ranked like allocation
+    (exact match first, O- last); otherwise every group.
+    """
+    return COMPATIBLE_DONORS[blood_group] if blood_group else BLOOD_GROUPS
+
+
+def _eligible(today=None, **groups):
+    today = today or timezone.localdate()
+    return DonorProfile.objects.filter(
+        Q(next_eligible_date__isnull=True) | Q(next_eligible_date__lte=today),
+        user__is_active=True,
+        **groups,
+    )
+
+
+def eligible_in_group(donor_group, today=None):
+    """Active donors of donor_group eligible to donate today."""
+    return _eligible(today, blood_group=donor_group)
+
+
+def eligible_donors(blood_group=None, today=None):
+    """Active donors eligible to donate today, of any of donor_groups(blood_group)."""
+    return _eligible(today, blood_group__in=donor_groups(blood_group))
+
+
+def eligible_donor_page(blood_group=None, cursor=None, page_size=PAGE_SIZE):
+    """
+    Return (donors, next_cursor) for one page of eligible donors, group by
+    group in donor_groups() order and by id within a group. The cursor is
+    the group's position and the last id, so each group is read with an
+    equality on blood_group and a range on id, in (blood_group, id) index
+    order: one query per group the page reaches, with no sort step.
+    """
+    groups = donor_groups(blood_group)
+    values = decode_cursor(cursor)
+    if values is not None and len(values) == 2 and all(isinstance(value, int) for value in values):
+        position, last_id = values
+    else:
+        position, last_id = 0, 0
+
+    donors = []
+    while position < len(groups) and len(donors) <= page_size:
+        wanted = page_size + 1 - len(donors)
+        rows = list(
+            eligible_in_group(groups[position]).filter(id__gt=last_id)
+            .select_related('user').order_by('id')[:wanted]
+        )
+        donors += [(position, donor) for donor in rows]
+        if len(rows) == wanted:
+            break
+        position, last_id = position + 1, 0
+
+    next_cursor = None
+    if len(donors) > page_size:
+        donors = donors[:page_size]
+        position, last = donors[-1]
+        next_cursor = encode_cursor([position, last.id])
+    return [donor for _, donor in donors], next_cursor
+
+
+def eligible_donor_values(blood_group, fields, chunk_size=2000):
+    """values_list() tuples of fields for every eligible donor, in page order."""
+    for donor_group in donor_groups(blood_group):
+        yield from keyset_values(eligible_in_group(donor_group), fields, ('id',), chunk_size)
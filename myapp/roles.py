@@ -0,0 +1,76 @@
+"""
+Role resolution for permission checks and template flags.
+
+A user's group names are loaded with one query and memoised on the user
+object, which Django keeps for the whole request as request.user, so every
+is_admin / is_superuser check after the first is free. If the groups were
+prefetched (prefetch_related('groups')) no query is made at all.
+
+Set ROLE_CACHE_TIMEOUT (seconds) to also keep the names in the cache across
+requests. The entry is dropped whenever User.groups changes; renaming or
+deleting a Group is only picked up when the entry expires, so keep the
+timeout short.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+SUPER_ADMIN = 'Super Admin'
+SECONDARY_ADMIN = 'Secondary Admin'
+ADMIN_GROUPS = frozenset([SUPER_ADMIN, SECONDARY_ADMIN])
+
+
+def _cache_key(user_id):
+    return f'roles:groups:{user_id}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'ROLE_CACHE_TIMEOUT', 0)
+
+
+def group_names(user):
+    """Return the frozenset of group names for user, loading them at most once."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+
+    names = getattr(user, '_role_group_names', None)
+    if names is not None:
+        return names
+
+    prefetched = getattr(user, '_prefetched_objects_cache', {})
+    if 'groups' in prefetched:
+        names = frozenset(group.name for group in prefetched['groups'])
+    else:
+        timeout = _cache_timeout()
+        if timeout:
+            names = cache.get(_cache_key(user.pk))
+        if names is None:
+            names = frozenset(user.groups.values_list('name', flat=True))
+            if timeout:
+                cache.set(_cache_key(user.pk), names, timeout)
+
+    user._role_group_names = names
+    return names
+
+
+def forget(user=None, user_ids=()):
+    """Drop memoised and cached group names for a user object and/or user ids."""
+    ids = set(user_ids)
+    if user is not None:
+        user.__dict__.pop('_role_group_names', None)
+        ids.add(user.pk)
+    if ids and _cache_timeout():
+        cache.delete_many([_cache_key(user_id) for user_id in ids])
+
+
+def in_group(user, name):
+    return name in group_names(user)
+
+
+def is_super_admin(user):
+    """Superusers and members of the Super Admin group."""
+    return bool(user.is_superuser or SUPER_ADMIN in group_names(user))
+
+
+def is_admin(user):
+    """Superusers and members of either admin group."""
+    return bool(user.is_superuser or ADMIN_GROUPS & group_names(user))
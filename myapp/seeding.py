@@ -0,0 +1,306 @@
+"""
+Synthetic data for load testing: users, donors, patients, timeslots,
+donations in every workflow state, blood units, blood requests and
+notifications in realistic proportions.
+
+Every value is drawn from one random.Random(seed) in a fixed order, so the
+same seed, volumes and date give the same rows. Rows are generated lazily
+and written with bulk_create in batches, so millions of them take minutes
+and memory stays bounded. Seeded usernames share a prefix, which keeps the
+data apart from real accounts. The denormalized InventorySummary and
+UnreadNotificationCounter tables are rebuilt at the end.
+"""
+import random
+from datetime import datetime, time, timedelta
+from itertools import islice
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import caching
+from .approvals import DONATION_INTERVAL_DAYS, UNIT_SHELF_LIFE_DAYS
+from .models import (
+    BloodBank, BloodDonation, BloodRequest, DonorProfile, InventorySummary, Notification, PatientProfile,
+    Timeslot, UnreadNotificationCounter,
+)
+from .pagination import keyset_values
+
+BATCH_SIZE = 5000
+PASSWORD = 'load-test-password'
+
+DEFAULT_VOLUMES = {
+    'donors': 10000,
+    'patients': 2000,
+    'donations': 30000,
+    'requests': 5000,
+    'notifications': 100000,
+    # Days of timeslots either side of today
+    'timeslot_days': 60,
+}
+
+# Rough population frequencies
+BLOOD_GROUP_WEIGHTS = {'O+': 38, 'A+': 34, 'B+': 9, 'O-': 7, 'A-': 6, 'AB+': 3, 'B-': 2, 'AB-': 1}
+DONATION_STATUS_WEIGHTS = {
+    'final_approved': 60, 'rejected': 10, 'pending_initial': 10, 'initial_approved': 10, 'slot_confirmed': 10,
+}
+REQUEST_STATUS_WEIGHTS = {'pending': 30, 'approved': 10, 'fulfilled': 45, 'rejected': 15}
+URGENCY_WEIGHTS = {0: 70, 1: 20, 2: 10}
+NOTIFICATION_TYPE_WEIGHTS = {
+    'status_update': 35, 'appointment': 20, 'donation_completed': 15, 'reminder': 15, 'confirmation': 10,
+    'general': 5,
+}
+# Unit status once its expiry date has passed, and while it is still in date
+SPENT_UNIT_WEIGHTS = {'used': 70, 'expired': 23, 'discarded': 5, 'available': 2}
+LIVE_UNIT_WEIGHTS = {'available': 75, 'reserved': 10, 'used': 15}
+
+# Donation history goes back this many days
+HISTORY_DAYS = 365
+
+
+def _picker(rng, weights):
+    """Return a function drawing one key of weights with its relative weight."""
+    population, cum_weights = list(weights), []
+    for weight in weights.values():
+        cum_weights.append((cum_weights[-1] if cum_weights else 0) + weight)
+    return lambda: rng.choices(population, cum_weights=cum_weights)[0]
+
+
+def _insert(model, objects, batch_size):
+    """bulk_create a generator of unsaved objects batch by batch; returns the count."""
+    objects = iter(objects)
+    count = 0
+    while batch := list(islice(objects, batch_size)):
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def _aware(day, hour=9):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+class _Slots:
+    """Timeslots with room left, split into past and future, for booking donations."""
+
+    def __init__(self, rng, today, rows):
+        self.rng = rng
+        self.past, self.future = [], []
+        for slot_id, day, capacity, booked in rows:
+            (self.past if day < today else self.future).append([slot_id, day, capacity - booked, 0])
+
+    def book(self, future):
+        """Pick a random slot with room, trying a few; returns the slot row or None."""
+        slots = self.future if future else self.past
+        for _ in range(5 if slots else 0):
+            slot = self.rng.choice(slots)
+            if slot[2] > slot[3]:
+                slot[3] += 1
+                return slot
+        return None
+
+    def booked(self):
+        return [(slot[0], slot[3]) for slot in self.past + self.future if slot[3]]
+
+
+def seed(volumes=None, seed=1, prefix='load', today=None, batch_size=BATCH_SIZE, log=None):
+    """
+    Generate a load-test dataset and return {table: rows inserted}.
+
+    volumes overrides DEFAULT_VOLUMES. Every seeded user has the username
+    '<prefix>-donor-<n>' or '<prefix>-patient-<n>' and the password
+    PASSWORD. Raises ValueError if users with the prefix already exist.
+    """
+    volumes = {**DEFAULT_VOLUMES, **(volumes or {})}
+    today = today or timezone.localdate()
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    counts = {}
+
+    if User.objects.filter(username__startswith=f'{prefix}-').exists():
+        raise ValueError(f'Users with the prefix {prefix!r} already exist; choose another prefix.')
+
+    def step(table, insert):
+        started = perf_counter()
+        counts[table] = insert()
+        elapsed = perf_counter() - started
+        log(f'{table}: {counts[table]} rows in {elapsed:.1f}s ({counts[table] / elapsed if elapsed else 0:.0f} rows/s)')
+
+    blood_group = _picker(rng, BLOOD_GROUP_WEIGHTS)
+    donor_groups = [blood_group() for _ in range(volumes['donors'])]
+    patient_groups = [blood_group() for _ in range(volumes['patients'])]
+    usernames = (
+        [f'{prefix}-donor-{index}' for index in range(volumes['donors'])]
+        + [f'{prefix}-patient-{index}' for index in range(volumes['patients'])]
+    )
+
+    # One hash for every account: hashing is deliberately slow
+    password = make_password(PASSWORD)
+    joined = timezone.now()
+    step('users', lambda: _insert(User, (
+        User(username=username, email=f'{username}@example.com', password=password, date_joined=joined)
+        for username in usernames
+    ), batch_size))
+    # MySQL does not return primary keys from bulk inserts
+    user_ids = dict(User.objects.filter(username__startswith=f'{prefix}-').values_list('username', 'id'))
+    genders = ['male', 'female', 'other']
+
+    step('donors', lambda: _insert(DonorProfile, (
+        DonorProfile(
+            user_id=user_ids[f'{prefix}-donor-{index}'],
+            full_name=f'Donor {index}',
+            blood_group=group,
+            contact_number=f'9{index:09d}'[-10:],
+            age=rng.randint(18, 65),
+            gender=rng.choice(genders),
+            weight=rng.randint(50, 110),
+            height=rng.randint(150, 200),
+        )
+        for index, group in enumerate(donor_groups)
+    ), batch_size))
+    donor_ids = [
+        donor_id for _, donor_id in sorted(
+            DonorProfile.objects.filter(user__username__startswith=f'{prefix}-donor-')
+            .values_list('user_id', 'id')
+        )
+    ]
+
+    step('patients', lambda: _insert(PatientProfile, (
+        PatientProfile(
+            user_id=user_ids[f'{prefix}-patient-{index}'],
+            full_name=f'Patient {index}',
+            blood_group=group,
+            contact_number=f'8{index:09d}'[-10:],
+            age=rng.randint(1, 90),
+            gender=rng.choice(genders),
+        )
+        for index, group in enumerate(patient_groups)
+    ), batch_size))
+    patient_ids = [
+        patient_id for _, patient_id in sorted(
+            PatientProfile.objects.filter(user__username__startswith=f'{prefix}-patient-')
+            .values_list('user_id', 'id')
+        )
+    ]
+
+    # Monday to Saturday, 09:00-17:00 in half-hour slots; existing slots are kept
+    days = timedelta(days=volumes['timeslot_days'])
+    planned, created = Timeslot.generate_recurring(
+        today - days, today + days, range(6), time(9), time(17), 30, 10, batch_size=batch_size,
+    )
+    counts['timeslots'] = created
+    log(f'timeslots: {created} rows ({planned - created} already existed)')
+    slots = _Slots(rng, today, Timeslot.objects.filter(
+        date__range=(today - days, today + days), is_active=True,
+    ).order_by('date', 'start_time', 'id').values_list('id', 'date', 'capacity', 'booked_count'))
+
+    donation_status = _picker(rng, DONATION_STATUS_WEIGHTS)
+    next_eligible = {}
+
+    def donations():
+        for _ in range(volumes['donations'] if donor_ids else 0):
+            donor_id = donor_ids[rng.randrange(len(donor_ids))]
+            status = donation_status()
+            donation = BloodDonation(donor_id=donor_id, quantity=rng.randint(1, 2), status=status)
+            if status in ('final_approved', 'rejected'):
+                donation.donation_date = today - timedelta(days=rng.randint(1, HISTORY_DAYS))
+                slot = slots.book(future=False) if rng.random() < 0.5 else None
+            elif status == 'slot_confirmed':
+                slot = slots.book(future=True)
+                if slot is None:
+                    donation.status = status = 'initial_approved'
+            else:
+                slot = None
+            if slot is not None:
+                donation.timeslot_id, donation.donation_date = slot[0], slot[1]
+                donation.appointment_date = slot[1]
+            if status in ('pending_initial', 'initial_approved'):
+                donation.donation_date = today + timedelta(days=rng.randint(0, 14))
+
+            if status != 'pending_initial':
+                donation.initial_approved_at = _aware(min(donation.donation_date, today) - timedelta(days=7))
+            if status == 'final_approved':
+                donation.final_approved_at = _aware(donation.donation_date, 12)
+                next_date = donation.donation_date + timedelta(days=DONATION_INTERVAL_DAYS)
+                next_eligible[donor_id] = max(next_eligible.get(donor_id, next_date), next_date)
+            elif status == 'rejected':
+                donation.rejected_at = _aware(donation.donation_date, 12)
+            yield donation
+
+    step('donations', lambda: _insert(BloodDonation, donations(), batch_size))
+
+    Timeslot.objects.bulk_update(
+        [Timeslot(id=slot_id, booked_count=F('booked_count') + count) for slot_id, count in slots.booked()],
+        ['booked_count'], batch_size=batch_size,
+    )
+    DonorProfile.objects.bulk_update(
+        [DonorProfile(id=donor_id, next_eligible_date=day) for donor_id, day in next_eligible.items()],
+        ['next_eligible_date'], batch_size=batch_size,
+    )
+
+    spent_status = _picker(rng, SPENT_UNIT_WEIGHTS)
+    live_status = _picker(rng, LIVE_UNIT_WEIGHTS)
+    completed = BloodDonation.objects.filter(
+        donor__user__username__startswith=f'{prefix}-donor-', status='final_approved',
+    )
+
+    def units():
+        fields = ['id', 'donation_date', 'quantity', 'donor__blood_group']
+        for donation_id, donation_date, quantity, group in keyset_values(completed, fields, chunk_size=batch_size):
+            expiry_date = donation_date + timedelta(days=UNIT_SHELF_LIFE_DAYS)
+            yield BloodBank(
+                donation_id=donation_id,
+                blood_group=group,
+                quantity=quantity,
+                expiry_date=expiry_date,
+                status=spent_status() if expiry_date <= today else live_status(),
+                location=f'Fridge {rng.randint(1, 8)}',
+            )
+
+    step('blood units', lambda: _insert(BloodBank, units(), batch_size))
+
+    request_status = _picker(rng, REQUEST_STATUS_WEIGHTS)
+    urgency = _picker(rng, URGENCY_WEIGHTS)
+
+    def requests():
+        for _ in range(volumes['requests'] if patient_ids else 0):
+            index = rng.randrange(len(patient_ids))
+            status = request_status()
+            quantity = rng.randint(1, 4)
+            yield BloodRequest(
+                patient_id=patient_ids[index],
+                blood_group=patient_groups[index],
+                quantity=quantity,
+                fulfilled_quantity=quantity if status == 'fulfilled' else 0,
+                status=status,
+                urgency=urgency(),
+            )
+
+    step('requests', lambda: _insert(BloodRequest, requests(), batch_size))
+
+    notification_type = _picker(rng, NOTIFICATION_TYPE_WEIGHTS)
+    recipients = [user_ids[username] for username in usernames]
+
+    def notifications():
+        for index in range(volumes['notifications'] if recipients else 0):
+            kind = notification_type()
+            yield Notification(
+                recipient_id=recipients[rng.randrange(len(recipients))],
+                title=f'{kind.replace("_", " ").title()} #{index}',
+                message='Synthetic notification for load testing.',
+                notification_type=kind,
+                is_read=rng.random() < 0.7,
+            )
+
+    step('notifications', lambda: _insert(Notification, notifications(), batch_size))
+
+    started = perf_counter()
+    InventorySummary.rebuild()
+    UnreadNotificationCounter.rebuild()
+    caching.bump(User, DonorProfile, PatientProfile, Timeslot, BloodDonation, BloodBank, BloodRequest)
+    log(f'Rebuilt inventory summary and unread counters in {perf_counter() - started:.1f}s')
+    return counts
@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from . import caching, live, middleware, roles, slow_queries
+from .models import (
+    BloodBank, BloodDonation, BloodRequest, DonorProfile, InventorySummary, Notification, PatientProfile, Timeslot,
+    UnreadNotificationCounter,
+)
+
+
+@receiver(post_delete, sender=BloodBank)
+def remove_unit_from_summary(sender, instance, **kwargs):
+    """Keep InventorySummary in sync when units are deleted (including cascades)."""
+    InventorySummary.record_change(
+        (instance.blood_group, instance.status, instance.quantity), None
+    )
+
+
+@receiver(post_save, sender=Notification)
+def publish_new_notification(sender, instance, created, **kwargs):
+    """Push new notifications to the recipient's open live streams after commit."""
+    if created:
+        payload = live.serialize(instance)
+        transaction.on_commit(lambda: live.hub.publish(instance.recipient_id, payload))
+
+
+@receiver(post_delete, sender=Notification)
+def remove_notification_from_counter(sender, instance, **kwargs):
+    """Keep UnreadNotificationCounter in sync when notifications are deleted."""
+    UnreadNotificationCounter.record_change((instance.recipient_id, instance.is_read), None)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def forget_cached_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached group names when a user's groups change, from either side."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            roles.forget(instance)
+    elif action in ('post_add', 'post_remove'):
+        roles.forget(user_ids=pk_set)
+    elif action == 'pre_clear':
+        roles.forget(user_ids=instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Charge every query to the request being instrumented, if any, and log slow ones."""
+    middleware.install_query_hook(connection)
+    slow_queries.install_query_hook(connection)
+
+
+# Models whose changes invalidate cached values (see caching.py)
+CACHE_VERSIONED_MODELS = (BloodBank, BloodDonation, BloodRequest, DonorProfile, PatientProfile, Timeslot, User)
+
+
+def bump_cache_version(sender, update_fields=None, **kwargs):
+    """Invalidate the cached values computed from the sender's table."""
+    # Logging in saves User.last_login, which no cached value shows
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    caching.bump(sender)
+
+
+for model in CACHE_VERSIONED_MODELS:
+    post_save.connect(bump_cache_version, sender=model, dispatch_uid=f'bump_cache_version_save_{model._meta.label}')
+    post_delete.connect(bump_cache_version, sender=model, dispatch_uid=f'bump_cache_version_delete_{model._meta.label}')
@@ -0,0 +1,200 @@
+"""
+A log of the SQL queries slower than SLOW_QUERY_MS, with their plans.
+
+signals.py installs log_slow_query on every database connection when it is
+opened, next to the request instrumentation hook. A query that takes at
+least SLOW_QUERY_MS milliseconds is appended as one JSON line to
+SLOW_QUERY_LOG with the view of the request that ran it, the application
+function that issued it, its fingerprint and the backend's EXPLAIN output,
+and logged as a warning on the myapp.slow_queries logger. Only SELECTs are
+explained, on the same connection right after they ran, so the plan is the
+one the query got. The hook wraps the request instrumentation and runs the
+EXPLAIN outside it, so the plan is not counted in the request's queries,
+metrics or Server-Timing, and inside a savepoint, so a failed EXPLAIN does
+not abort the surrounding transaction on PostgreSQL. Fast queries cost two
+timer reads; SLOW_QUERY_MS = None
+turns the log off. The time is that of execute(): with MySQL's buffered
+cursors it includes reading the rows, while SQLite returns after the first
+row.
+
+The fingerprint is the SQL with its literals and the lengths of IN and
+VALUES lists taken out, so the same ORM query with other parameters counts
+as one. The slow_query_report command sums the log up by fingerprint.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from . import middleware
+
+logger = logging.getLogger('myapp.slow_queries')
+
+# Longest raw statement kept in an entry; the fingerprint is always whole
+MAX_SQL_LENGTH = 2000
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_VALUES_LISTS = re.compile(r'\bVALUES\s*(?:\([^()]*\)\s*,?\s*)+', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+# Set while the plan of a slow query is fetched, so EXPLAIN is not logged itself
+_explaining = contextvars.ContextVar('explaining_slow_query', default=False)
+_write_lock = threading.Lock()
+
+
+def log_path():
+    return getattr(settings, 'SLOW_QUERY_LOG', None) or os.path.join(settings.BASE_DIR, 'var', 'slow-queries.jsonl')
+
+
+def fingerprint(sql):
+    """The SQL with literals replaced by %s and list lengths collapsed."""
+    sql = _LITERALS.sub('%s', sql)
+    sql = _VALUES_LISTS.sub('VALUES (...) ', sql)
+    sql = _IN_LISTS.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint_id(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def _caller():
+    """'path:line in function' of the innermost frame in this project's code, outside this module."""
+    root = str(settings.BASE_DIR) + os.sep
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(root) and filename not in (__file__, middleware.__file__)
+                and os.sep + 'site-packages' + os.sep not in filename):
+            return f'{os.path.relpath(filename, root)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def _explain(connection, sql, params):
+    """The backend's plan for sql as text, or the error that stopped it."""
+    token = _explaining.set(True)
+    try:
+        with middleware.untimed(), transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(' '.join(str(value) for value in row) for row in cursor.fetchall())
+    except DatabaseError as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        _explaining.reset(token)
+
+
+def _write(entry):
+    line = json.dumps(entry, default=str) + '\n'
+    path = log_path()
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with _write_lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+    except OSError:
+        logger.exception('Could not write to the slow query log %s', path)
+
+
+def log_slow_query(execute, sql, params, many, context):
+    """Execute wrapper recording the query if it takes SLOW_QUERY_MS or longer."""
+    threshold = getattr(settings, 'SLOW_QUERY_MS', None)
+    if threshold is None or _explaining.get():
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed = (perf_counter() - started) * 1000
+    if elapsed >= threshold:
+        record(context['connection'], sql, params, many, elapsed)
+    return result
+
+
+def record(connection, sql, params, many, elapsed_ms):
+    """Append one slow query to the log; the query must have succeeded."""
+    text = fingerprint(sql)
+    timings = middleware.current_timings()
+    explainable = (
+        not many and getattr(settings, 'SLOW_QUERY_EXPLAIN', True) and sql.lstrip()[:6].upper() == 'SELECT'
+    )
+    entry = {
+        'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'duration_ms': round(elapsed_ms, 1),
+        'database': connection.alias,
+        'vendor': connection.vendor,
+        'view': timings.origin if timings is not None else None,
+        'caller': _caller(),
+        'fingerprint': fingerprint_id(text),
+        'normalized': text,
+        'sql': sql[:MAX_SQL_LENGTH],
+        'plan': _explain(connection, sql, params) if explainable else None,
+    }
+    _write(entry)
+    logger.warning(
+        'Slow query (%.1f ms) in %s from %s: %s',
+        elapsed_ms, entry['view'] or '-', entry['caller'] or '-', text[:300],
+        extra={'slow_query': entry},
+    )
+
+
+def install_query_hook(connection):
+    # Outermost, so the time spent explaining is not inside middleware.record_query
+    if log_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log_slow_query)
+
+
+def read_log(path):
+    """Yield the entries of a slow query log, skipping lines that are not JSON objects."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and 'fingerprint' in entry:
+                yield entry
+
+
+def summarize(entries):
+    """
+    Group entries by fingerprint. Returns a list of dicts with count,
+    total_ms, mean_ms, max_ms, the views and callers seen, and the
+    statement and plan of the slowest run, worst total time first.
+    """
+    groups = {}
+    for entry in entries:
+        group = groups.get(entry['fingerprint'])
+        if group is None:
+            group = groups[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'],
+                'normalized': entry.get('normalized', ''),
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'views': {},
+                'callers': {},
+                'last_seen': '',
+            }
+        duration = entry.get('duration_ms', 0.0)
+        group['count'] += 1
+        group['total_ms'] += duration
+        for key, name in (('views', entry.get('view')), ('callers', entry.get('caller'))):
+            if name:
+                group[key][name] = group[key].get(name, 0) + 1
+        group['last_seen'] = max(group['last_seen'], entry.get('time', ''))
+        if duration >= group['max_ms']:
+            group['max_ms'] = duration
+            group['sql'] = entry.get('sql', '')
+            group['plan'] = entry.get('plan')
+    for group in groups.values():
+        group['total_ms'] = round(group['total_ms'], 1)
+        group['mean_ms'] = round(group['total_ms'] / group['count'], 1)
+    return sorted(groups.values(), key=lambda group: -group['total_ms'])
@@ -0,0 +1,59 @@
+"""
+Counters for the dashboard stat cards.
+
+Each function runs a single conditional-aggregation query over one table,
+so a page pays one query per model however many counters it shows.
+"""
+from django.db.models import Count, Q
+
+from .models import AdminProfile, BloodDonation, BloodRequest, DonorProfile
+
+
+def admin_profile_stats():
+    """Counters for the admin management page."""
+    return AdminProfile.objects.aggregate(
+        total_admins=Count('id'),
+        active_admins=Count('id', filter=Q(is_active=True)),
+        super_admins=Count('id', filter=Q(is_super_admin=True)),
+        secondary_admins=Count('id', filter=Q(is_secondary_admin=True)),
+        pending_admins=Count('id', filter=Q(is_active=False, is_secondary_admin=False)),
+    )
+
+
+def donor_stats():
+    """Counters over all donor profiles."""
+    return DonorProfile.objects.aggregate(
+        total_donors=Count('id'),
+        active_donors=Count('id', filter=Q(user__is_active=True)),
+    )
+
+
+def blood_request_stats(**filters):
+    """Counters over blood requests, optionally narrowed by filters (e.g. patient=...)."""
+    return BloodRequest.objects.filter(**filters).aggregate(
+        total_requests=Count('id'),
+        pending_requests=Count('id', filter=Q(status='pending')),
+        approved_requests=Count('id', filter=Q(status='approved')),
+        fulfilled_requests=Count('id', filter=Q(status='fulfilled')),
+        rejected_requests=Count('id', filter=Q(status='rejected')),
+    )
+
+
+def blood_donation_stats(**filters):
+    """Counters over blood donations, optionally narrowed by filters (e.g. donor=...)."""
+    return BloodDonation.objects.filter(**filters).aggregate(
+        total_donations=Count('id'),
+        pending_donations=Count('id', filter=Q(status__in=['pending_initial', 'slot_confirmed'])),
+        pending_initial_donations=Count('id', filter=Q(status='pending_initial')),
+        slot_confirmed_donations=Count('id', filter=Q(status='slot_confirmed')),
+        completed_donations=Count('id', filter=Q(status='final_approved')),
+    )
+
+
+def admin_dashboard_stats():
+    """Counters shown on the admin dashboards: one query per model."""
+    stats = {}
+    stats.update(donor_stats())
+    stats.update(blood_request_stats())
+    stats.update(blood_donation_stats())
+    return stats
@@ -0,0 +1,40 @@
+"""
+The test runner (TEST_RUNNER): Django's, with the settings that only make
+sense for a test run applied for the whole run.
+"""
+import logging
+import os
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# Loggers that only show errors while the tests run
+QUIET_LOGGERS = ('myapp.requests', 'myapp.slow_queries')
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._scratch = tempfile.TemporaryDirectory(prefix='bloodbank-tests-')
+        self._overrides = override_settings(
+            # Rolled-back test transactions would leave stale cached values
+            DATA_CACHE_TIMEOUT=0,
+            # Keep the run's files out of the project's var/
+            METRICS_DIR=os.path.join(self._scratch.name, 'metrics'),
+            SLOW_QUERY_LOG=os.path.join(self._scratch.name, 'slow-queries.jsonl'),
+        )
+        self._overrides.enable()
+        self._log_levels = {}
+        for name in QUIET_LOGGERS:
+            logger = logging.getLogger(name)
+            self._log_levels[name] = logger.level
+            logger.setLevel(logging.ERROR)
+
+    def teardown_test_environment(self, **kwargs):
+        for name, level in self._log_levels.items():
+            logging.getLogger(name).setLevel(level)
+        self._overrides.disable()
+        self._scratch.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1739 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import threading
+from datetime import date, time, timedelta
+from io import StringIO
+from types import SimpleNamespace
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import (
+    allocation, approvals, caching, exports, imports, live, metrics, recruitment, roles, seeding, slow_queries, stats,
+    views,
+)
+from .forms import TimeslotForm
+from .middleware import InstrumentationMiddleware
+from .pagination import keyset_values
+from .query_plans import find_full_scans, find_sorts
+from .models import (
+    AdminProfile, BloodBank, BloodDonation, BloodRequest, BookingError, DonorProfile, ExpirySweep,
+    InsufficientBloodUnits, InventorySummary, Notification, PatientProfile, Timeslot, TimeslotFull,
+    UnreadNotificationCounter,
+)
+
+
+def create_donor(username='donor', blood_group='O+'):
+    user = User.objects.create_user(username=username)
+    return DonorProfile.objects.create(
+        user=user,
+        full_name=f'{username} donor',
+        blood_group=blood_group,
+        contact_number='1234567890',
+    )
+
+
+def create_patient(username='patient', blood_group='O+'):
+    user = User.objects.create_user(username=username)
+    return PatientProfile.objects.create(
+        user=user,
+        full_name=f'{username} patient',
+        age=40,
+        blood_group=blood_group,
+        contact_number='9876543210',
+    )
+
+
+def create_admin(username='admin'):
+    user = User.objects.create_user(username=username, password='pass12345')
+    user.groups.add(Group.objects.get_or_create(name='Super Admin')[0])
+    AdminProfile.objects.create(user=user, full_name='Test Admin', employee_id=username)
+    return user
+
+
+def run_in_threads(target, count):
+    """Run target(index) in count threads started together; close their DB connections."""
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        try:
+            barrier.wait()
+            target(index)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def create_unit(donor, quantity=1, blood_group=None, expiry_days=42, status='available'):
+    donation = BloodDonation.objects.create(
+        donor=donor,
+        quantity=quantity,
+        donation_date=date.today(),
+        status='final_approved',
+    )
+    return BloodBank.objects.create(
+        donation=donation,
+        blood_group=blood_group or donor.blood_group,
+        quantity=quantity,
+        expiry_date=date.today() + timedelta(days=expiry_days),
+        status=status,
+    )
+
+
+class InventorySummaryTests(TestCase):
+
+    def setUp(self):
+        self.donor = create_donor()
+
+    def bucket(self, blood_group, status):
+        row = InventorySummary.objects.get(blood_group=blood_group, status=status)
+        return row.total_quantity, row.unit_count
+
+    def test_create_and_status_change_move_between_buckets(self):
+        unit = create_unit(self.donor, quantity=3)
+        self.assertEqual(self.bucket('O+', 'available'), (3, 1))
+
+        unit.status = 'discarded'
+        unit.save()
+        self.assertEqual(self.bucket('O+', 'available'), (0, 0))
+        self.assertEqual(self.bucket('O+', 'discarded'), (3, 1))
+
+    def test_available_quantity_reads_summary(self):
+        create_unit(self.donor, quantity=2)
+        create_unit(self.donor, quantity=3)
+        self.assertEqual(InventorySummary.available_quantity('O+'), 5)
+        with self.assertNumQueries(2):
+            self.assertEqual(allocation.available_quantity('O+'), 5)
+
+    def test_unswept_expired_units_are_not_available(self):
+        create_unit(self.donor, quantity=2)
+        create_unit(self.donor, quantity=4, expiry_days=-1)
+        create_unit(self.donor, quantity=1, blood_group='B-', expiry_days=0)
+        self.assertEqual(self.bucket('O+', 'available'), (6, 2))
+        self.assertEqual(InventorySummary.available_quantity('O+'), 2)
+        self.assertEqual(InventorySummary.available_by_group(), {'O+': 1})
+        self.assertEqual(allocation.available_quantity('AB+'), 2)
+
+    def test_deduct_and_cascade_delete_keep_summary_in_sync(self):
+        unit = create_unit(self.donor, quantity=4)
+        allocation.allocate('O+', 1)
+        self.assertEqual(self.bucket('O+', 'available'), (3, 1))
+
+        unit.donation.delete()
+        self.assertEqual(self.bucket('O+', 'available'), (0, 0))
+        self.assertEqual(InventorySummary.find_drift(), [])
+
+    def test_rebuild_command_detects_and_corrects_drift(self):
+        create_unit(self.donor, quantity=2)
+        InventorySummary.objects.filter(blood_group='O+', status='available').update(total_quantity=99)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_inventory_summary', '--check', stdout=StringIO())
+        call_command('rebuild_inventory_summary', stdout=StringIO())
+        self.assertEqual(self.bucket('O+', 'available'), (2, 1))
+        self.assertEqual(InventorySummary.find_drift(), [])
+
+
+class AllocationTests(TestCase):
+
+    def setUp(self):
+        self.donor = create_donor()
+
+    def stock(self, blood_group, quantity, expiry_days):
+        return create_unit(self.donor, quantity=quantity, blood_group=blood_group, expiry_days=expiry_days)
+
+    def test_compatibility_matrix(self):
+        self.assertEqual(allocation.COMPATIBLE_DONORS['O-'], ('O-',))
+        self.assertEqual(allocation.COMPATIBLE_DONORS['B+'], ('B+', 'B-', 'O+', 'O-'))
+        self.assertEqual(set(allocation.COMPATIBLE_DONORS['AB+']), set(allocation.BLOOD_GROUPS))
+        for recipient, donors in allocation.COMPATIBLE_DONORS.items():
+            self.assertEqual((donors[0], donors[-1]), (recipient, 'O-'))
+
+    def test_prefers_exact_match_and_spends_universal_stock_last(self):
+        self.stock('O-', 3, expiry_days=20)
+        self.stock('O+', 2, expiry_days=10)
+        self.stock('A-', 2, expiry_days=25)
+        self.stock('A+', 2, expiry_days=30)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(allocation.allocate('A+', 5), {'A+': 2, 'A-': 2, 'O+': 1})
+        unit_queries = [q['sql'].split()[0] for q in queries.captured_queries if '"myapp_bloodbank"' in q['sql']]
+        self.assertEqual(unit_queries, ['SELECT', 'UPDATE'])
+
+        self.assertEqual(
+            dict(BloodBank.objects.filter(status='available').values_list('blood_group', 'quantity')),
+            {'O+': 1, 'O-': 3},
+        )
+        self.assertEqual(InventorySummary.find_drift(), [])
+
+    def test_deducts_fifo_with_partial_split(self):
+        later = self.stock('O+', 3, expiry_days=20)
+        sooner = self.stock('O+', 2, expiry_days=10)
+
+        self.assertEqual(allocation.allocate('O+', 4), {'O+': 4})
+
+        sooner.refresh_from_db()
+        later.refresh_from_db()
+        self.assertEqual(sooner.status, 'used')
+        self.assertEqual((later.status, later.quantity), ('available', 1))
+        self.assertEqual(InventorySummary.find_drift(), [])
+
+    def test_expired_stock_is_not_allocated(self):
+        unit = self.stock('O+', 2, expiry_days=10)
+        self.stock('O+', 1, expiry_days=-1)
+
+        with self.assertRaises(InsufficientBloodUnits) as ctx:
+            allocation.allocate('O+', 3)
+
+        self.assertEqual(ctx.exception.available, 2)
+        unit.refresh_from_db()
+        self.assertEqual((unit.status, unit.quantity), ('available', 2))
+
+    def test_deduction_uses_bulk_updates(self):
+        for _ in range(5):
+            self.stock('O+', 1, expiry_days=10)
+        self.stock('O+', 5, expiry_days=20)
+        InventorySummary.objects.get_or_create(blood_group='O+', status='used')
+
+        # savepoint + locking SELECT + one UPDATE for used and split units +
+        # two summary deltas + release, however many units are consumed
+        with self.assertNumQueries(6):
+            allocation.allocate('O+', 7)
+
+    def test_units_about_to_expire_are_used_first(self):
+        self.stock('O+', 1, expiry_days=30)
+        soon = self.stock('O-', 1, expiry_days=allocation.URGENT_DAYS)
+
+        self.assertEqual(allocation.allocate('O+', 1), {'O-': 1})
+        soon.refresh_from_db()
+        self.assertEqual(soon.status, 'used')
+
+    def test_shortage_across_compatible_groups_deducts_nothing(self):
+        self.stock('B-', 1, expiry_days=10)
+        self.stock('O-', 1, expiry_days=10)
+        self.stock('A+', 5, expiry_days=10)
+
+        self.assertEqual(allocation.available_quantity('B-'), 2)
+        with self.assertRaises(InsufficientBloodUnits) as ctx:
+            allocation.allocate('B-', 3)
+        self.assertEqual(ctx.exception.available, 2)
+        self.assertFalse(BloodBank.objects.exclude(status='available').exists())
+
+
+class BatchMatcherTests(TestCase):
+
+    def setUp(self):
+        self.donor = create_donor()
+
+    def request(self, username, quantity, blood_group='O+', urgency=0):
+        return BloodRequest.objects.create(
+            patient=create_patient(username), blood_group=blood_group, quantity=quantity, urgency=urgency
+        )
+
+    def test_match_skips_uncoverable_requests_without_taking_stock(self):
+        units = [(1, 'O+', 3, date.today() + timedelta(days=20)), (2, 'O+', 1, date.today() + timedelta(days=30))]
+        requests = [SimpleNamespace(id=i, blood_group='O+', quantity=q) for i, q in ((10, 2), (11, 5), (12, 2))]
+
+        self.assertEqual(allocation.match(requests, units), {
+            10: [(1, 'O+', 2, False)],
+            12: [(1, 'O+', 1, True), (2, 'O+', 1, True)],
+        })
+
+    def test_queue_is_matched_in_one_inventory_pass(self):
+        create_unit(self.donor, quantity=3, blood_group='O+', expiry_days=20)
+        create_unit(self.donor, quantity=2, blood_group='O-', expiry_days=30)
+        routine = self.request('p1', 2)
+        emergency = self.request('p2', 3, urgency=2)
+        negative = self.request('p3', 1, blood_group='O-')
+        BloodRequest.objects.create(patient=routine.patient, blood_group='O+', quantity=1, status='rejected')
+
+        with CaptureQueriesContext(connection) as queries:
+            report = approvals.fulfil_pending_queue(by_urgency=True)
+        unit_queries = [q['sql'].split()[0] for q in queries.captured_queries if '"myapp_bloodbank"' in q['sql']]
+        self.assertEqual(unit_queries, ['SELECT', 'UPDATE'])
+
+        self.assertEqual([result['id'] for result in report], [emergency.id, routine.id, negative.id])
+        self.assertEqual([result['ok'] for result in report], [True, True, False])
+        self.assertEqual(report[0]['allocated'], {'O+': 3})
+        self.assertEqual(report[1]['allocated'], {'O-': 2})
+        self.assertEqual(
+            dict(BloodRequest.objects.values_list('id', 'status')),
+            {emergency.id: 'fulfilled', routine.id: 'fulfilled', negative.id: 'pending',
+             BloodRequest.objects.get(status='rejected').id: 'rejected'},
+        )
+        self.assertEqual(UnreadNotificationCounter.count_for(emergency.patient.user), 1)
+        self.assertEqual(InventorySummary.find_drift(), [])
+
+    def test_unit_split_by_one_request_and_used_up_by_the_next(self):
+        unit = create_unit(self.donor, quantity=4)
+        self.request('p1', 1)
+        self.request('p2', 3)
+
+        out = StringIO()
+        call_command('match_blood_requests', stdout=out)
+        self.assertIn('Fulfilled 2 of 2 pending requests', out.getvalue())
+
+        unit.refresh_from_db()
+        self.assertEqual((unit.status, unit.quantity), ('used', 3))
+        self.assertEqual(InventorySummary.find_drift(), [])
+
+    def test_dashboard_action(self):
+        create_unit(self.donor, quantity=1)
+        self.request('p1', 1)
+        url = reverse('match_blood_requests')
+
+        self.client.force_login(create_admin())
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.post(url).status_code, 302)
+        self.assertFalse(BloodRequest.objects.filter(status='pending').exists())
+
+
+class ConcurrentApprovalTests(TransactionTestCase):
+    """Parallel approvals must never issue more blood than is in stock."""
+
+    def test_parallel_approvals_do_not_over_allocate(self):
+        donor = create_donor()
+        for _ in range(15):
+            create_unit(donor, quantity=1)
+        admin = create_admin()
+        requests = [
+            BloodRequest.objects.create(patient=create_patient(f'patient{i}'), blood_group='O+', quantity=2)
+            for i in range(20)
+        ]
+
+        def approve(index):
+            client = Client()
+            client.force_login(admin)
+            client.get(reverse('approve_blood_request', args=[requests[index].id]))
+
+        run_in_threads(approve, len(requests))
+
+        issued = BloodRequest.objects.filter(status='fulfilled').aggregate(
+            total=Sum('fulfilled_quantity'))['total'] or 0
+        used = BloodBank.objects.filter(status='used').aggregate(total=Sum('quantity'))['total'] or 0
+        remaining = BloodBank.objects.filter(status='available').aggregate(total=Sum('quantity'))['total'] or 0
+
+        self.assertLessEqual(issued, 15)
+        self.assertEqual(issued, used)
+        self.assertEqual(used + remaining, 15)
+        self.assertEqual(InventorySummary.find_drift(), [])
+
+
+def create_timeslot(capacity=10, days_ahead=3, start_hour=9):
+    return Timeslot.objects.create(
+        date=date.today() + timedelta(days=days_ahead),
+        start_time=f'{start_hour:02d}:00',
+        end_time=f'{start_hour + 1:02d}:00',
+        capacity=capacity,
+    )
+
+
+def create_approved_donation(donor):
+    return BloodDonation.objects.create(
+        donor=donor,
+        quantity=1,
+        donation_date=date.today(),
+        status='initial_approved',
+    )
+
+
+class TimeslotBookingTests(TestCase):
+
+    def setUp(self):
+        self.donor = create_donor()
+        self.donation = create_approved_donation(self.donor)
+
+    def test_booking_claims_a_seat_and_links_donation(self):
+        slot = create_timeslot(capacity=2)
+        slot.book(self.donation)
+
+        self.assertEqual(slot.booked_count, 1)
+        self.assertEqual(self.donation.status, 'slot_confirmed')
+        self.assertEqual(self.donation.timeslot, slot)
+        self.assertEqual(self.donation.appointment_date, slot.date)
+        self.assertEqual(
+            Notification.objects.filter(recipient=self.donor.user, related_donation=self.donation).count(), 1
+        )
+
+    def test_full_or_inactive_slot_changes_nothing(self):
+        full = create_timeslot(capacity=1)
+        Timeslot.objects.filter(pk=full.pk).update(booked_count=1)
+        inactive = create_timeslot(capacity=5, start_hour=11)
+        Timeslot.objects.filter(pk=inactive.pk).update(is_active=False)
+
+        for slot in (full, inactive):
+            with self.assertRaises(TimeslotFull):
+                slot.book(self.donation)
+        self.donation.refresh_from_db()
+        self.assertEqual((self.donation.status, self.donation.timeslot), ('initial_approved', None))
+
+    def test_already_booked_donation_releases_the_seat(self):
+        create_timeslot(capacity=5).book(self.donation)
+        other = create_timeslot(capacity=5, start_hour=11)
+
+        with self.assertRaises(BookingError):
+            other.book(self.donation)
+        other.refresh_from_db()
+        self.assertEqual(other.booked_count, 0)
+        self.assertEqual(Notification.objects.filter(notification_type='appointment').count(), 1)
+
+    def test_capacity_cannot_drop_below_bookings(self):
+        slot = create_timeslot(capacity=3)
+        Timeslot.objects.filter(pk=slot.pk).update(booked_count=2)
+        slot.refresh_from_db()
+        form = TimeslotForm(
+            data={'date': slot.date, 'start_time': '09:00', 'end_time': '10:00', 'capacity': 1},
+            instance=slot,
+        )
+        self.assertIn('capacity', form.errors)
+
+    def test_edit_keeps_bookings_made_after_the_slot_was_loaded(self):
+        slot = create_timeslot(capacity=10)
+        data = {'date': slot.date, 'start_time': '09:00', 'end_time': '10:00'}
+        form = TimeslotForm(data={**data, 'capacity': 6}, instance=slot)
+        self.assertTrue(form.is_valid())
+        Timeslot.objects.filter(pk=slot.pk).update(booked_count=3)
+        self.assertTrue(form.save(commit=False).reschedule())
+        slot.refresh_from_db()
+        self.assertEqual((slot.capacity, slot.booked_count), (6, 3))
+
+        form = TimeslotForm(data={**data, 'capacity': 4}, instance=slot)
+        self.assertTrue(form.is_valid())
+        Timeslot.objects.filter(pk=slot.pk).update(booked_count=5)
+        self.assertFalse(form.save(commit=False).reschedule())
+        slot.refresh_from_db()
+        self.assertEqual((slot.capacity, slot.booked_count), (6, 5))
+
+
+class RecurringTimeslotTests(TestCase):
+
+    def setUp(self):
+        self.monday = date(2030, 1, 7)
+
+    def generate(self, **overrides):
+        options = {
+            'start_date': self.monday,
+            'end_date': self.monday + timedelta(days=13),
+            'weekdays': [0, 2, 4],
+            'opening_time': time(9),
+            'closing_time': time(12),
+            'slot_minutes': 45,
+            'capacity': 4,
+        }
+        options.update(overrides)
+        return Timeslot.generate_recurring(**options)
+
+    def test_generates_schedule_and_skips_existing_slots(self):
+        Timeslot.objects.create(date=self.monday, start_time=time(9), end_time=time(9, 30), capacity=2, booked_count=1)
+
+        # six days x four 45-minute slots between 9:00 and 12:00
+        self.assertEqual(self.generate(), (24, 23))
+        self.assertEqual(self.generate(), (24, 0))
+
+        existing = Timeslot.objects.get(date=self.monday, start_time=time(9))
+        self.assertEqual((existing.capacity, existing.booked_count), (2, 1))
+        self.assertEqual(
+            set(Timeslot.objects.values_list('date__week_day', flat=True)), {2, 4, 6}
+        )
+
+    def test_generation_uses_batched_inserts(self):
+        with CaptureQueriesContext(connection) as queries:
+            planned, created = self.generate(end_date=self.monday + timedelta(days=90), slot_minutes=15)
+
+        self.assertEqual((planned, created), (468, 468))
+        self.assertLess(len(queries), planned // 50)
+
+    def test_view_and_command(self):
+        self.client.force_login(create_admin())
+        response = self.client.post(reverse('generate_timeslots'), {
+            'start_date': '2030-01-07', 'end_date': '2030-01-08', 'weekdays': ['0', '1'],
+            'opening_time': '09:00', 'closing_time': '10:00', 'slot_minutes': '30', 'capacity': '5',
+        })
+        self.assertRedirects(response, reverse('timeslot_list'))
+        self.assertEqual(Timeslot.objects.count(), 4)
+
+        call_command('generate_timeslots', '--start', '2030-01-07', '--end', '2030-01-09',
+                     '--open', '09:00', '--close', '10:00', stdout=StringIO())
+        self.assertEqual(Timeslot.objects.count(), 6)
+        with self.assertRaises(CommandError):
+            call_command('generate_timeslots', '--start', '2030-01-09', '--end', '2030-01-07', stdout=StringIO())
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """A rush of donors on one slot must never book past its capacity."""
+
+    def test_parallel_bookings_respect_capacity(self):
+        slot = create_timeslot(capacity=5)
+        donors = [create_donor(f'donor{i}') for i in range(30)]
+        for donor in donors:
+            create_approved_donation(donor)
+
+        def book(index):
+            client = Client()
+            client.force_login(donors[index].user)
+            client.post(reverse('donor_dashboard'), {'booking': '1', 'timeslot': slot.id})
+
+        run_in_threads(book, len(donors))
+
+        slot.refresh_from_db()
+        confirmed = BloodDonation.objects.filter(timeslot=slot, status='slot_confirmed').count()
+        self.assertEqual(slot.booked_count, 5)
+        self.assertEqual(confirmed, 5)
+        self.assertEqual(BloodDonation.objects.filter(status='initial_approved').count(), 25)
+        self.assertEqual(Notification.objects.filter(notification_type='appointment').count(), 5)
+
+
+class ExpirySweepTests(TestCase):
+
+    def setUp(self):
+        self.donor = create_donor()
+
+    def sweep(self, *args):
+        out = StringIO()
+        call_command('expire_blood_units', *args, stdout=out)
+        return out.getvalue()
+
+    def test_sweep_expires_stale_stock_in_one_update(self):
+        stale = [
+            create_unit(self.donor, quantity=2, expiry_days=-3),
+            create_unit(self.donor, quantity=1, expiry_days=0),
+            create_unit(self.donor, quantity=4, expiry_days=-1, status='reserved'),
+        ]
+        fresh = create_unit(self.donor, quantity=5, expiry_days=1)
+        used = create_unit(self.donor, quantity=1, expiry_days=-2, status='used')
+
+        with CaptureQueriesContext(connection) as queries:
+            output = self.sweep()
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "myapp_bloodbank"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('Expired 3 units (7 qty)', output)
+
+        self.assertEqual(
+            set(BloodBank.objects.filter(status='expired').values_list('id', flat=True)),
+            {unit.id for unit in stale},
+        )
+        fresh.refresh_from_db()
+        used.refresh_from_db()
+        self.assertEqual((fresh.status, used.status), ('available', 'used'))
+        self.assertEqual(InventorySummary.available_quantity('O+'), 5)
+        self.assertEqual(InventorySummary.find_drift(), [])
+
+    def test_sweep_is_incremental_and_idempotent(self):
+        create_unit(self.donor, expiry_days=-1)
+        self.sweep()
+        self.assertIn('Expired 0 units', self.sweep())
+        self.assertEqual(ExpirySweep.watermark(), date.today())
+
+        # Added with an expiry date already behind the watermark: still swept
+        late = create_unit(self.donor, expiry_days=-5)
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        create_unit(self.donor, expiry_days=1)
+        self.assertIn('Expired 2 units', self.sweep('--date', tomorrow))
+        late.refresh_from_db()
+        self.assertEqual(late.status, 'expired')
+        self.assertFalse(BloodBank.objects.filter(status='available').exists())
+        self.assertEqual(InventorySummary.find_drift(), [])
+        self.assertEqual(ExpirySweep.watermark(), date.today() + timedelta(days=1))
+
+    def test_units_past_their_date_show_as_expired_before_the_sweep(self):
+        swept = create_unit(self.donor, expiry_days=-3)
+        self.sweep()
+        unswept = create_unit(self.donor, expiry_days=-1)
+        soon = create_unit(self.donor, expiry_days=2)
+        create_unit(self.donor, expiry_days=-2, status='used')
+
+        self.assertEqual(set(BloodBank.past_expiry(date.today())), {swept, unswept})
+        self.assertEqual(
+            [unit.is_past_expiry for unit in BloodBank.objects.filter(id__in=[swept.id, unswept.id, soon.id])
+             .order_by('id')],
+            [True, True, False],
+        )
+
+        self.client.force_login(create_admin())
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(set(response.context['expired_units']), {swept, unswept})
+        self.assertEqual(list(response.context['expiring_units']), [soon])
+        response = self.client.get(reverse('blood_bank_list'))
+        self.assertContains(response, '<span class="status expired">Expired</span>', count=2)
+
+
+class EligibleDonorTests(TestCase):
+
+    def donor(self, username, blood_group, eligible_in=None, active=True):
+        donor = create_donor(username, blood_group)
+        if eligible_in is not None:
+            donor.next_eligible_date = date.today() + timedelta(days=eligible_in)
+            donor.save()
+        if not active:
+            User.objects.filter(pk=donor.user_id).update(is_active=False)
+        return donor
+
+    def test_compatible_eligible_donors_exact_match_first(self):
+        universal = self.donor('universal', 'O-', eligible_in=-1)
+        never = self.donor('never', 'O+')
+        today = self.donor('today', 'O+', eligible_in=0)
+        self.donor('resting', 'O+', eligible_in=10)
+        self.donor('other', 'A+')
+        self.donor('inactive', 'O+', active=False)
+
+        donors, cursor = recruitment.eligible_donor_page('O+')
+        self.assertEqual(donors, [never, today, universal])
+        self.assertIsNone(cursor)
+        self.assertTrue(all(donor.is_eligible_to_donate()[0] for donor in donors))
+        self.assertEqual(recruitment.eligible_donors().count(), 4)
+
+    def test_pages_read_one_group_at_a_time_by_id(self):
+        negative = [self.donor(f'neg{i}', 'B-') for i in range(3)]
+        exact = [self.donor(f'pos{i}', 'B+') for i in range(2)]
+        universal = self.donor('universal', 'O-')
+
+        # One query per group each page reaches, B+, B-, O+ then O-, including
+        # the group holding the row that shows there is a next page
+        pages, cursor = [], None
+        for queries in (2, 2, 3):
+            with CaptureQueriesContext(connection) as captured:
+                donors, cursor = recruitment.eligible_donor_page('B+', cursor, page_size=2)
+            self.assertEqual(len(captured), queries)
+            self.assertTrue(all('ORDER BY "myapp_donorprofile"."id"' in q['sql'] for q in captured.captured_queries))
+            pages.extend(donor.user.username for donor in donors)
+        self.assertEqual(pages, [donor.user.username for donor in [*exact, *negative, universal]])
+        self.assertIsNone(cursor)
+
+    def test_views_and_streaming_csv(self):
+        self.donor('eligible', 'AB-')
+        self.donor('resting', 'AB-', eligible_in=5)
+        self.client.force_login(create_admin())
+
+        response = self.client.get(reverse('eligible_donors'), {'blood_group': 'AB+'})
+        self.assertContains(response, 'eligible donor')
+        self.assertNotContains(response, 'resting donor')
+
+        response = self.client.get(reverse('eligible_donors_csv'), {'blood_group': 'AB-'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines, ['Name,Blood Group,Contact Number,Email,Eligible Since', 'eligible donor,AB-,1234567890,,'])
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.donor = create_donor()
+
+    def donation(self, days_ago, status):
+        return BloodDonation.objects.create(
+            donor=self.donor, quantity=1, donation_date=date.today() - timedelta(days=days_ago), status=status
+        )
+
+    def test_keyset_values_reads_fixed_size_batches(self):
+        donations = [self.donation(i, 'pending_initial') for i in range(5)]
+        with self.assertNumQueries(3):
+            rows = list(keyset_values(BloodDonation.objects.all(), ['status'], ('-id',), chunk_size=2))
+        self.assertEqual(len(rows), len(donations))
+        with self.assertNumQueries(3):
+            ids = [row[0] for row in keyset_values(BloodDonation.objects.all(), ['id'], chunk_size=2)]
+        self.assertEqual(ids, [donation.id for donation in donations])
+
+    def test_date_and_status_filters(self):
+        recent = self.donation(1, 'final_approved')
+        self.donation(1, 'rejected')
+        self.donation(10, 'final_approved')
+
+        lines = exports.export_lines(
+            'donations', 'jsonl', start=date.today() - timedelta(days=2), end=date.today(), status='final_approved'
+        )
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record['id'] for record in records], [recent.id])
+        self.assertEqual(records[0]['donation_date'], recent.donation_date.isoformat())
+
+        with self.assertRaises(ValueError):
+            exports.export_queryset('donations', status='lost')
+
+    def test_export_view_and_command(self):
+        create_unit(self.donor, quantity=3)
+        self.client.force_login(create_admin())
+
+        response = self.client.get(reverse('export_records', args=['inventory']), {'status': 'available'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(exports.DATASETS['inventory']['fields']))
+        self.assertEqual(len(lines), 2)
+
+        self.assertEqual(self.client.get(reverse('export_records', args=['inventory']), {'start': 'May'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_records', args=['users'])).status_code, 404)
+
+        create_patient('p1')
+        response = self.client.get(reverse('export_records', args=['patients']))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(exports.DATASETS['patients']['fields']))
+        self.assertEqual(len(lines), 2)
+
+        out = StringIO()
+        call_command('export_records', 'donors', '--format', 'jsonl', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['full_name'], 'donor donor')
+
+
+class ImportTests(TestCase):
+    DONORS_CSV = (
+        'email,password,full_name,blood_group,contact_number,age\n'
+        'ann@example.com,s3cret-pass,Ann,A+,111,30\n'
+        'bob@example.com,,Bob,Q+,222,40\n'
+        'donor@example.com,,Existing,O+,333,\n'
+        'cy@example.com,,Cy,O-,444,\n'
+    )
+
+    def rows(self, count):
+        return ''.join(f'{{"email": "u{i}@example.com", "full_name": "U{i}", "blood_group": "B+", '
+                       f'"contact_number": "1", "age": 30}}\n' for i in range(count))
+
+    def test_import_command_reports_bad_rows_and_keeps_the_rest(self):
+        create_donor('donor@example.com')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write(self.DONORS_CSV)
+            f.flush()
+            out, err = StringIO(), StringIO()
+            call_command('import_records', 'donors', f.name, workers=0, stdout=out, stderr=err)
+
+        self.assertIn('Imported 2 of 4 donors rows, 2 rejected', out.getvalue())
+        self.assertIn('line 3: blood_group:', err.getvalue())
+        self.assertIn('line 4: User donor@example.com already exists.', err.getvalue())
+        ann = DonorProfile.objects.select_related('user').get(full_name='Ann')
+        self.assertEqual((ann.age, ann.user.email), (30, 'ann@example.com'))
+        self.assertTrue(ann.user.check_password('s3cret-pass'))
+        self.assertFalse(User.objects.get(username='cy@example.com').has_usable_password())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def run(data):
+            with CaptureQueriesContext(connection) as queries:
+                results = list(imports.import_batches(
+                    'patients', imports.read_rows(StringIO(data), 'jsonl'), lambda passwords: [''] * len(passwords)
+                ))
+            return len(queries), results
+
+        few, _ = run(self.rows(2))
+        PatientProfile.objects.all().delete()
+        User.objects.all().delete()
+        many, results = run(self.rows(20) + 'not json\n')
+        self.assertEqual(few, many)
+        self.assertEqual(results, [(21, 20, [(21, 'Not a JSON object.')])])
+        self.assertEqual(PatientProfile.objects.count(), 20)
+
+    def test_historical_donations_move_next_eligible_date(self):
+        donor = create_donor('dee@example.com')
+        data = (
+            '{"donor": "dee@example.com", "quantity": 1, "donation_date": "2026-01-10", "status": "final_approved"}\n'
+            '{"donor": "dee@example.com", "quantity": 1, "donation_date": "2026-03-01", "status": "rejected"}\n'
+            '{"donor": "nobody@example.com", "quantity": 1, "donation_date": "2026-03-01", "status": "final_approved"}\n'
+        )
+        results = list(imports.import_batches('donations', imports.read_rows(StringIO(data), 'jsonl'), None, 2))
+
+        self.assertEqual([(read, inserted) for read, inserted, _ in results], [(2, 2), (1, 0)])
+        self.assertEqual(results[1][2], [(3, 'No donor with email nobody@example.com.')])
+        donor.refresh_from_db()
+        self.assertEqual(donor.next_eligible_date, date(2026, 4, 10))
+        self.assertFalse(BloodBank.objects.exists())
+
+    def test_row_by_row_retry_keeps_the_latest_eligible_date(self):
+        donor = create_donor('dee@example.com')
+
+        def row(donation_date, quantity=1):
+            return {'donor': 'dee@example.com', 'quantity': quantity, 'donation_date': donation_date,
+                    'appointment_date': None, 'status': 'final_approved'}
+
+        # The negative quantity fails the batch, so each row is retried alone
+        inserted, errors = imports._import_donations(BloodDonation, [
+            (1, row(date(2026, 3, 1))), (2, row(date(2026, 3, 5), quantity=-1)), (3, row(date(2026, 1, 10))),
+        ], None)
+
+        self.assertEqual((inserted, [line for line, _ in errors]), (2, [2]))
+        donor.refresh_from_db()
+        self.assertEqual(donor.next_eligible_date, date(2026, 5, 30))
+
+
+class SeedLoadTests(TestCase):
+    VOLUMES = {'donors': 30, 'patients': 10, 'donations': 200, 'requests': 40, 'notifications': 300, 'timeslot_days': 7}
+
+    def seeded(self, prefix):
+        donations = BloodDonation.objects.filter(donor__user__username__startswith=f'{prefix}-').order_by('id')
+        return (
+            list(donations.values_list('donor__full_name', 'status', 'quantity', 'donation_date')),
+            list(BloodBank.objects.filter(donation__in=donations).order_by('id').values_list('status', 'expiry_date')),
+            [
+                (username.removeprefix(prefix), kind, is_read)
+                for username, kind, is_read in Notification.objects.filter(recipient__username__startswith=f'{prefix}-')
+                .order_by('id').values_list('recipient__username', 'notification_type', 'is_read')
+            ],
+        )
+
+    def test_same_seed_gives_the_same_consistent_data(self):
+        today = date(2026, 3, 2)
+        counts = seeding.seed(self.VOLUMES, seed=7, prefix='a', today=today, batch_size=64)
+        seeding.seed(self.VOLUMES, seed=7, prefix='b', today=today, batch_size=64)
+
+        first = self.seeded('a')
+        self.assertEqual(counts['donations'], 200)
+        self.assertEqual(len(first[1]), counts['blood units'])
+        self.assertEqual(first, self.seeded('b'))
+        statuses = {status for _, status, _, _ in first[0]}
+        self.assertEqual(statuses, {status for status, _ in BloodDonation.status.field.choices})
+
+        self.assertEqual(InventorySummary.find_drift(), [])
+        user = User.objects.get(username='a-donor-0')
+        self.assertEqual(
+            UnreadNotificationCounter.count_for(user), Notification.objects.filter(recipient=user, is_read=False).count()
+        )
+        self.assertTrue(user.check_password(seeding.PASSWORD))
+        for slot in Timeslot.objects.filter(booked_count__gt=0):
+            self.assertEqual(slot.booked_count, slot.donations.count())
+
+        with self.assertRaises(ValueError):
+            seeding.seed(self.VOLUMES, prefix='a')
+
+
+class BenchmarkViewsTests(TestCase):
+
+    def test_benchmark_writes_results_and_flags_regressions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            results, baseline = f'{directory}/results.json', f'{directory}/baseline.json'
+            options = {'scale': 0.01, 'requests': 2, 'warmup': 0, 'stdout': StringIO()}
+            call_command('benchmark_views', scenario=['patient_dashboard', 'approve_initial'], output=results, **options)
+            with open(results) as f:
+                scenarios = json.load(f)['scenarios']
+            self.assertEqual(set(scenarios), {'patient_dashboard', 'approve_initial'})
+            self.assertEqual(scenarios['patient_dashboard']['requests'], 2)
+            self.assertGreater(scenarios['patient_dashboard']['bytes_p50'], 0)
+            self.assertEqual(scenarios['patient_dashboard']['errors'], 0)
+
+            scenarios['patient_dashboard']['queries_max'] -= 1
+            with open(baseline, 'w') as f:
+                json.dump({'scenarios': scenarios}, f)
+            err = StringIO()
+            with self.assertRaisesMessage(CommandError, '1 regressions'):
+                call_command(
+                    'benchmark_views', scenario=['patient_dashboard'], baseline=baseline, tolerance=1e6, stderr=err,
+                    **options,
+                )
+            self.assertIn('REGRESSION patient_dashboard: queries_max', err.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='bench-').exists())
+
+
+class InstrumentationMiddlewareTests(TestCase):
+
+    def test_server_timing_header_counts_queries_and_flags_duplicates(self):
+        def view(request):
+            for _ in range(3):
+                list(User.objects.filter(username='donor'))
+            Notification.objects.filter(pk=0).delete()
+            return HttpResponse('ok')
+
+        with self.assertLogs('myapp.requests', 'INFO') as logs:
+            response = InstrumentationMiddleware(view)(RequestFactory().get('/anything/'))
+
+        self.assertRegex(response.headers['Server-Timing'], r'^db;dur=[\d.]+;desc="4 queries", tpl;dur=[\d.]+, total;dur=')
+        self.assertIn('queries=4 duplicate_queries=2', logs.output[0])
+        self.assertIn('Likely N+1: the same query ran 3 times in GET /anything/: SELECT', logs.output[1])
+        self.assertEqual(len(logs.output), 2)
+
+    def test_async_requests_and_views_are_timed(self):
+        async def view(request):
+            await User.objects.filter(username='donor').afirst()
+            return HttpResponse('ok')
+
+        middleware = InstrumentationMiddleware(view)
+        with self.assertLogs('myapp.requests', 'INFO') as logs:
+            response = asyncio.run(middleware(AsyncRequestFactory().get('/anything/')))
+        self.assertIn('desc="1 queries"', response.headers['Server-Timing'])
+
+        self.client.force_login(create_donor().user)
+        with self.assertLogs('myapp.requests', 'INFO') as logs:
+            response = self.client.get(reverse('donor_dashboard'))
+        self.assertRegex(response.headers['Server-Timing'], r'tpl;dur=[\d.]+, view;dur=[\d.]+, total;dur=')
+        self.assertIn('view=donor_dashboard status=200', logs.output[0])
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        overrides = override_settings(METRICS_DIR=self.directory, METRICS_TOKEN='scrape-token')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.store = metrics.MetricsStore()
+
+    def test_histograms_and_counters_are_rendered(self):
+        self.store.observe('donor_dashboard', 'GET', 200, 0.02, 3, 0.004, 1000)
+        self.store.observe('donor_dashboard', 'GET', 200, 0.3, 12, 0.1, 500)
+        self.store.observe('donor_dashboard', 'POST', 500, 0.02, 1, 0.001, 0)
+        self.store.observe('', 'GET', 404, 0.001, 0, 0.0, 0)
+
+        text = metrics.render(self.store.collect())
+        self.assertIn('bloodbank_http_requests_total{view="donor_dashboard",method="GET",status="200"} 2', text)
+        self.assertIn('bloodbank_http_requests_total{view="unmatched",method="GET",status="404"} 1', text)
+        self.assertIn('bloodbank_http_errors_total{view="donor_dashboard"} 1', text)
+        self.assertIn('bloodbank_http_request_duration_seconds_bucket{view="donor_dashboard",le="0.025"} 2', text)
+        self.assertIn('bloodbank_http_request_duration_seconds_bucket{view="donor_dashboard",le="+Inf"} 3', text)
+        self.assertIn('bloodbank_http_request_duration_seconds_count{view="donor_dashboard"} 3', text)
+        self.assertIn('bloodbank_http_request_queries_bucket{view="donor_dashboard",le="10"} 2', text)
+        self.assertIn('bloodbank_http_request_queries_sum{view="donor_dashboard"} 16', text)
+        self.assertIn('bloodbank_http_response_bytes_total{view="donor_dashboard"} 1500', text)
+
+    def test_totals_of_other_workers_are_merged(self):
+        self.store.observe('admin_dashboard', 'GET', 200, 0.2, 5, 0.05, 100)
+        # Another worker, given the same pid as this one once it exited
+        other = metrics.MetricsStore()
+        other.observe('admin_dashboard', 'GET', 200, 0.4, 7, 0.05, 100)
+        other.flush()
+
+        merged = self.store.collect()
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([other.file_name, self.store.file_name]))
+        self.assertEqual(merged['responses'][('admin_dashboard', 'GET', '200')], 2)
+        self.assertEqual(merged['views']['admin_dashboard']['queries'], 12)
+        self.assertAlmostEqual(merged['views']['admin_dashboard']['duration_sum'], 0.6)
+
+    def test_files_of_long_gone_workers_are_pruned(self):
+        gone = metrics.MetricsStore()
+        gone.observe('admin_dashboard', 'GET', 200, 0.4, 7, 0.05, 100)
+        gone.flush()
+        path = os.path.join(self.directory, gone.file_name)
+        os.utime(path, (0, 0))
+
+        self.store.observe('admin_dashboard', 'GET', 200, 0.2, 5, 0.05, 100)
+        merged = self.store.collect()
+        self.assertEqual(os.listdir(self.directory), [self.store.file_name])
+        self.assertEqual(merged['responses'][('admin_dashboard', 'GET', '200')], 1)
+
+    def test_label_values_are_escaped(self):
+        self.store.observe('a"b\\c', 'GET', 200, 0.01, 0, 0.0, 0)
+        self.assertIn('view="a\\"b\\\\c"', metrics.render(self.store.collect()))
+
+    def test_endpoint_needs_the_token_or_an_admin(self):
+        url = reverse('request_metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertIn('# TYPE bloodbank_http_request_duration_seconds histogram', response.content.decode())
+
+        self.client.force_login(create_donor().user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(create_admin())
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class SlowQueryLogTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = os.path.join(directory.name, 'slow.jsonl')
+        # Every query counts as slow
+        overrides = override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_LOG=self.log)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def entries(self):
+        return list(slow_queries.read_log(self.log))
+
+    def test_entries_name_the_view_and_caller_and_carry_a_plan(self):
+        donor = create_donor()
+        self.client.force_login(donor.user)
+        logged_before = len(self.entries())
+        with self.assertLogs('myapp.slow_queries', 'WARNING') as logs:
+            response = self.client.get(reverse('donor_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, donor.full_name)
+
+        entries = [entry for entry in self.entries() if 'myapp_timeslot' in entry['sql']]
+        self.assertTrue(entries)
+        entry = entries[0]
+        self.assertEqual(entry['view'], 'donor_dashboard')
+        self.assertRegex(entry['caller'], r'^myapp/\w+\.py:\d+ in \w+$')
+        self.assertIn('myapp_timeslot', entry['plan'])
+        self.assertNotIn('EXPLAIN', ' '.join(e['sql'] for e in self.entries()))
+        self.assertEqual(len(logs.output), len(self.entries()) - logged_before)
+
+    def test_explain_is_not_charged_to_the_request(self):
+        def view(request):
+            list(User.objects.filter(username='donor'))
+            return HttpResponse('ok')
+
+        with self.assertLogs('myapp.slow_queries', 'WARNING'), self.assertLogs('myapp.requests', 'INFO') as logs:
+            response = InstrumentationMiddleware(view)(RequestFactory().get('/anything/'))
+        self.assertIn('desc="1 queries"', response.headers['Server-Timing'])
+        self.assertIn('queries=1 ', logs.output[0])
+        self.assertIn('auth_user', self.entries()[-1]['plan'])
+
+    def test_failed_explain_leaves_the_transaction_usable(self):
+        explain_query_prefix = connection.ops.explain_query_prefix
+        connection.ops.explain_query_prefix = lambda: 'EXPLAIN NOT VALID SQL'
+        self.addCleanup(setattr, connection.ops, 'explain_query_prefix', explain_query_prefix)
+        with transaction.atomic(), self.assertLogs('myapp.slow_queries', 'WARNING'):
+            self.assertEqual(User.objects.filter(username='donor').count(), 0)
+            self.assertTrue(self.entries()[-1]['plan'].startswith('EXPLAIN failed'))
+            User.objects.create_user('after-explain')
+        self.assertTrue(User.objects.filter(username='after-explain').exists())
+
+    def test_outside_a_request_only_the_caller_is_known(self):
+        with self.assertLogs('myapp.slow_queries', 'WARNING'):
+            DonorProfile.objects.filter(blood_group='O+').count()
+        entry = self.entries()[-1]
+        self.assertIsNone(entry['view'])
+        self.assertRegex(entry['caller'], r'^myapp/tests\.py:\d+ in test_outside_a_request')
+
+    def test_fingerprint_ignores_literals_and_list_lengths(self):
+        self.assertEqual(
+            slow_queries.fingerprint("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s, %s) LIMIT 26"),
+            slow_queries.fingerprint("SELECT * FROM t  WHERE a = 'it''s' AND b IN (%s) LIMIT 51"),
+        )
+        self.assertEqual(
+            slow_queries.fingerprint('INSERT INTO t2 (a, b) VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO t2 (a, b) VALUES (...)',
+        )
+
+    @override_settings(SLOW_QUERY_MS=None)
+    def test_disabled_log_writes_nothing(self):
+        DonorProfile.objects.count()
+        self.assertFalse(os.path.exists(self.log))
+
+    def test_report_ranks_fingerprints(self):
+        with self.assertLogs('myapp.slow_queries', 'WARNING'):
+            for group in ['O+', 'A-', 'B+']:
+                DonorProfile.objects.filter(blood_group=group).count()
+            User.objects.count()
+        groups = slow_queries.summarize(self.entries())
+        donor_counts = [group for group in groups if 'myapp_donorprofile' in group['normalized']]
+        self.assertEqual(donor_counts[0]['count'], 3)
+
+        out = StringIO()
+        call_command('slow_query_report', log=self.log, sort='count', top=1, stdout=out)
+        self.assertIn(f'#1 {donor_counts[0]["fingerprint"]}: 3 runs', out.getvalue())
+        self.assertIn('plan:', out.getvalue())
+        self.assertIn('from: myapp/tests.py', out.getvalue())
+
+
+@override_settings(
+    DATA_CACHE_TIMEOUT=60,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'caching-tests'}},
+)
+class VersionedCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return DonorProfile.objects.count()
+
+    def test_value_is_recomputed_only_after_its_model_changes(self):
+        self.assertEqual(caching.cached('donors', [DonorProfile], self.compute), 0)
+        self.assertEqual(caching.cached('donors', [DonorProfile], self.compute), 0)
+        Timeslot.objects.create(date=date.today(), start_time='09:00', end_time='10:00')
+        self.assertEqual(caching.cached('donors', [DonorProfile], self.compute), 0)
+        self.assertEqual(self.computed, 1)
+
+        create_donor()
+        self.assertEqual(caching.cached('donors', [DonorProfile], self.compute), 1)
+        DonorProfile.objects.get().delete()
+        self.assertEqual(caching.cached('donors', [DonorProfile], self.compute), 0)
+        self.assertEqual(self.computed, 3)
+
+    def test_logging_in_does_not_invalidate(self):
+        user = create_donor().user
+        versions = caching.versions([User])
+        self.client.force_login(user)
+        self.assertEqual(caching.versions([User]), versions)
+        user.is_active = False
+        user.save()
+        self.assertNotEqual(caching.versions([User]), versions)
+
+    def test_bump_repeats_on_commit_and_survives_eviction(self):
+        [version] = caching.versions([Timeslot])
+        with self.captureOnCommitCallbacks(execute=True):
+            caching.bump(Timeslot)
+            self.assertEqual(caching.versions([Timeslot]), [version + 1])
+        self.assertEqual(caching.versions([Timeslot]), [version + 2])
+
+        cache.delete('version:myapp.timeslot')
+        self.assertGreater(caching.versions([Timeslot])[0], version + 2)
+
+    def test_bulk_paths_invalidate(self):
+        donor = create_donor()
+        self.assertEqual(views.cached_available_by_group(), {})
+        donation = BloodDonation.objects.create(donor=donor, quantity=1, donation_date=date.today())
+        BloodBank.bulk_add([BloodBank(donation=donation, blood_group='O+', quantity=1,
+                                      expiry_date=date.today() + timedelta(days=5))])
+        self.assertEqual(views.cached_available_by_group(), {'O+': 1})
+
+        self.assertEqual(views.cached_dashboard_stats()['pending_donations'], 1)
+        approvals.reject_donations([donation.id], create_admin())
+        self.assertEqual(views.cached_dashboard_stats()['pending_donations'], 0)
+
+    def test_dashboard_serves_cached_fragments_until_a_row_changes(self):
+        self.client.force_login(create_admin())
+        create_donor('first')
+        self.client.get(reverse('admin_dashboard'))
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertContains(response, 'first donor')
+        self.assertFalse([query for query in warm.captured_queries if 'FROM "myapp_donorprofile"' in query['sql']])
+
+        create_donor('second')
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertContains(response, 'second donor')
+        self.assertEqual(response.context['stats']['total_donors'], 2)
+        fragment = self.client.get(reverse('dashboard_section', args=['donors']))
+        self.assertContains(fragment, 'second donor')
+
+
+@override_settings(
+    DATA_CACHE_TIMEOUT=60,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'availability-tests'}},
+)
+class BloodAvailabilityTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.donor = create_donor()
+        self.url = reverse('blood_availability')
+
+    def test_reports_in_date_available_stock_per_group(self):
+        create_unit(self.donor, quantity=2, expiry_days=10)
+        create_unit(self.donor, quantity=1, expiry_days=3)
+        create_unit(self.donor, quantity=5, expiry_days=-1)
+        create_unit(self.donor, quantity=5, status='used')
+        create_unit(self.donor, quantity=1, blood_group='AB-', expiry_days=20)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        groups = {group['blood_group']: group for group in response.json()['groups']}
+        self.assertEqual(len(groups), 8)
+        self.assertEqual(groups['O+']['available_quantity'], 3)
+        self.assertEqual(groups['O+']['units'], 2)
+        self.assertEqual(groups['O+']['soonest_expiry'], (date.today() + timedelta(days=3)).isoformat())
+        self.assertEqual(groups['AB-']['units'], 1)
+        self.assertEqual(groups['B-'], {'blood_group': 'B-', 'available_quantity': 0, 'units': 0, 'soonest_expiry': None})
+
+    def test_repeat_poll_is_not_modified_without_queries(self):
+        create_unit(self.donor)
+        response = self.client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertTrue(etag.startswith('W/"'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        create_unit(self.donor)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        units = {group['blood_group']: group['units'] for group in response.json()['groups']}
+        self.assertEqual(units['O+'], 2)
+
+    @override_settings(DATA_CACHE_TIMEOUT=0)
+    def test_without_the_cache_every_poll_is_answered_in_full(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_landing_page_shows_stock(self):
+        create_unit(self.donor, quantity=1, blood_group='A-')
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Current Blood Stock')
+        self.assertContains(response, '<div class="stock-quantity">1 unit</div>', html=False)
+
+
+class DashboardPaginationTests(TestCase):
+
+    def setUp(self):
+        self.admin = create_admin()
+        self.client.force_login(self.admin)
+        for i in range(60):
+            create_donor(f'donor{i:02d}', blood_group='A+' if i % 2 else 'B-')
+
+    def fetch(self, section, **params):
+        response = self.client.get(reverse('dashboard_section', args=[section]), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_cursor_walks_every_row_once(self):
+        seen = []
+        cursor = None
+        while True:
+            page = views.dashboard_page('donors', cursor=cursor)
+            seen.extend(donor.id for donor in page['rows'])
+            self.assertLessEqual(len(page['rows']), views.DASHBOARD_PAGE_SIZE)
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), sorted(DonorProfile.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_fragment_returns_next_cursor_header(self):
+        first = self.fetch('donors')
+        self.assertTrue(first['X-Next-Cursor'])
+        second = self.fetch('donors', cursor=first['X-Next-Cursor'])
+        self.assertNotEqual(first.content, second.content)
+
+    def test_search_filters_on_server(self):
+        response = self.fetch('donors', q='donor07')
+        self.assertContains(response, 'donor07 donor')
+        self.assertNotContains(response, 'donor08 donor')
+        self.assertEqual(response['X-Next-Cursor'], '')
+
+        response = self.fetch('donors', q='B-')
+        self.assertNotContains(response, '<td>A+</td>')
+
+    def test_unknown_section_is_404(self):
+        response = self.client.get(reverse('dashboard_section', args=['nope']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_dashboard_renders_only_first_page(self):
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['donor_page']['html'].count('<tr>'), views.DASHBOARD_PAGE_SIZE)
+        self.assertEqual(response.context['stats']['total_donors'], 60)
+
+
+class StatsTests(TestCase):
+
+    def test_request_counters_come_from_one_query(self):
+        patient = create_patient()
+        for status in ['pending', 'pending', 'fulfilled', 'rejected']:
+            BloodRequest.objects.create(patient=patient, blood_group='O+', quantity=1, status=status)
+
+        with self.assertNumQueries(1):
+            counts = stats.blood_request_stats(patient=patient)
+
+        self.assertEqual(counts['total_requests'], 4)
+        self.assertEqual(counts['pending_requests'], 2)
+        self.assertEqual(counts['fulfilled_requests'], 1)
+        self.assertEqual(counts['rejected_requests'], 1)
+
+    def test_donor_counters_come_from_one_query(self):
+        create_donor('active')
+        inactive = create_donor('inactive')
+        inactive.user.is_active = False
+        inactive.user.save()
+
+        with self.assertNumQueries(1):
+            counts = stats.donor_stats()
+
+        self.assertEqual(counts, {'total_donors': 2, 'active_donors': 1})
+
+    def test_admin_counters(self):
+        create_admin('one')
+        AdminProfile.objects.create(user=User.objects.create_user('pending'), full_name='P', employee_id='p', is_active=False)
+
+        counts = stats.admin_profile_stats()
+
+        self.assertEqual(counts['total_admins'], 2)
+        self.assertEqual(counts['super_admins'], 1)
+        self.assertEqual(counts['pending_admins'], 1)
+
+
+class UnreadNotificationCounterTests(TestCase):
+
+    def setUp(self):
+        self.user = create_donor().user
+
+    def notify(self, title='Hello', user=None):
+        return Notification.objects.create(recipient=user or self.user, title=title, message='...')
+
+    def unread(self):
+        return UnreadNotificationCounter.count_for(self.user)
+
+    def test_counter_follows_create_read_and_delete(self):
+        first = self.notify()
+        self.notify()
+        self.assertEqual(self.unread(), 2)
+
+        first.is_read = True
+        first.save()
+        self.assertEqual(self.unread(), 1)
+        first.delete()
+        self.assertEqual(self.unread(), 1)
+        Notification.objects.get(is_read=False).delete()
+        self.assertEqual(self.unread(), 0)
+
+    def test_mark_all_read_is_one_update(self):
+        for i in range(5):
+            self.notify(f'n{i}')
+        other = create_donor('other').user
+        self.notify(user=other)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Notification.mark_read(self.user), 5)
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "myapp_notification"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.unread(), 0)
+        self.assertEqual(UnreadNotificationCounter.count_for(other), 1)
+
+    def test_badge_endpoint_is_one_lookup(self):
+        self.notify()
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('notification_count'))
+        self.assertEqual(response.json(), {'unread': 1})
+        app_queries = [q for q in queries.captured_queries if 'myapp_' in q['sql']]
+        self.assertEqual(len(app_queries), 1)
+
+    def test_mark_read_views(self):
+        mine = self.notify()
+        theirs = self.notify(user=create_donor('other').user)
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('mark_notification_read', args=[theirs.id]), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 404)
+        theirs.refresh_from_db()
+        self.assertFalse(theirs.is_read)
+        response = self.client.get(reverse('mark_notification_read', args=[theirs.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(reverse('mark_notification_read', args=[mine.id]), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {'unread': 0})
+        # Marking it again is not an error
+        response = self.client.get(reverse('mark_notification_read', args=[mine.id]), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {'unread': 0})
+
+        self.notify()
+        self.assertEqual(self.client.get(reverse('mark_all_notifications_read')).status_code, 405)
+        response = self.client.post(reverse('mark_all_notifications_read'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.unread(), 0)
+
+    def test_rebuild_corrects_drift(self):
+        self.notify()
+        self.notify()
+        UnreadNotificationCounter.objects.filter(user=self.user).update(unread=7)
+        UnreadNotificationCounter.objects.create(user=create_donor('other').user, unread=3)
+
+        UnreadNotificationCounter.rebuild()
+        self.assertEqual(
+            dict(UnreadNotificationCounter.objects.values_list('user__username', 'unread')),
+            {'donor': 2, 'other': 0},
+        )
+
+
+class BulkApprovalTests(TestCase):
+
+    def setUp(self):
+        self.admin = create_admin()
+
+    def create_donations(self, count, status, prefix='d'):
+        return [
+            BloodDonation.objects.create(
+                donor=create_donor(f'{prefix}{i}'), quantity=2, donation_date=date.today(), status=status
+            )
+            for i in range(count)
+        ]
+
+    def create_request(self, quantity, username='patient'):
+        return BloodRequest.objects.create(
+            patient=create_patient(username), blood_group='O+', quantity=quantity, status='pending'
+        )
+
+    def test_initial_approval_reports_each_item(self):
+        pending = self.create_donations(2, 'pending_initial')
+        rejected = self.create_donations(1, 'rejected', prefix='r')[0]
+
+        report = approvals.approve_donations_initial([pending[1].id, rejected.id, 999999, pending[0].id], self.admin)
+
+        self.assertEqual([item['id'] for item in report], [pending[1].id, rejected.id, 999999, pending[0].id])
+        self.assertEqual([item['ok'] for item in report], [True, False, False, True])
+        self.assertEqual(report[1]['error'], 'Donation is Rejected.')
+        self.assertEqual(report[2]['error'], 'Donation not found.')
+        for donation in pending:
+            donation.refresh_from_db()
+            self.assertEqual((donation.status, donation.initial_approved_by), ('initial_approved', self.admin))
+            self.assertEqual(UnreadNotificationCounter.count_for(donation.donor.user), 1)
+        self.assertFalse(Notification.objects.filter(related_donation=rejected).exists())
+
+    def test_final_approval_query_count_does_not_grow(self):
+        def approve(count, prefix):
+            ids = [donation.id for donation in self.create_donations(count, 'slot_confirmed', prefix)]
+            with CaptureQueriesContext(connection) as queries:
+                report = approvals.approve_donations_final(ids, self.admin)
+            self.assertTrue(all(item['ok'] for item in report))
+            return len(queries)
+
+        approve(1, 'w')  # creates the O+ summary bucket
+        self.assertEqual(approve(2, 'a'), approve(12, 'b'))
+        self.assertEqual(BloodBank.objects.count(), 15)
+        self.assertEqual(InventorySummary.available_quantity('O+'), 30)
+        self.assertEqual(InventorySummary.find_drift(), [])
+        self.assertFalse(DonorProfile.objects.filter(next_eligible_date__isnull=True).exists())
+        self.assertEqual(UnreadNotificationCounter.objects.filter(unread=1).count(), 15)
+
+    def test_fulfilment_reports_shortage_and_keeps_the_rest(self):
+        create_unit(create_donor(), quantity=5)
+        first = self.create_request(3, 'p1')
+        second = self.create_request(4, 'p2')
+        third = self.create_request(2, 'p3')
+
+        report = approvals.fulfil_blood_requests([third.id, second.id, first.id], self.admin)
+
+        self.assertEqual([item['ok'] for item in report], [True, False, True])
+        self.assertIn('Insufficient', report[1]['error'])
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'pending')
+        self.assertEqual(BloodRequest.objects.filter(status='fulfilled').count(), 2)
+        self.assertEqual(InventorySummary.available_quantity('O+'), 0)
+        self.assertEqual(InventorySummary.find_drift(), [])
+
+    def test_bulk_endpoint(self):
+        blood_request = self.create_request(1)
+        url = reverse('bulk_request_action', args=['reject'])
+
+        self.client.force_login(create_donor().user)
+        self.assertEqual(self.client.post(url, {'ids': [blood_request.id]}).status_code, 302)
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.post(reverse('bulk_request_action', args=['delete'])).status_code, 404)
+        self.assertEqual(self.client.post(url, {'ids': ['x']}).status_code, 400)
+        too_many = list(range(1, approvals.MAX_BULK_ITEMS + 2))
+        self.assertEqual(
+            self.client.post(url, {'ids': too_many}, content_type='application/json').status_code, 400
+        )
+
+        response = self.client.post(url, {'ids': [blood_request.id, blood_request.id]}, content_type='application/json')
+        self.assertEqual(response.json(), {
+            'action': 'reject', 'processed': 1, 'succeeded': 1, 'failed': 0,
+            'results': [{'id': blood_request.id, 'ok': True, 'status': 'rejected'}],
+        })
+
+
+@override_settings(LIVE_POLL_INTERVAL=0.01, LIVE_KEEPALIVE_INTERVAL=0.05)
+class LiveNotificationStreamTests(TestCase):
+
+    def setUp(self):
+        self.user = create_donor().user
+
+    def notify(self, title, publish=True, **fields):
+        if not publish:
+            return Notification.objects.create(recipient=self.user, title=title, message='...', **fields)
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(recipient=self.user, title=title, message='...', **fields)
+
+    async def read_event(self, stream):
+        """The next event that is not a keepalive, within two seconds."""
+        async def skip_keepalives():
+            event = await self.read(stream)
+            while event.startswith(':'):
+                event = await self.read(stream)
+            return event
+        return await asyncio.wait_for(skip_keepalives(), timeout=2)
+
+    async def open_stream(self, **headers):
+        request = AsyncRequestFactory().get(reverse('notification_stream'), headers=headers)
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        response = await views.notification_stream(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response.streaming_content
+
+    async def read(self, stream):
+        return (await asyncio.wait_for(anext(stream), timeout=2)).decode()
+
+    async def close(self, stream):
+        # What the ASGI handler does on client disconnect
+        reader = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        reader.cancel()
+        with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+            await reader
+        self.assertEqual(live.hub.subscriber_count(), 0)
+
+    async def test_new_notification_is_pushed_once(self):
+        stream = await self.open_stream()
+        self.assertTrue((await self.read(stream)).startswith('retry:'))
+
+        notification = await sync_to_async(self.notify)('Slot confirmed')
+        event = await self.read(stream)
+        self.assertIn(f'id: {notification.id}\n', event)
+        self.assertIn('"title": "Slot confirmed"', event)
+        # the copy queued by the hub is skipped, only keepalives follow
+        self.assertEqual(await self.read(stream), ': keepalive\n\n')
+        await self.close(stream)
+
+    async def test_reconnect_replays_after_last_event_id(self):
+        first = await sync_to_async(self.notify)('first', publish=False)
+        await sync_to_async(self.notify)('second', publish=False)
+
+        stream = await self.open_stream(last_event_id=str(first.id))
+        await self.read(stream)
+        self.assertIn('"title": "second"', await self.read(stream))
+        await self.close(stream)
+
+    async def test_poller_delivers_notifications_from_other_processes(self):
+        stream = await self.open_stream()
+        await self.read(stream)
+        self.assertEqual(await self.read(stream), ': keepalive\n\n')
+
+        await sync_to_async(self.notify)('from a worker', publish=False)
+        self.assertIn('"title": "from a worker"', await self.read_event(stream))
+        await self.close(stream)
+        await asyncio.sleep(0.05)
+
+    async def test_notifications_committed_out_of_id_order_are_delivered_once(self):
+        stream = await self.open_stream()
+        await self.read(stream)
+        latest = await Notification.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+        # Another process commits id +10 first, then the +5 it inserted earlier
+        await sync_to_async(self.notify)('higher id', publish=False, id=latest + 10)
+        self.assertIn('"title": "higher id"', await self.read_event(stream))
+        await sync_to_async(self.notify)('lower id', publish=False, id=latest + 5)
+        self.assertIn('"title": "lower id"', await self.read_event(stream))
+        # Published on commit here and found by the poller too, but sent once
+        await sync_to_async(self.notify)('lowest id', id=latest + 1)
+        self.assertIn('"title": "lowest id"', await self.read_event(stream))
+        for _ in range(3):
+            self.assertEqual(await self.read(stream), ': keepalive\n\n')
+        await self.close(stream)
+        await asyncio.sleep(0.05)
+
+
+class RoleResolutionTests(TestCase):
+
+    def setUp(self):
+        self.super_group = Group.objects.create(name=roles.SUPER_ADMIN)
+        self.secondary_group = Group.objects.create(name=roles.SECONDARY_ADMIN)
+        self.user = User.objects.create_user(username='staff')
+        self.user.groups.add(self.secondary_group)
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_groups_load_once_per_user_object(self):
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            self.assertTrue(views.is_admin(user))
+            self.assertFalse(views.is_superuser(user))
+            self.assertTrue(roles.in_group(user, roles.SECONDARY_ADMIN))
+            self.assertTrue(views.is_admin(user))
+
+    def test_membership_change_is_seen_by_the_same_object(self):
+        self.assertFalse(roles.is_super_admin(self.user))
+        self.user.groups.add(self.super_group)
+        self.assertTrue(roles.is_super_admin(self.user))
+
+    @override_settings(ROLE_CACHE_TIMEOUT=60)
+    def test_cache_is_shared_and_invalidated_from_both_sides(self):
+        cache.clear()
+        roles.group_names(self.fresh_user())
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(roles.is_admin(user))
+
+        self.user.groups.remove(self.secondary_group)
+        self.assertFalse(roles.is_admin(self.fresh_user()))
+
+        self.super_group.user_set.add(self.user)
+        self.assertTrue(roles.is_super_admin(self.fresh_user()))
+
+        self.super_group.user_set.clear()
+        self.assertFalse(roles.is_super_admin(self.fresh_user()))
+
+    def test_dashboard_request_loads_groups_once(self):
+        self.client.force_login(create_admin())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        group_queries = [q for q in queries.captured_queries if 'auth_user_groups' in q['sql']]
+        self.assertEqual(len(group_queries), 1)
+
+    def test_admin_profile_save_reads_groups_once(self):
+        profile = AdminProfile(user=self.fresh_user(), full_name='Staff', employee_id='staff')
+        with self.assertNumQueries(2):  # group names + INSERT
+            profile.save()
+        self.assertTrue(profile.is_secondary_admin)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Seed thousands of rows and hold every list view to a fixed query
+    ceiling, so a per-row query (N+1) fails the build.
+    """
+    ROWS = 1500
+
+    @classmethod
+    def setUpTestData(cls):
+        rows = cls.ROWS
+        User.objects.bulk_create(
+            [User(username=f'bulk_donor{i}', password='!') for i in range(rows)]
+            + [User(username=f'bulk_patient{i}', password='!') for i in range(rows)]
+        )
+        users = dict(User.objects.filter(username__startswith='bulk_').values_list('username', 'id'))
+        DonorProfile.objects.bulk_create([
+            DonorProfile(user_id=users[f'bulk_donor{i}'], full_name=f'Donor {i}', blood_group='O+', contact_number='1')
+            for i in range(rows)
+        ])
+        PatientProfile.objects.bulk_create([
+            PatientProfile(user_id=users[f'bulk_patient{i}'], full_name=f'Patient {i}', age=30, blood_group='A+', contact_number='2')
+            for i in range(rows)
+        ])
+
+        cls.donor = DonorProfile.objects.select_related('user').first()
+        cls.patient = PatientProfile.objects.select_related('user').first()
+        donor_ids = list(DonorProfile.objects.values_list('id', flat=True))
+        patient_ids = list(PatientProfile.objects.values_list('id', flat=True))
+
+        Timeslot.objects.bulk_create([
+            Timeslot(date=date.today() + timedelta(days=i // 8), start_time=f'{8 + i % 8:02d}:00', end_time=f'{9 + i % 8:02d}:00')
+            for i in range(400)
+        ])
+        timeslot = Timeslot.objects.first()
+        statuses = ['pending_initial', 'slot_confirmed', 'final_approved']
+        BloodDonation.objects.bulk_create([
+            BloodDonation(donor_id=donor_ids[i % len(donor_ids)], quantity=1, donation_date=date.today(),
+                          status=statuses[i % 3], timeslot=timeslot if i % 3 else None)
+            for i in range(rows)
+        ] + [
+            BloodDonation(donor=cls.donor, quantity=1, donation_date=date.today(), status='final_approved', timeslot=timeslot)
+            for _ in range(50)
+        ])
+        final_ids = BloodDonation.objects.filter(status='final_approved').values_list('id', flat=True)
+        BloodBank.objects.bulk_create([
+            BloodBank(donation_id=donation_id, blood_group='O+', quantity=1,
+                      expiry_date=date.today() + timedelta(days=donation_id % 50 - 5))
+            for donation_id in final_ids
+        ])
+        BloodRequest.objects.bulk_create([
+            BloodRequest(patient_id=patient_ids[i % len(patient_ids)], blood_group='A+', quantity=1)
+            for i in range(rows)
+        ] + [
+            BloodRequest(patient=cls.patient, blood_group='A+', quantity=1, status='fulfilled')
+            for _ in range(50)
+        ])
+        Notification.objects.bulk_create([
+            Notification(recipient=cls.donor.user, title='Hi', message='Hello')
+            for _ in range(50)
+        ])
+        UnreadNotificationCounter.rebuild()
+
+        cls.super_admin = create_admin('super')
+        cls.super_admin.is_superuser = True
+        cls.super_admin.save()
+        for i in range(30):
+            create_admin(f'staff{i}')
+        secondary = User.objects.create_user(username='secondary')
+        secondary.groups.add(Group.objects.get_or_create(name='Secondary Admin')[0])
+        AdminProfile.objects.create(user=secondary, full_name='Second', employee_id='second')
+        cls.secondary_admin = secondary
+
+    def assertMaxQueries(self, ceiling, user, url):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), ceiling,
+            f'{url} ran {len(queries)} queries (budget {ceiling}):\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_admin_dashboard(self):
+        # Includes the aggregate taking unswept expired units off the inventory tiles
+        self.assertMaxQueries(18, self.super_admin, reverse('admin_dashboard'))
+
+    def test_dashboard_sections(self):
+        for section in views.DASHBOARD_SECTIONS:
+            self.assertMaxQueries(3, self.super_admin, reverse('dashboard_section', args=[section]))
+
+    def test_secondary_admin_dashboard(self):
+        self.assertMaxQueries(10, self.secondary_admin, reverse('secondary_admin_dashboard'))
+
+    def test_admin_management(self):
+        self.assertMaxQueries(4, self.super_admin, reverse('admin_management'))
+
+    def test_donor_dashboard(self):
+        self.assertMaxQueries(7, self.donor.user, reverse('donor_dashboard'))
+
+    def test_patient_dashboard(self):
+        self.assertMaxQueries(6, self.patient.user, reverse('patient_dashboard'))
+
+    def test_patient_details(self):
+        self.assertMaxQueries(5, self.super_admin, reverse('patient_details', args=[self.patient.id]))
+
+    def test_blood_bank_list(self):
+        self.assertMaxQueries(3, self.super_admin, reverse('blood_bank_list'))
+
+    def test_timeslot_list(self):
+        self.assertMaxQueries(3, self.super_admin, reverse('timeslot_list'))
+
+
+class QueryPlanTests(TestCase):
+    """The hot queries must be answered from an index on a seeded dataset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        donor = create_donor()
+        BloodDonation.objects.bulk_create([
+            BloodDonation(donor=donor, quantity=1, donation_date=date.today(),
+                          status=['pending_initial', 'final_approved', 'rejected'][i % 3])
+            for i in range(3000)
+        ])
+        donation_ids = BloodDonation.objects.values_list('id', flat=True)
+        BloodBank.objects.bulk_create([
+            BloodBank(donation_id=donation_id, blood_group=['O+', 'A+', 'B-', 'AB+'][donation_id % 4],
+                      quantity=1, expiry_date=date.today() + timedelta(days=donation_id % 60 - 10),
+                      status=['available', 'used'][donation_id % 2])
+            for donation_id in donation_ids
+        ])
+        Notification.objects.bulk_create([
+            Notification(recipient=donor.user, title='t', message='m', is_read=bool(i % 2))
+            for i in range(3000)
+        ])
+        User.objects.bulk_create([User(username=f'plan-donor{i}') for i in range(2000)])
+        DonorProfile.objects.bulk_create([
+            DonorProfile(user_id=user_id, full_name='d', blood_group=allocation.BLOOD_GROUPS[user_id % 8],
+                         contact_number='1', next_eligible_date=date.today() + timedelta(days=user_id % 180 - 90))
+            for user_id in User.objects.filter(username__startswith='plan-donor').values_list('id', flat=True)
+        ])
+        Timeslot.objects.bulk_create([
+            Timeslot(date=date.today() + timedelta(days=i // 10 - 100), start_time=f'{8 + i % 10:02d}:00',
+                     end_time=f'{9 + i % 10:02d}:00', is_active=bool(i % 3))
+            for i in range(3000)
+        ])
+
+    def test_hot_queries_use_indexes(self):
+        failures = find_full_scans()
+        self.assertEqual(failures, [], '\n\n'.join(f'{name}:\n{plan}' for name, plan in failures))
+
+    def test_eligible_donor_pages_are_read_in_index_order(self):
+        failures = find_sorts()
+        self.assertEqual(failures, [], '\n\n'.join(f'{name}:\n{plan}' for name, plan in failures))
+
+    def test_check_query_plans_command(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('use an index', out.getvalue())
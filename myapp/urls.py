@@ -8,6 +8,7 @@ urlpatterns = [
     # Admin portal
     path('admin-portal/', views.admin_login, name='admin_portal'),
     path('portal/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('portal/dashboard/<str:section>/', views.dashboard_section, name='dashboard_section'),
     path('portal/secondary-dashboard/', views.secondary_admin_dashboard, name='secondary_admin_dashboard'),
     path('portal/logout/', views.admin_logout, name='admin_logout'),
     path('test-admin/', views.test_admin_login, name='test_admin'),
@@ -41,10 +42,21 @@ urlpatterns = [
     path('donation/<int:donation_id>/approve-initial/', views.approve_donation_initial, name='approve_donation_initial'),
     path('donation/<int:donation_id>/approve-final/', views.approve_donation_final, name='approve_donation_final'),
     path('donation/<int:donation_id>/reject/', views.reject_donation, name='reject_donation'),
+    path('request/match/', views.match_blood_requests, name='match_blood_requests'),
+    path('request/bulk/<str:action>/', views.bulk_request_action, name='bulk_request_action'),
+    path('donation/bulk/<str:action>/', views.bulk_donation_action, name='bulk_donation_action'),
+
+    # Donor recruitment
+    path('portal/donors/eligible/', views.eligible_donors, name='eligible_donors'),
+    path('portal/donors/eligible.csv', views.eligible_donors_csv, name='eligible_donors_csv'),
+
+    # Exports
+    path('portal/export/<str:dataset>/', views.export_records, name='export_records'),
 
     # Timeslot Management
     path('portal/timeslots/', views.timeslot_list, name='timeslot_list'),
     path('portal/timeslots/create/', views.create_timeslot, name='create_timeslot'),
+    path('portal/timeslots/generate/', views.generate_timeslots, name='generate_timeslots'),
     path('portal/timeslots/<int:timeslot_id>/update/', views.update_timeslot, name='update_timeslot'),
     path('portal/timeslots/<int:timeslot_id>/delete/', views.delete_timeslot, name='delete_timeslot'),
 
@@ -54,4 +66,13 @@ urlpatterns = [
 
     # Notifications
     path('notification/<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
+    path('notification/read-all/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
+    path('notification/count/', views.notification_count, name='notification_count'),
+    path('notification/stream/', views.notification_stream, name='notification_stream'),
+
+    # Monitoring
+    path('metrics/', views.request_metrics, name='request_metrics'),
+
+    # Public stock per blood group
+    path('availability/', views.blood_availability, name='blood_availability'),
 ]
\ No newline at end of file
@@ -1,20 +1,76 @@
 from django.shortcuts import render, redirect
-from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import Group, User
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
-from .forms import DonorRegistrationForm, AdminLoginForm, AdminRegistrationForm, PatientRegistrationForm, BloodRequestForm, BloodDonationForm, TimeslotForm, AppointmentBookingForm, NotificationForm
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST, require_safe
+from django.utils import timezone
+from .forms import DonorRegistrationForm, AdminLoginForm, AdminRegistrationForm, PatientRegistrationForm, BloodRequestForm, BloodDonationForm, TimeslotForm, RecurringTimeslotForm, AppointmentBookingForm, NotificationForm
 from django.contrib.auth.forms import AuthenticationForm
-from .models import DonorProfile, AdminProfile, PatientProfile, BloodRequest, BloodDonation, Timeslot, BloodBank, Notification
+from .models import DonorProfile, AdminProfile, PatientProfile, BloodRequest, BloodDonation, Timeslot, BloodBank, Notification, UnreadNotificationCounter, InventorySummary, InsufficientBloodUnits, BookingError
 from django.db.models import F, Case, When, Value, FloatField
-from django.db import models
+from django.db import models, transaction
+from . import allocation, approvals, caching, exports, live, metrics, recruitment, roles
+from .pagination import keyset_page, search
+from .stats import admin_dashboard_stats, admin_profile_stats, blood_request_stats
 from datetime import datetime, timedelta
+import asyncio
+import hmac
+import json
+from django.conf import settings
 
 def index(request):
     """Homepage view that renders the main landing page"""
-    return render(request, 'index.html')
+    return render(request, 'index.html', {'availability': availability_snapshot()['groups']})
+
+
+# Seconds browsers and proxies may reuse the public availability before revalidating
+AVAILABILITY_MAX_AGE = 30
+
+
+def availability_snapshot():
+    """
+    In-date available stock per blood group and when it was computed:
+    {'groups': [...], 'generated_at': datetime}. Cached until a unit changes.
+    """
+    today = timezone.localdate()
+
+    def compute():
+        return {'groups': BloodBank.availability_by_group(today), 'generated_at': timezone.now().replace(microsecond=0)}
+
+    return caching.cached('public_availability', [BloodBank], compute, vary=[today])
+
+
+def _availability_etag(request):
+    """
+    The BloodBank cache version and the date; read from the cache alone, so a
+    304 runs no query. Weak: a body recomputed under the same version (after
+    eviction) carries the same stock but a later generated_at.
+    """
+    if not caching.enabled():
+        return None
+    [version] = caching.versions([BloodBank])
+    return f'W/"{version}-{timezone.localdate():%Y%m%d}"'
+
+
+def _availability_last_modified(request):
+    return availability_snapshot()['generated_at'] if caching.enabled() else None
+
+
+@require_safe
+@cache_control(public=True, max_age=AVAILABILITY_MAX_AGE)
+@condition(etag_func=_availability_etag, last_modified_func=_availability_last_modified)
+def blood_availability(request):
+    """
+    Public, read-only stock per blood group: available quantity, units and
+    soonest expiry. Polls repeating the ETag get a 304 while the stock is
+    unchanged.
+    """
+    return JsonResponse(availability_snapshot())
 
 
 def donor_view(request):
@@ -73,6 +129,25 @@ def donor_view(request):
     return render(request, 'donor.html', context)
 
 
+NOTIFICATION_LIST_SIZE = 10
+# Browser reconnect delay for the live notification stream
+LIVE_RETRY_MS = 5000
+
+
+def latest_unread_notifications(user):
+    """
+    Return (latest unread notifications, unread count). The counter is only
+    read when there are more unread notifications than the list shows.
+    """
+    notifications = list(Notification.objects.filter(
+        recipient=user,
+        is_read=False
+    ).order_by('-created_at')[:NOTIFICATION_LIST_SIZE])
+    if len(notifications) < NOTIFICATION_LIST_SIZE:
+        return notifications, len(notifications)
+    return notifications, UnreadNotificationCounter.count_for(user)
+
+
 @login_required
 def donor_dashboard(request):
     """Donor dashboard view for authenticated users"""
@@ -110,27 +185,17 @@ def donor_dashboard(request):
                     status='initial_approved'
                 ).first()
                 if approved_donation:
-                    approved_donation.timeslot = timeslot
-                    approved_donation.status = 'slot_confirmed'
-                    approved_donation.appointment_date = timeslot.date
-                    approved_donation.save()
-                    # Increment booked count
-                    timeslot.booked_count = F('booked_count') + 1
-                    timeslot.save()
-                    # Create notification
-                    Notification.objects.create(
-                        recipient=approved_donation.donor.user,
-                        title='Appointment Booked',
-                        message=f'Your appointment for {timeslot.date} at {timeslot.start_time} is confirmed. Awaiting final admin approval.',
-                        notification_type='appointment',
-                        related_donation=approved_donation
-                    )
+                    try:
+                        timeslot.book(approved_donation)
+                    except BookingError as e:
+                        messages.error(request, str(e))
+                        return redirect('donor_dashboard')
                     messages.success(request, f'Appointment booked for {timeslot.date} at {timeslot.start_time}. Awaiting final admin approval.')
                     return redirect('donor_dashboard')
                 else:
                     messages.error(request, 'No initially approved donation found for booking.')
 
-    donations = BloodDonation.objects.filter(donor=donor_profile).order_by('-donation_date')
+    donations = BloodDonation.objects.filter(donor=donor_profile).select_related('timeslot').order_by('-donation_date')
     total_quantity = sum(donation.quantity for donation in donations if donation.quantity)
 
     # Get initially approved donations for booking
@@ -144,10 +209,7 @@ def donor_dashboard(request):
     ).order_by('appointment_date')
 
     # Get notifications
-    notifications = Notification.objects.filter(
-        recipient=request.user,
-        is_read=False
-    ).order_by('-created_at')
+    notifications, unread_count = latest_unread_notifications(request.user)
 
     # Get available timeslots for booking
     available_timeslots = Timeslot.objects.filter(
@@ -173,6 +235,7 @@ def donor_dashboard(request):
         'approved_donations': approved_donations,
         'upcoming_appointments': upcoming_appointments,
         'notifications': notifications,
+        'unread_count': unread_count,
         'available_timeslots': available_timeslots,
         'can_donate': can_donate,
         'restriction_message': restriction_message,
@@ -208,11 +271,14 @@ def patient_dashboard(request):
             return redirect('patient_dashboard')
 
     blood_requests = BloodRequest.objects.filter(patient=patient_profile).order_by('-created_at')
+    notifications, unread_count = latest_unread_notifications(request.user)
 
     context = {
         'patient_profile': patient_profile,
         'blood_request_form': blood_request_form,
         'blood_requests': blood_requests,
+        'notifications': notifications,
+        'unread_count': unread_count,
     }
     return render(request, 'patient.html', context)
 
@@ -289,25 +355,22 @@ from .forms import AdminCreationForm, AdminProfileUpdateForm
 
 def is_superuser(user):
     """Check if user is a superuser or in Super Admin group"""
-    return user.is_superuser or user.groups.filter(name='Super Admin').exists()
+    return roles.is_super_admin(user)
 
 
 def is_admin(user):
     """Check if user is superuser or in Super Admin or Secondary Admin group"""
-    return user.is_superuser or user.groups.filter(name__in=['Super Admin', 'Secondary Admin']).exists()
+    return roles.is_admin(user)
 
 
 @user_passes_test(is_superuser)
 def admin_management(request):
     """Main admin management dashboard for superusers"""
-    admins = AdminProfile.objects.all().order_by('-created_at')
+    admins = AdminProfile.objects.select_related('user').order_by('-created_at')
     context = {
         'admins': admins,
-        'total_admins': admins.count(),
-        'active_admins': admins.filter(is_active=True).count(),
-        'super_admins': admins.filter(is_super_admin=True).count(),
-        'secondary_admins': admins.filter(is_secondary_admin=True).count(),
     }
+    context.update(admin_profile_stats())
     return render(request, 'admin_management.html', context)
 
 
@@ -479,6 +542,109 @@ def admin_login(request):
     return render(request, 'admin.html', context)
 
 
+# Dashboard tables are served a page at a time; each section lists its
+# queryset, keyset ordering (ending in a unique column), searchable fields,
+# the template that renders its <tr> rows and the models those rows show,
+# whose changes invalidate the cached first page.
+DASHBOARD_PAGE_SIZE = 25
+
+DASHBOARD_SECTIONS = {
+    'donors': {
+        'queryset': lambda: DonorProfile.objects.select_related('user'),
+        'ordering': ['-created_at', '-id'],
+        'search_fields': ['full_name', 'blood_group', 'contact_number'],
+        'template': 'dashboard_donor_rows.html',
+        'depends_on': [DonorProfile, User],
+    },
+    'patients': {
+        'queryset': lambda: PatientProfile.objects.select_related('user'),
+        'ordering': ['-created_at', '-id'],
+        'search_fields': ['full_name', 'blood_group', 'contact_number'],
+        'template': 'dashboard_patient_rows.html',
+        'depends_on': [PatientProfile, User],
+    },
+    'timeslots': {
+        'queryset': lambda: Timeslot.objects.all(),
+        'ordering': ['-date', 'start_time', 'id'],
+        'search_fields': [],
+        'template': 'dashboard_timeslot_rows.html',
+        'depends_on': [Timeslot],
+    },
+    'bloodbank': {
+        'queryset': lambda: BloodBank.objects.select_related('donation__donor'),
+        'ordering': ['-created_at', '-id'],
+        'search_fields': ['blood_group', 'donation__donor__full_name', 'donation__donor__contact_number'],
+        'template': 'dashboard_bloodbank_rows.html',
+        'depends_on': [BloodBank, BloodDonation, DonorProfile],
+    },
+}
+
+
+def dashboard_page(section, search_term='', cursor=None):
+    """Return {'rows': [...], 'next_cursor': ...} for one dashboard section."""
+    config = DASHBOARD_SECTIONS[section]
+    queryset = search(config['queryset'](), config['search_fields'], search_term)
+    rows, next_cursor = keyset_page(queryset, config['ordering'], cursor, DASHBOARD_PAGE_SIZE)
+    return {'rows': rows, 'next_cursor': next_cursor}
+
+
+def _rows_context(rows, first_page, today):
+    return {'rows': rows, 'first_page': first_page, 'today': today, 'warning_date': today + timedelta(days=7)}
+
+
+def dashboard_fragment(section, today):
+    """
+    The first page of a dashboard section rendered as <tr> rows, with its
+    next cursor: {'html': ..., 'next_cursor': ...}. Cached until one of the
+    section's models changes.
+    """
+    config = DASHBOARD_SECTIONS[section]
+
+    def render_first_page():
+        page = dashboard_page(section)
+        html = render_to_string(config['template'], _rows_context(page['rows'], True, today))
+        return {'html': html, 'next_cursor': page['next_cursor']}
+
+    return caching.cached(f'dashboard:{section}', config['depends_on'], render_first_page, vary=[today])
+
+
+def cached_dashboard_stats():
+    """admin_dashboard_stats(), cached until a donor, request or donation changes."""
+    return caching.cached(
+        'admin_dashboard_stats', [DonorProfile, BloodRequest, BloodDonation], admin_dashboard_stats
+    )
+
+
+def cached_available_by_group():
+    """InventorySummary.available_by_group(), cached until a unit changes or the day ends."""
+    today = timezone.localdate()
+    return caching.cached(
+        'available_by_group', [BloodBank], lambda: InventorySummary.available_by_group(today), vary=[today]
+    )
+
+
+@login_required
+@user_passes_test(is_admin)
+def dashboard_section(request, section):
+    """Render one page of a dashboard table as <tr> rows; the next cursor is sent in X-Next-Cursor."""
+    if section not in DASHBOARD_SECTIONS:
+        raise Http404('Unknown dashboard section')
+
+    cursor = request.GET.get('cursor') or None
+    search_term = request.GET.get('q', '')
+    today = datetime.now().date()
+    if cursor is None and not search_term:
+        page = dashboard_fragment(section, today)
+        response = HttpResponse(page['html'])
+    else:
+        page = dashboard_page(section, search_term, cursor)
+        response = render(
+            request, DASHBOARD_SECTIONS[section]['template'], _rows_context(page['rows'], cursor is None, today)
+        )
+    response['X-Next-Cursor'] = page['next_cursor'] or ''
+    return response
+
+
 @login_required
 @user_passes_test(is_admin)
 def admin_dashboard(request):
@@ -497,33 +663,30 @@ def admin_dashboard(request):
     # Get pending admin approvals for super admins
     pending_admins = []
     if admin_profile.is_super_admin:
-        pending_admins = AdminProfile.objects.filter(is_active=False, is_secondary_admin=False).order_by('-created_at')
-
-    donors = DonorProfile.objects.all()
-    patients = PatientProfile.objects.all()
-    blood_requests = BloodRequest.objects.filter(status='pending').order_by('-created_at')
-    donations = BloodDonation.objects.filter(status__in=['pending_initial', 'slot_confirmed']).order_by('-created_at')
-    timeslots = Timeslot.objects.all().order_by('-date', 'start_time')
-    blood_units = BloodBank.objects.all().order_by('-created_at')
+        pending_admins = AdminProfile.objects.filter(is_active=False, is_secondary_admin=False).select_related('user').order_by('-created_at')
 
+    blood_requests = BloodRequest.objects.filter(status='pending').select_related('patient').order_by('-created_at')
+    donations = BloodDonation.objects.filter(status__in=['pending_initial', 'slot_confirmed']).select_related('donor', 'timeslot').order_by('-created_at')
     # Blood bank analytics for enhanced blood bank section
     today = datetime.now().date()
     warning_date = today + timedelta(days=7)
 
+    # First page of each table; later pages come from dashboard_section
+    donor_page = dashboard_fragment('donors', today)
+    patient_page = dashboard_fragment('patients', today)
+    timeslot_page = dashboard_fragment('timeslots', today)
+    blood_unit_page = dashboard_fragment('bloodbank', today)
+
     # Blood inventory summary - only count available units
-    blood_inventory = {}
-    for unit in blood_units:
-        if unit.status == 'available':
-            blood_group = unit.blood_group
-            if blood_group not in blood_inventory:
-                blood_inventory[blood_group] = 0
-            blood_inventory[blood_group] += 1
+    blood_inventory = cached_available_by_group()
 
-    # Units expiring soon (within 7 days)
-    expiring_units = blood_units.filter(expiry_date__lte=warning_date, expiry_date__gte=today)
+    # Units in stock expiring soon (within 7 days)
+    expiring_units = BloodBank.objects.filter(
+        status='available', expiry_date__lte=warning_date, expiry_date__gt=today
+    ).order_by('expiry_date')
 
-    # Expired units
-    expired_units = blood_units.filter(expiry_date__lt=today)
+    # Expired units, including those the expire_blood_units sweep has not reached yet
+    expired_units = BloodBank.past_expiry(today).order_by('expiry_date')
 
     # Low stock types (less than 5 units)
     low_stock_types = {blood_group: count for blood_group, count in blood_inventory.items() if count < 5}
@@ -532,15 +695,16 @@ def admin_dashboard(request):
         'admin_profile': admin_profile,
         'is_super_admin': admin_profile.is_super_admin,
         'is_secondary_admin': admin_profile.is_secondary_admin,
-        'is_super_admin_group': request.user.groups.filter(name='Super Admin').exists(),
-        'is_secondary_admin_group': request.user.groups.filter(name='Secondary Admin').exists(),
+        'is_super_admin_group': roles.in_group(request.user, roles.SUPER_ADMIN),
+        'is_secondary_admin_group': roles.in_group(request.user, roles.SECONDARY_ADMIN),
         'pending_admins': pending_admins,
-        'donors': donors,
-        'patients': patients,
+        'stats': cached_dashboard_stats(),
+        'donor_page': donor_page,
+        'patient_page': patient_page,
         'blood_requests': blood_requests,
         'donations': donations,
-        'timeslots': timeslots,
-        'blood_units': blood_units,
+        'timeslot_page': timeslot_page,
+        'blood_unit_page': blood_unit_page,
         # Enhanced blood bank context
         'blood_inventory': blood_inventory,
         'expiring_units': expiring_units,
@@ -567,10 +731,8 @@ def secondary_admin_dashboard(request):
         messages.error(request, 'Access denied. This page is for secondary admins only.')
         return redirect('admin_dashboard')
 
-    donors = DonorProfile.objects.all()
-    patients = PatientProfile.objects.all()
-    blood_requests = BloodRequest.objects.filter(status='pending').order_by('-created_at')
-    donations = BloodDonation.objects.filter(status__in=['pending_initial', 'slot_confirmed']).order_by('-created_at')
+    blood_requests = BloodRequest.objects.filter(status='pending').select_related('patient').order_by('-created_at')
+    donations = BloodDonation.objects.filter(status__in=['pending_initial', 'slot_confirmed']).select_related('donor', 'timeslot').order_by('-created_at')
 
     context = {
         'admin_profile': admin_profile,
@@ -578,8 +740,8 @@ def secondary_admin_dashboard(request):
         'is_secondary_admin': True,
         'is_super_admin_group': False,  # Always false for secondary admins
         'is_secondary_admin_group': True,
-        'donors': donors,
-        'patients': patients,
+        'stats': cached_dashboard_stats(),
+        'donor_page': dashboard_fragment('donors', datetime.now().date()),
         'blood_requests': blood_requests,
         'donations': donations,
     }
@@ -597,7 +759,7 @@ def admin_logout(request):
 @login_required
 @user_passes_test(is_admin)
 def approve_blood_request(request, request_id):
-    """Approve a blood request and deduct from blood bank inventory."""
+    """Approve a blood request and deduct compatible units from blood bank inventory."""
     blood_request = get_object_or_404(BloodRequest, id=request_id)
 
     # Check if already approved
@@ -605,42 +767,46 @@ def approve_blood_request(request, request_id):
         messages.warning(request, 'This blood request is already fulfilled.')
         return redirect(request.META.get('HTTP_REFERER', 'admin_dashboard'))
 
-    # Check if sufficient blood units are available in inventory
-    is_available, available_units = BloodBank.check_availability(
-        blood_request.blood_group, 
-        blood_request.quantity
-    )
+    # Quick reject from the inventory summary before taking any locks
+    available_units = allocation.available_quantity(blood_request.blood_group)
 
-    if not is_available:
+    if available_units < blood_request.quantity:
         messages.error(request, f'Insufficient blood units available. Requested: {blood_request.quantity}, Available: {available_units}')
         return redirect(request.META.get('HTTP_REFERER', 'admin_dashboard'))
 
     try:
-        # Deduct blood units from inventory using the new method
-        fulfilled_quantity = BloodBank.deduct_units(
-            blood_request.blood_group, 
-            blood_request.quantity
-        )
+        with transaction.atomic():
+            # Re-read the request under lock so two admins cannot fulfil it twice
+            blood_request = BloodRequest.objects.select_for_update().select_related('patient__user').get(id=request_id)
+            if blood_request.status == 'fulfilled':
+                messages.warning(request, 'This blood request is already fulfilled.')
+                return redirect(request.META.get('HTTP_REFERER', 'admin_dashboard'))
+
+            # Lock, plan and deduct compatible units in a single pass
+            allocated = allocation.allocate(blood_request.blood_group, blood_request.quantity)
+            fulfilled_quantity = sum(allocated.values())
+
+            # Update blood request
+            blood_request.status = 'fulfilled'
+            blood_request.fulfilled_quantity = fulfilled_quantity
+            blood_request.save()
 
-        # Update blood request
-        blood_request.status = 'fulfilled'
-        blood_request.fulfilled_quantity = fulfilled_quantity
-        blood_request.save()
-
-        # Create notification for patient
-        Notification.objects.create(
-            recipient=blood_request.patient.user,
-            title='Blood Request Fulfilled',
-            message=f'Your blood request for {fulfilled_quantity} units of {blood_request.blood_group} blood has been fulfilled.',
-            notification_type='status_update',
-            related_request=blood_request
-        )
+            # Create notification for patient
+            Notification.objects.create(
+                recipient=blood_request.patient.user,
+                title='Blood Request Fulfilled',
+                message=f'Your blood request for {fulfilled_quantity} units of {blood_request.blood_group} blood has been fulfilled.',
+                notification_type='status_update',
+                related_request=blood_request
+            )
 
-        messages.success(request, f'Blood request fulfilled successfully! {fulfilled_quantity} units of {blood_request.blood_group} blood deducted from inventory.')
-        
+        sources = ', '.join(f'{quantity} {blood_group}' for blood_group, quantity in allocated.items())
+        messages.success(request, f'Blood request fulfilled successfully! {fulfilled_quantity} units deducted from inventory ({sources}).')
+
+    except InsufficientBloodUnits as e:
+        messages.error(request, str(e))
     except Exception as e:
         messages.error(request, f'Error processing blood request: {str(e)}')
-        return redirect(request.META.get('HTTP_REFERER', 'admin_dashboard'))
 
     return redirect(request.META.get('HTTP_REFERER', 'admin_dashboard'))
 
@@ -739,6 +905,74 @@ def reject_donation(request, donation_id):
     return redirect(request.META.get('HTTP_REFERER', 'admin_dashboard'))
 
 
+def _bulk_ids(request):
+    """Item ids from a JSON body ({"ids": [...]}) or repeated `ids` form fields."""
+    if request.content_type == 'application/json':
+        try:
+            ids = json.loads(request.body).get('ids', [])
+        except (ValueError, AttributeError):
+            return None
+    else:
+        ids = request.POST.getlist('ids')
+    try:
+        return list(dict.fromkeys(int(item_id) for item_id in ids))
+    except (TypeError, ValueError):
+        return None
+
+
+def _bulk_response(request, actions, action):
+    """Run a bulk action from approvals.py and return its per-item report as JSON."""
+    if action not in actions:
+        raise Http404('Unknown bulk action')
+    ids = _bulk_ids(request)
+    if not ids:
+        return JsonResponse({'error': 'Select at least one item.'}, status=400)
+    if len(ids) > approvals.MAX_BULK_ITEMS:
+        return JsonResponse({'error': f'At most {approvals.MAX_BULK_ITEMS} items can be processed at once.'}, status=400)
+
+    results = actions[action](ids, request.user)
+    succeeded = sum(1 for result in results if result['ok'])
+    return JsonResponse({
+        'action': action,
+        'processed': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results,
+    })
+
+
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def bulk_donation_action(request, action):
+    """Initially approve, finally approve or reject the selected donations in one transaction."""
+    return _bulk_response(request, approvals.DONATION_ACTIONS, action)
+
+
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def match_blood_requests(request):
+    """Fulfil the whole pending request queue in one pass over the inventory."""
+    report = approvals.fulfil_pending_queue(by_urgency=bool(request.POST.get('by_urgency')))
+    fulfilled = sum(1 for result in report if result['ok'])
+    if fulfilled:
+        messages.success(request, f'{fulfilled} of {len(report)} pending blood requests fulfilled.')
+    if fulfilled < len(report):
+        messages.warning(request, f'{len(report) - fulfilled} blood requests could not be covered by current stock and are still pending.')
+    if not report:
+        messages.info(request, 'There are no pending blood requests.')
+    return redirect(request.META.get('HTTP_REFERER', 'admin_dashboard'))
+
+
+@login_required
+@user_passes_test(is_admin)
+@require_POST
+def bulk_request_action(request, action):
+    """Fulfil or reject the selected blood requests in one transaction."""
+    return _bulk_response(request, approvals.REQUEST_ACTIONS, action)
+
+
 # Timeslot Management Views
 @login_required
 @user_passes_test(is_admin)
@@ -776,6 +1010,29 @@ def create_timeslot(request):
     return render(request, 'timeslot_form.html', context)
 
 
+@login_required
+@user_passes_test(is_admin)
+def generate_timeslots(request):
+    """Generate a recurring schedule of timeslots in bulk"""
+    if request.method == 'POST':
+        form = RecurringTimeslotForm(request.POST)
+        if form.is_valid():
+            planned, created = form.generate()
+            skipped = planned - created
+            message = f'{created} timeslots created.'
+            if skipped:
+                message += f' {skipped} already existed and were left unchanged.'
+            messages.success(request, message)
+            return redirect('timeslot_list')
+    else:
+        form = RecurringTimeslotForm()
+    context = {
+        'form': form,
+        'title': 'Generate Recurring Timeslots'
+    }
+    return render(request, 'timeslot_generate.html', context)
+
+
 @login_required
 @user_passes_test(is_admin)
 def update_timeslot(request, timeslot_id):
@@ -784,9 +1041,11 @@ def update_timeslot(request, timeslot_id):
     if request.method == 'POST':
         form = TimeslotForm(request.POST, instance=timeslot)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Timeslot updated successfully!')
-            return redirect('timeslot_list')
+            # A full save() would write back the booked_count read above
+            if form.save(commit=False).reschedule():
+                messages.success(request, 'Timeslot updated successfully!')
+                return redirect('timeslot_list')
+            form.add_error('capacity', TimeslotForm.capacity_error(timeslot.booked_count))
     else:
         form = TimeslotForm(instance=timeslot)
     context = {
@@ -818,20 +1077,159 @@ def delete_timeslot(request, timeslot_id):
 @user_passes_test(is_admin)
 def blood_bank_list(request):
     """List blood bank inventory"""
-    blood_units = BloodBank.objects.all().order_by('-created_at')
+    blood_units = BloodBank.objects.select_related('donation__donor').order_by('-created_at')
+    today = timezone.localdate()
     context = {
         'blood_units': blood_units,
+        'today': today,
+        'warning_date': today + timedelta(days=7),
     }
     return render(request, 'blood_bank.html', context)
 
 
+def _recipient_group(request):
+    """The ?blood_group= a search is for, or None for every group."""
+    blood_group = request.GET.get('blood_group', '')
+    return blood_group if blood_group in allocation.BLOOD_GROUPS else None
+
+
+@login_required
+@user_passes_test(is_admin)
+def eligible_donors(request):
+    """Donors who can donate today, compatible with a patient's blood group"""
+    blood_group = _recipient_group(request)
+    donors, next_cursor = recruitment.eligible_donor_page(blood_group, request.GET.get('cursor') or None)
+    context = {
+        'donors': donors,
+        'next_cursor': next_cursor,
+        'blood_group': blood_group,
+        'blood_groups': allocation.BLOOD_GROUPS,
+        'compatible_groups': allocation.COMPATIBLE_DONORS[blood_group] if blood_group else (),
+    }
+    return render(request, 'eligible_donors.html', context)
+
+
+@login_required
+@user_passes_test(is_admin)
+def eligible_donors_csv(request):
+    """Stream every eligible donor for the search as CSV"""
+    blood_group = _recipient_group(request)
+    return exports.stream_csv(
+        f'eligible_donors_{blood_group or "all"}.csv',
+        ['Name', 'Blood Group', 'Contact Number', 'Email', 'Eligible Since'],
+        recruitment.eligible_donor_values(
+            blood_group,
+            ['full_name', 'blood_group', 'contact_number', 'user__email', 'next_eligible_date'],
+            exports.CHUNK_SIZE,
+        ),
+    )
+
+
+@login_required
+@user_passes_test(is_admin)
+def export_records(request, dataset):
+    """
+    Stream a table as CSV or JSON Lines (?format=csv|jsonl), optionally
+    filtered by ?start=&end= (YYYY-MM-DD) and ?status=.
+    """
+    if dataset not in exports.DATASETS:
+        raise Http404('Unknown export')
+    try:
+        return exports.stream_export(
+            dataset,
+            request.GET.get('format', 'csv'),
+            start=exports.parse_date(request.GET.get('start'), 'start'),
+            end=exports.parse_date(request.GET.get('end'), 'end'),
+            status=request.GET.get('status') or None,
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+def _notification_response(request):
+    """JSON badge count for fetch() callers, otherwise back to the referring page."""
+    if request.accepts('application/json') and not request.accepts('text/html'):
+        return JsonResponse({'unread': UnreadNotificationCounter.count_for(request.user)})
+    return redirect(request.META.get('HTTP_REFERER', 'donor_dashboard'))
+
+
+@login_required
+def notification_count(request):
+    """Unread notification count for the badge; one primary-key lookup"""
+    return JsonResponse({'unread': UnreadNotificationCounter.count_for(request.user)})
+
+
+@login_required
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of the user's new notifications.
+
+    Served by the ASGI application; each idle connection is one coroutine
+    waiting on an in-process queue (see myapp/live.py). Notifications after
+    Last-Event-ID are replayed first so reconnecting clients miss nothing.
+    """
+    user = await request.auser()
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_id')
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+    keepalive = getattr(settings, 'LIVE_KEEPALIVE_INTERVAL', 15)
+
+    async def events():
+        nonlocal last_id
+        mine = Notification.objects.filter(recipient_id=user.pk)
+        if last_id is None:
+            last_id = await mine.order_by('-id').values_list('id', flat=True).afirst() or 0
+        # Subscribe before replaying so nothing committed in between is lost;
+        # the queue may then repeat replayed rows, and a notification can
+        # arrive from both its on_commit publish and the poller, in any id
+        # order, so sent ids are skipped rather than everything below the last.
+        queue = live.hub.subscribe(user.pk)
+        overlap = getattr(settings, 'LIVE_POLL_OVERLAP', 1000)
+        sent = set()
+        try:
+            yield f'retry: {LIVE_RETRY_MS}\n\n'
+            async for notification in mine.filter(id__gt=last_id).order_by('id')[:50]:
+                last_id = notification.id
+                sent.add(notification.id)
+                yield _sse_event(live.serialize(notification))
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                if payload['id'] not in sent:
+                    last_id = max(last_id, payload['id'])
+                    sent = {sent_id for sent_id in sent if sent_id > last_id - overlap}
+                    sent.add(payload['id'])
+                    yield _sse_event(payload)
+        finally:
+            live.hub.unsubscribe(user.pk, queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _sse_event(payload):
+    return f'id: {payload["id"]}\nevent: notification\ndata: {json.dumps(payload)}\n\n'
+
+
 @login_required
 def mark_notification_read(request, notification_id):
     """Mark a notification as read"""
-    notification = get_object_or_404(Notification, id=notification_id, recipient=request.user)
-    notification.is_read = True
-    notification.save()
-    return redirect(request.META.get('HTTP_REFERER', 'donor_dashboard'))
+    if not Notification.mark_read(request.user, ids=[notification_id]):
+        # Nothing changed: already read, or not one of this user's notifications
+        get_object_or_404(Notification, id=notification_id, recipient=request.user)
+    return _notification_response(request)
+
+
+@login_required
+@require_POST
+def mark_all_notifications_read(request):
+    """Mark every unread notification of the current user as read in one UPDATE"""
+    Notification.mark_read(request.user)
+    return _notification_response(request)
 
 
 # Patient Management Views
@@ -868,7 +1266,7 @@ def toggle_patient_status(request, patient_id):
 @user_passes_test(is_admin)
 def patient_details(request, patient_id):
     """View detailed patient information"""
-    patient_profile = get_object_or_404(PatientProfile, id=patient_id)
+    patient_profile = get_object_or_404(PatientProfile.objects.select_related('user'), id=patient_id)
     
     # Get patient's blood requests
     blood_requests = BloodRequest.objects.filter(patient=patient_profile).order_by('-created_at')
@@ -880,10 +1278,8 @@ def patient_details(request, patient_id):
         'patient': patient_profile,
         'blood_requests': blood_requests,
         'medical_history': medical_history,
-        'total_requests': blood_requests.count(),
-        'fulfilled_requests': blood_requests.filter(status='fulfilled').count(),
-        'pending_requests': blood_requests.filter(status='pending').count(),
     }
+    context.update(blood_request_stats(patient=patient_profile))
     
     return render(request, 'patient_details.html', context)
 
@@ -951,3 +1347,15 @@ def test_admin_login(request):
     result['available_groups'] = list(Group.objects.values_list('name', flat=True))
 
     return render(request, 'test_admin.html', {'result': result})
+
+
+def request_metrics(request):
+    """
+    Request metrics of every worker in the Prometheus text format, for
+    admins or for scrapers sending `Authorization: Bearer <METRICS_TOKEN>`.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (token and hmac.compare_digest(supplied, token)) and not is_admin(request.user):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(metrics.render(metrics.store.collect()), content_type=metrics.CONTENT_TYPE)
@@ -60,6 +60,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'myapp.middleware.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -154,6 +155,10 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# MySQL skips partial indexes (e.g. available-only blood units); the
+# composite index on the same columns covers those queries there.
+SILENCED_SYSTEM_CHECKS = ['models.W037']
+
 # Authentication settings
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
@@ -162,3 +167,95 @@ LOGIN_URL = 'admin_portal'
 LOGIN_REDIRECT_URL = 'admin_dashboard'
 LOGOUT_REDIRECT_URL = 'admin_portal'
 
+# Applies the test-only settings (caching off, quiet request logs) for the run
+TEST_RUNNER = 'myapp.test_runner.TestRunner'
+
+# The default cache is in-process memory. myapp/caching.py keeps model
+# versions in it, so with more than one worker process (WEB_CONCURRENCY) a
+# change made in one worker would not invalidate the values cached by the
+# others: set CACHE_BACKEND / CACHE_LOCATION to Redis or Memcached, e.g.
+# django.core.cache.backends.redis.RedisCache and redis://host:6379, whose
+# atomic incr() every worker and host then shares.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', '')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND or 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds to keep cached dashboard stats, inventory and table fragments
+# (0 disables). Entries are invalidated as soon as their models change;
+# the timeout only bounds how long unreachable entries stay. Off by default
+# for several workers without a shared CACHE_BACKEND. The test runner
+# turns it off.
+DATA_CACHE_TIMEOUT = int(os.environ.get(
+    'DATA_CACHE_TIMEOUT',
+    300 if CACHE_BACKEND or int(os.environ.get('WEB_CONCURRENCY', 1)) == 1 else 0,
+))
+
+# Seconds to cache a user's group names between requests (0 disables).
+# Entries are dropped when User.groups changes; see myapp/roles.py.
+ROLE_CACHE_TIMEOUT = int(os.environ.get('ROLE_CACHE_TIMEOUT', 0))
+
+# Live notification stream (served over ASGI): how often each process polls
+# for notifications written elsewhere, how many ids back each poll re-reads
+# for notifications committed after one with a higher id, and the idle
+# keepalive interval.
+LIVE_POLL_INTERVAL = int(os.environ.get('LIVE_POLL_INTERVAL', 5))
+LIVE_POLL_OVERLAP = int(os.environ.get('LIVE_POLL_OVERLAP', 1000))
+LIVE_KEEPALIVE_INTERVAL = 15
+
+# Request instrumentation (myapp/middleware.py): a Server-Timing header and
+# one log line per request on the myapp.requests logger. Identical queries
+# run this many times in one request are logged as likely N+1s. The test
+# runner only shows errors.
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', '1') == '1'
+DUPLICATE_QUERY_THRESHOLD = int(os.environ.get('DUPLICATE_QUERY_THRESHOLD', 2))
+
+# Per-view request metrics (myapp/metrics.py): each worker writes its
+# totals to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds; /metrics/
+# merges them for admins or for scrapers sending this bearer token. Files
+# not written for METRICS_RETENTION seconds (exited workers) are deleted.
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / 'var' / 'metrics'))
+METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 10))
+METRICS_RETENTION = int(os.environ.get('METRICS_RETENTION', 86400))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Slow query log (myapp/slow_queries.py): queries taking SLOW_QUERY_MS or
+# longer are appended to SLOW_QUERY_LOG (JSON Lines) with their EXPLAIN plan
+# and logged on myapp.slow_queries; slow_query_report sums them up. An
+# empty SLOW_QUERY_MS turns the log off.
+SLOW_QUERY_MS = os.environ.get('SLOW_QUERY_MS', '200')
+SLOW_QUERY_MS = float(SLOW_QUERY_MS) if SLOW_QUERY_MS else None
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', str(BASE_DIR / 'var' / 'slow-queries.jsonl'))
+SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', '1') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'timestamped': {
+            'format': '{asctime} {levelname} {name} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'timestamped',
+        },
+    },
+    'loggers': {
+        'myapp.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'myapp.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
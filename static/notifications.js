@@ -0,0 +1,73 @@
+// Live notification badge and list for the donor and patient dashboards.
+//
+// New notifications arrive over the Server-Sent Events stream; the count
+// endpoint is only polled while the stream is not connected. Mark-as-read
+// links update the badge in place instead of reloading the dashboard.
+(function() {
+  const bell = document.querySelector('.notification-bell');
+  const badge = document.getElementById('notification-badge');
+  if (!bell || !badge) return;
+
+  const list = document.getElementById('notifications-list');
+  let stream = null;
+
+  function showCount(count) {
+    badge.textContent = count;
+    badge.hidden = !count;
+  }
+
+  function refreshCount() {
+    if (document.hidden || (stream && stream.readyState === EventSource.OPEN)) return;
+    fetch(bell.dataset.countUrl, {headers: {'Accept': 'application/json'}})
+      .then(response => response.ok ? response.json() : null)
+      .then(data => { if (data) showCount(data.unread); })
+      .catch(() => {});
+  }
+
+  function markRead(link) {
+    link.addEventListener('click', event => {
+      event.preventDefault();
+      fetch(link.href, {headers: {'Accept': 'application/json'}})
+        .then(response => response.ok ? response.json() : null)
+        .then(data => {
+          if (!data) return;
+          showCount(data.unread);
+          link.remove();
+        })
+        .catch(() => { window.location = link.href; });
+    });
+  }
+
+  function addCard(notification) {
+    if (!list) return;
+    const empty = list.querySelector('.empty-state');
+    if (empty) empty.remove();
+
+    const card = document.createElement('div');
+    card.className = 'notification-card';
+    card.innerHTML =
+      '<div class="notification-icon"><i class="fas fa-info-circle"></i></div>' +
+      '<div class="notification-content"><h4></h4><p></p><span class="notification-date"></span></div>' +
+      '<div class="notification-actions"><a class="btn-small" data-mark-read>Mark as Read</a></div>';
+    card.querySelector('h4').textContent = notification.title || 'Notification';
+    card.querySelector('p').textContent = notification.message;
+    card.querySelector('.notification-date').textContent = new Date(notification.created_at).toLocaleString();
+    const link = card.querySelector('[data-mark-read]');
+    link.href = list.dataset.markReadUrl.replace('0', notification.id);
+    markRead(link);
+    list.prepend(card);
+  }
+
+  document.querySelectorAll('[data-mark-read]').forEach(markRead);
+
+  if (window.EventSource && bell.dataset.streamUrl) {
+    stream = new EventSource(bell.dataset.streamUrl);
+    stream.addEventListener('notification', event => {
+      showCount((parseInt(badge.textContent, 10) || 0) + 1);
+      addCard(JSON.parse(event.data));
+    });
+  }
+
+  setInterval(refreshCount, 30000);
+  document.addEventListener('visibilitychange', refreshCount);
+})();